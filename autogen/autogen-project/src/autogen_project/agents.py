@@ -1,4 +1,6 @@
 from logging import getLogger
+from dataclasses import dataclass
+from typing import Callable
 from pyexpat import model
 from autogen_agentchat.agents import (
     BaseChatAgent, 
@@ -6,9 +8,12 @@ from autogen_agentchat.agents import (
     AssistantAgent,
     
 )
+from autogen_core.models import ChatCompletionClient
+from autogen_core.tools import BaseTool
 from autogen_project.tools.geometric_mean_tool import GeometricMeanTool
 from autogen_project.tools.knowledge_base_search_tool import KnowledgeBaseSearchTool
 from llama_index.core import VectorStoreIndex
+from llama_index.core.retrievers import BaseRetriever
 from llama_index.core.tools import FunctionTool, RetrieverTool, ToolMetadata
 from llama_index.llms.openai import OpenAI
 from autogen_project.settings import settings
@@ -19,8 +24,69 @@ from llama_index.core.agent import ReActAgent
 
 agent_logger = getLogger("agent")
 
-
-def create_agents(model_client: str, index: VectorStoreIndex) -> list[BaseChatAgent]:
+# "react": a ReActAgent (with its own LLM calls) answers the knowledge base searches
+# "direct": the searches return the top chunks of the retriever, without any LLM call
+KNOWLEDGE_SEARCHES = ("react", "direct")
+
+
+@dataclass(frozen=True)
+class AgentDefinition:
+    """
+    Immutable definition of an agent (name, prompts, tools), built once and shared.
+    `create` instantiates it, with only the state of the new agent: its model context.
+    """
+    name: str
+    description: str
+    system_message: str
+    tools: tuple[BaseTool, ...] = ()
+    agent_class: Callable[..., BaseChatAgent] = AssistantAgent
+
+    def create(self, model_client: ChatCompletionClient) -> BaseChatAgent:
+        return self.agent_class(
+            name=self.name,
+            description=self.description,
+            model_client=model_client,
+            system_message=self.system_message,
+            tools=list(self.tools) or None,
+        )
+
+
+def database_retriever_agent(knowledge_tool: RetrieverTool, llm: OpenAI) -> Callable[..., DatabaseRetrieverAgent]:
+    """
+    Agent class of the Database Access Agent: each agent gets its own ReActAgent (its chat
+    memory), over the shared knowledge tool and LLM client.
+    """
+    def create(**kwargs) -> DatabaseRetrieverAgent:
+        react_agent = ReActAgent.from_tools(tools=[knowledge_tool], llm=llm)
+        return DatabaseRetrieverAgent(react_agent=react_agent, **kwargs)
+
+    return create
+
+
+def direct_retriever_agent(retriever: BaseRetriever, max_result_tokens: int) -> Callable[..., DatabaseRetrieverAgent]:
+    """
+    Agent class of the Database Access Agent searching the knowledge base with the shared
+    retriever, without the ReActAgent and its LLM calls.
+    """
+    def create(**kwargs) -> DatabaseRetrieverAgent:
+        return DatabaseRetrieverAgent(retriever=retriever, max_result_tokens=max_result_tokens, **kwargs)
+
+    return create
+
+
+def create_agents(model_client: ChatCompletionClient, index: VectorStoreIndex) -> list[BaseChatAgent]:
+    """
+    Create the agents of a team. To create many teams, build the definitions once with
+    `agent_definitions` (see `team.TeamFactory`).
+    """
+    return [definition.create(model_client) for definition in agent_definitions(model_client, index)]
+
+
+def agent_definitions(model_client: ChatCompletionClient, index: VectorStoreIndex) -> list[AgentDefinition]:
+    """
+    Definitions of the agents of the team, the User Agent first. The tools, the retriever
+    and the LLM client of the ReActAgent are created here, once, and shared by the agents created.
+    """
     user_agent_message = '''
         You are the User Agent.
 
@@ -39,11 +105,10 @@ def create_agents(model_client: str, index: VectorStoreIndex) -> list[BaseChatAg
         Expected Output: A clear and concise task delegation to the appropriate agents in the format specified above.
     '''
 
-    agent_logger.info("Creating User Agent...")
-    user_agent = AssistantAgent(
+    agent_logger.info("Defining User Agent...")
+    user_agent = AgentDefinition(
         name="Customer_Support_Agent",
         description=user_agent_message,
-        model_client=model_client,
         system_message=user_agent_message,
     )
 
@@ -69,33 +134,39 @@ def create_agents(model_client: str, index: VectorStoreIndex) -> list[BaseChatAg
         and no others actions should be executed. Provide the data to the Data Processing Agent for further processing.
     '''
 
-    # Create a RetrieverTool and a ReActAgent to retrieve knowledge
-    # to pass to the DatabaseRetriverAgent(AssistantAgent)
-    knowledge_tool = RetrieverTool(
-        retriever=index.as_retriever(llm=model_client),
-        metadata=ToolMetadata(
-            name="knowledge",
-            description="A tool to retrieve knowledge about",
-        ),
-    )
-
-    react_agent = ReActAgent.from_tools(
-        tools=[knowledge_tool],
-        llm=OpenAI(
+    if settings.knowledge_search not in KNOWLEDGE_SEARCHES:
+        raise ValueError(f"Unknown knowledge search '{settings.knowledge_search}', expected one of {KNOWLEDGE_SEARCHES}.")
+
+    if settings.knowledge_search == "direct":
+        # The search tool returns the top chunks of the retriever, no LLM involved
+        database_agent_class = direct_retriever_agent(
+            index.as_retriever(similarity_top_k=settings.retriever_top_k), settings.retriever_max_tokens,
+        )
+    else:
+        # Create a RetrieverTool and a ReActAgent to retrieve knowledge
+        # to pass to the DatabaseRetriverAgent(AssistantAgent)
+        knowledge_tool = RetrieverTool(
+            retriever=index.as_retriever(llm=model_client),
+            metadata=ToolMetadata(
+                name="knowledge",
+                description="A tool to retrieve knowledge about",
+            ),
+        )
+
+        react_llm = OpenAI(
             model=settings.openai_model_name,
             api_key=settings.openai_api_key.get_secret_value(),
             temperature=settings.temperature,
             max_tokens=settings.max_tokens,
-        ),
-    )
+        )
+        database_agent_class = database_retriever_agent(knowledge_tool, react_llm)
 
-    agent_logger.info("Creating Database Agent...")
-    database_agent = DatabaseRetrieverAgent(
+    agent_logger.info("Defining Database Agent...")
+    database_agent = AgentDefinition(
         name="Database_Access_Agent",
         description=database_agent_message,
-        model_client=model_client,
         # tools=[KnowledgeBaseSearchTool(react_agent)], NOTE: outdated
-        react_agent=react_agent,
+        agent_class=database_agent_class,
         system_message=database_agent_message,
     )
     
@@ -121,11 +192,10 @@ def create_agents(model_client: str, index: VectorStoreIndex) -> list[BaseChatAg
         Expected Output: The processed data needed to respond to the user's query in a clear, concise, and relevant manner.
     '''
 
-    agent_logger.info("Creating Data Processing Agent...")    
-    data_processing_agent = AssistantAgent(
+    agent_logger.info("Defining Data Processing Agent...")    
+    data_processing_agent = AgentDefinition(
         name="Data_Processing_Agent",
         description=dp_agent_message,
-        model_client=model_client,
         system_message=dp_agent_message,
     )
 
@@ -146,12 +216,11 @@ def create_agents(model_client: str, index: VectorStoreIndex) -> list[BaseChatAg
         Expected Output: The calculated geometric mean.
     '''
 
-    agent_logger.info("Creating Geometric Mean Agent...")
-    geometric_mean_agent = AssistantAgent(
+    agent_logger.info("Defining Geometric Mean Agent...")
+    geometric_mean_agent = AgentDefinition(
         name="Geometric_Mean_Agent",
         description="You are a Geometric Mean Agent.",
-        model_client=model_client,
-        tools=[GeometricMeanTool()],
+        tools=(GeometricMeanTool(),),
         system_message=geometric_mean_agent_message
     )
 
@@ -0,0 +1,150 @@
+"""
+Model calls and latency of the knowledge base searches of the Database Access Agent:
+through the ReActAgent (`knowledge_search=react`) against the retriever directly
+(`knowledge_search=direct`).
+
+The documents of `--knowledge-base` are indexed with mock embeddings (or
+`--embed-model`, e.g. "local:all-MiniLM-L6-v2"). The ReActAgent runs on a scripted
+LLM taking `--model-latency-ms` per call: a first call asking for the knowledge tool,
+a second one answering with the observation, the shortest loop of a ReAct search.
+The calls of the team's agents are the same in both modes and are not counted.
+
+    python -m autogen_project.benchmarks.knowledge_search --queries 20 --model-latency-ms 400
+"""
+import json
+import time
+import asyncio
+import argparse
+from typing import Any
+from autogen_core import CancellationToken
+from autogen_ext.models.replay import ReplayChatCompletionClient
+from llama_index.core import VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.llms import CompletionResponse, CompletionResponseGen, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.tools import RetrieverTool, ToolMetadata
+from llama_index.core.utils import get_tokenizer
+from autogen_project.agents import database_retriever_agent, direct_retriever_agent
+from autogen_project.loader import load_documents_from_folder
+from autogen_project.settings import settings
+
+
+QUERIES = [
+    "What is the salary of John Doe?",
+    "Where does Jane Smith live and what is her job?",
+    "Which programming languages do the users know?",
+    "What are the hobbies of John Doe?",
+]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+class ScriptedReActLLM(CustomLLM):
+    """Asks for the knowledge tool, then answers with (the beginning of) its observation."""
+
+    latency: float = 0.4
+    max_answer_chars: int = 400
+    calls: int = 0
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="scripted-react")
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        time.sleep(self.latency)
+        self.calls += 1
+        if self.calls % 2:
+            query = prompt.rsplit("user:", 1)[-1].strip().split("\n")[0]
+            return CompletionResponse(text=(
+                "Thought: I need to use a tool to help me answer the question.\n"
+                f"Action: knowledge\nAction Input: {json.dumps({'input': query})}"
+            ))
+        observation = prompt.rsplit("Observation:", 1)[-1].strip()
+        return CompletionResponse(text=(
+            "Thought: I can answer without using any more tools.\n"
+            f"Answer: {observation[:self.max_answer_chars]}"
+        ))
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        yield self.complete(prompt, formatted=formatted, **kwargs)
+
+
+async def measure(mode: str, agent, llm: ScriptedReActLLM, queries: list[str]) -> dict:
+    tokenizer = get_tokenizer()
+    latencies, result_tokens = [], []
+    calls = llm.calls
+    for query in queries:
+        await agent.on_reset(CancellationToken())
+        start = time.perf_counter()
+        result = await agent._search_knowledge_base(query)
+        latencies.append(1000 * (time.perf_counter() - start))
+        result_tokens.append(len(tokenizer(result)))
+    return {
+        "mode": mode,
+        "queries": len(queries),
+        "model_calls": (llm.calls - calls) / len(queries),
+        "result_tokens": sum(result_tokens) / len(result_tokens),
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+    }
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    documents = load_documents_from_folder(args.knowledge_base)
+    index = VectorStoreIndex.from_documents(documents, embed_model=args.embed_model or MockEmbedding(embed_dim=8))
+    llm = ScriptedReActLLM(latency=args.model_latency_ms / 1000, max_answer_chars=4 * settings.max_tokens)
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+
+    # The agents' own model client is not called by the search
+    agent_kwargs = dict(
+        name="Database_Access_Agent",
+        description="Database Access Agent",
+        system_message="You are a Database Access Agent.",
+        model_client=ReplayChatCompletionClient([]),
+    )
+    knowledge_tool = RetrieverTool(
+        retriever=index.as_retriever(),
+        metadata=ToolMetadata(name="knowledge", description="A tool to retrieve knowledge about"),
+    )
+    react_agent = database_retriever_agent(knowledge_tool, llm)(**agent_kwargs)
+    direct_agent = direct_retriever_agent(
+        index.as_retriever(similarity_top_k=args.top_k), args.max_tokens,
+    )(**agent_kwargs)
+    return [
+        await measure("react", react_agent, llm, queries),
+        await measure("direct", direct_agent, llm, queries),
+    ]
+
+
+def print_table(rows: list[dict], latency: float) -> None:
+    print(f"Model latency: {latency:.0f} ms per call\n")
+    print("| search | queries | model calls / query | result tokens | mean ms | p50 ms | p95 ms |")
+    print("|---|---|---|---|---|---|---|")
+    for row in rows:
+        print(f"| {row['mode']} | {row['queries']} | {row['model_calls']:.1f} | {row['result_tokens']:.0f} | "
+              f"{row['mean_ms']:.1f} | {row['p50_ms']:.1f} | {row['p95_ms']:.1f} |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model calls and latency of the knowledge base searches, ReAct against direct.")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--model-latency-ms", type=float, default=400, help="Latency of each (scripted) ReAct LLM call.")
+    parser.add_argument("--knowledge-base", default=settings.knowledge_base_path)
+    parser.add_argument("--embed-model", help="Embedding model of the index, mock embeddings by default.")
+    parser.add_argument("--top-k", type=int, default=settings.retriever_top_k)
+    parser.add_argument("--max-tokens", type=int, default=settings.retriever_max_tokens)
+    parser.add_argument("--output", help="Append the results to this JSONL file.")
+    args = parser.parse_args()
+
+    rows = asyncio.run(main(args))
+    print_table(rows, args.model_latency_ms)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps({**row, "model_latency_ms": args.model_latency_ms}) + "\n")
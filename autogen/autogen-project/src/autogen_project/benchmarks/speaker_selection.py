@@ -0,0 +1,158 @@
+"""
+Model calls and latency per query of the speaker selection: the model selecting every
+speaker (the SelectorGroupChat default) against the `DelegationSelector` rules.
+
+Each query runs the fixed flow of the team, Customer_Support -> Database_Access ->
+Data_Processing -> Geometric_Mean (a tool call) -> Data_Processing, on a scripted model
+client: the agents answer as the prompts ask, delegating in the
+"<agent_name>, <task_description>" format, and the selector calls (when the model
+selects) return the next agent of the flow. Every call takes `--model-latency-ms`,
+so the latency measured is the one of the model calls and the team overhead.
+
+    python -m autogen_project.benchmarks.speaker_selection --queries 20 --model-latency-ms 400
+"""
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, AsyncGenerator, Mapping, Sequence
+from autogen_core import FunctionCall
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage, ModelInfo, RequestUsage
+from llama_index.core import VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from autogen_project.team import TeamFactory, TeamPool
+
+
+# The flow of a query: (agent, first line of its system message, reply)
+FLOW = [
+    ("Customer_Support_Agent", "You are the User Agent.",
+     "- Database Access Agent, retrieve the salaries of John Doe and Jane Doe.\n"
+     "- Data Processing Agent, calculate the geometric mean of the two salaries."),
+    ("Database_Access_Agent", "You are a Database Access Agent.",
+     "John Doe earns 50000 and Jane Doe earns 60000 (salaries.csv).\n"
+     "- Data Processing Agent, calculate the geometric mean of the two salaries."),
+    ("Data_Processing_Agent", "You are a Data Processing Agent.",
+     "- Geometric Mean Agent, calculate the geometric mean of 50000 and 60000."),
+    ("Geometric_Mean_Agent", "You are a Geometric Mean Agent.",
+     FunctionCall(id="call-0", name="calculate_geometric_mean", arguments='{"numbers": [50000, 60000]}')),
+    ("Data_Processing_Agent", "You are a Data Processing Agent.",
+     "The geometric mean of the salaries of John Doe and Jane Doe is 54772.26. TERMINATE"),
+]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+class ScriptedModelClient(ChatCompletionClient):
+    """Answers the calls of one query of the FLOW at a time (`start` before each query)."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.turn = 0
+        self.agent_calls = 0
+        self.selector_calls = 0
+        self.prompt_tokens = 0
+
+    def start(self) -> None:
+        self.turn = 0
+
+    async def create(self, messages: Sequence[LLMMessage], **kwargs: Any) -> CreateResult:
+        await asyncio.sleep(self.latency)
+        prompt = "\n".join(str(message.content) for message in messages)
+        usage = RequestUsage(prompt_tokens=len(prompt) // 4, completion_tokens=5)
+        self.prompt_tokens += usage.prompt_tokens
+        if "select the next role" in prompt:
+            self.selector_calls += 1
+            return CreateResult(finish_reason="stop", content=FLOW[self.turn][0], usage=usage, cached=False)
+
+        agent, system_message, reply = FLOW[self.turn]
+        if system_message not in str(messages[0].content):
+            raise RuntimeError(f"Turn {self.turn} should be the one of {agent}, the selection diverged from the flow")
+        self.agent_calls += 1
+        self.turn += 1
+        if isinstance(reply, FunctionCall):
+            return CreateResult(finish_reason="function_calls", content=[reply], usage=usage, cached=False)
+        return CreateResult(finish_reason="stop", content=reply, usage=usage, cached=False)
+
+    async def create_stream(self, messages: Sequence[LLMMessage], **kwargs: Any) -> AsyncGenerator[str | CreateResult, None]:
+        yield await self.create(messages, **kwargs)
+
+    async def close(self) -> None:
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    def total_usage(self) -> RequestUsage:
+        return RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    def count_tokens(self, messages: Sequence[LLMMessage], **kwargs: Any) -> int:
+        return 0
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], **kwargs: Any) -> int:
+        return 128000
+
+    @property
+    def capabilities(self) -> Mapping[str, Any]:
+        return self.model_info
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return {"vision": False, "function_calling": True, "json_output": False, "family": "unknown", "structured_output": False}
+
+
+async def measure(speaker_selection: str, args: argparse.Namespace) -> dict:
+    model_client = ScriptedModelClient(args.model_latency_ms / 1000)
+    index = VectorStoreIndex([], embed_model=MockEmbedding(embed_dim=8))
+    factory = TeamFactory(model_client, index, speaker_selection=speaker_selection)
+    pool = TeamPool(factory.create_team, size=1)
+
+    latencies = []
+    for i in range(args.queries):
+        model_client.start()
+        start = time.perf_counter()
+        async with pool.team() as team:
+            result = await team.run(task=f"Calculate the geometric mean of the John Doe salary and the Jane Doe salary. ({i})")
+        latencies.append(1000 * (time.perf_counter() - start))
+        if "TERMINATE" not in str(result.messages[-1].content):
+            raise RuntimeError(f"Query {i} did not complete: {result.stop_reason}")
+    return {
+        "selection": speaker_selection,
+        "queries": args.queries,
+        "agent_calls": model_client.agent_calls / args.queries,
+        "selector_calls": model_client.selector_calls / args.queries,
+        "prompt_tokens": model_client.prompt_tokens / args.queries,
+        "fallbacks": factory.selector.fallbacks / args.queries if factory.selector else None,
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+    }
+
+
+def print_table(rows: list[dict], latency: float) -> None:
+    print(f"Model latency: {latency:.0f} ms per call\n")
+    print("| selection | queries | model calls / query | selector calls / query | prompt tokens / query | "
+          "rule fallbacks / query | mean ms | p50 ms | p95 ms |")
+    print("|---|---|---|---|---|---|---|---|---|")
+    for row in rows:
+        fallbacks = "-" if row["fallbacks"] is None else f"{row['fallbacks']:.1f}"
+        print(f"| {row['selection']} | {row['queries']} | {row['agent_calls'] + row['selector_calls']:.1f} | "
+              f"{row['selector_calls']:.1f} | {row['prompt_tokens']:.0f} | {fallbacks} | {row['mean_ms']:.0f} | "
+              f"{row['p50_ms']:.0f} | {row['p95_ms']:.0f} |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model calls and latency per query, model against rule-driven speaker selection.")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--model-latency-ms", type=float, default=400, help="Latency of each (scripted) model call.")
+    parser.add_argument("--output", help="Append the results to this JSONL file.")
+    args = parser.parse_args()
+
+    rows = [asyncio.run(measure(selection, args)) for selection in ("model", "rules")]
+    print_table(rows, args.model_latency_ms)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps({**row, "model_latency_ms": args.model_latency_ms}) + "\n")
@@ -0,0 +1,108 @@
+"""
+Per-request overhead of the agent team: a new team with new agents per request (the
+previous `create_agents` per query) against a team lent by the `TeamPool`.
+
+Each request takes a team, runs a one-turn task and gives the team back. No model is
+called (a replay client answers instantly and the index is empty, with mock
+embeddings), so the time measured is the overhead of the team: its setup, the start of
+its runtime, and its reset when pooled. The memory allocated per request is measured
+in a second pass, with tracemalloc.
+
+    python -m autogen_project.benchmarks.team_setup --requests 200
+"""
+import json
+import time
+import asyncio
+import argparse
+import tracemalloc
+from contextlib import asynccontextmanager
+from autogen_agentchat.conditions import TextMentionTermination
+from autogen_agentchat.teams import SelectorGroupChat
+from autogen_ext.models.replay import ReplayChatCompletionClient
+from llama_index.core import VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from autogen_project.agents import create_agents
+from autogen_project.team import TeamFactory, TeamPool
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+async def request(setup, task: str) -> None:
+    async with setup() as team:
+        await team.run(task=task)
+
+
+async def measure(name: str, setup, requests: int) -> dict:
+    """Time and memory allocated per request, `setup()` being an async context manager giving the team."""
+    latencies = []
+    for i in range(requests):
+        start = time.perf_counter()
+        await request(setup, f"Question {i}")
+        latencies.append(1000 * (time.perf_counter() - start))
+
+    allocated = []
+    for i in range(max(requests // 10, 1)):
+        tracemalloc.start()
+        await request(setup, f"Question {i}")
+        allocated.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "setup": name,
+        "requests": requests,
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "peak_kb": sum(allocated) / len(allocated) / 1024,
+    }
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    # Each run: the selector picks the User Agent, which answers and terminates
+    turns = 2 * (args.requests + max(args.requests // 10, 1)) * 2
+    model_client = ReplayChatCompletionClient(["Customer_Support_Agent", "Done. TERMINATE"] * turns, model_info={
+        "vision": False, "function_calling": True, "json_output": False, "family": "unknown", "structured_output": False,
+    })
+    index = VectorStoreIndex([], embed_model=MockEmbedding(embed_dim=8))
+    # The model selects the speakers, as in the new teams (the replay script answers the selector call)
+    factory = TeamFactory(model_client, index, speaker_selection="model")
+    pool = TeamPool(factory.create_team, size=1)
+
+    @asynccontextmanager
+    async def new_team():
+        # The previous setup: new agents (and, with knowledge_search=react, a new ReActAgent) per request
+        yield SelectorGroupChat(
+            participants=create_agents(model_client, index),
+            model_client=model_client,
+            termination_condition=TextMentionTermination("TERMINATE"),
+            allow_repeated_speaker=True,
+        )
+
+    return [
+        await measure("new team per request", new_team, args.requests),
+        await measure("pooled team", pool.team, args.requests),
+    ]
+
+
+def print_table(rows: list[dict]) -> None:
+    print("| team | requests | mean ms | p50 ms | p95 ms | peak allocated KB |")
+    print("|---|---|---|---|---|---|")
+    for row in rows:
+        print(f"| {row['setup']} | {row['requests']} | {row['mean_ms']:.2f} | {row['p50_ms']:.2f} | "
+              f"{row['p95_ms']:.2f} | {row['peak_kb']:.0f} |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-request overhead of the agent team, new against pooled (no model calls).")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--output", help="Append the results to this JSONL file.")
+    args = parser.parse_args()
+
+    rows = asyncio.run(main(args))
+    print_table(rows)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
@@ -1,20 +1,64 @@
+from typing import Optional
 from llama_index.core.agent import ReActAgent
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.utils import get_tokenizer
 from autogen_agentchat.agents import BaseChatAgent, AssistantAgent
+from autogen_core import CancellationToken
 from autogen_core.tools import FunctionTool
 
 class DatabaseRetrieverAgent(AssistantAgent):
-    def __init__(self, *args, react_agent: ReActAgent, **kwargs) -> None:
+    """
+    Assistant agent with a tool searching the knowledge base, either:
+    - with a ReActAgent (`react_agent`), which answers the query from the knowledge tool
+      with its own LLM calls;
+    - directly with a `retriever` (no LLM call): the tool returns the top chunks found,
+      with their scores, within `max_result_tokens`.
+    """
+
+    def __init__(self, *args, react_agent: Optional[ReActAgent] = None, retriever: Optional[BaseRetriever] = None,
+                 max_result_tokens: int = 1000, **kwargs) -> None:
+        if (react_agent is None) == (retriever is None):
+            raise ValueError("DatabaseRetrieverAgent needs either a react_agent or a retriever.")
         super().__init__(*args, **kwargs)
         self._react_agent = react_agent
+        self._retriever = retriever
+        self._max_result_tokens = max_result_tokens
         # define the knowledge base search as a tool of this agent
         self._tools.append(
             FunctionTool(
-                self._search_knowledge_base, name="search_knowledge_base", 
+                self._search_knowledge_base, name="search_knowledge_base",
                 description="Call this to search the knowledge base for needed information."
             )
         )
 
+    async def on_reset(self, cancellation_token: CancellationToken) -> None:
+        await super().on_reset(cancellation_token)
+        # the ReActAgent keeps the searches of the conversation in its own memory
+        if self._react_agent is not None:
+            self._react_agent.reset()
+
     async def _search_knowledge_base(self, query: str) -> str:
+        if self._retriever is not None:
+            return await self._retrieve(query)
         result = await self._react_agent.achat(query)
         return result.response
-    
\ No newline at end of file
+
+    async def _retrieve(self, query: str) -> str:
+        """The chunks found for `query`, best first, cut to `max_result_tokens` tokens."""
+        nodes = await self._retriever.aretrieve(query)
+        if not nodes:
+            return "No relevant information found in the knowledge base."
+
+        tokenizer = get_tokenizer()
+        chunks, budget = [], self._max_result_tokens
+        for i, node in enumerate(sorted(nodes, key=lambda node: node.score or 0, reverse=True), start=1):
+            text = node.get_content().strip()
+            tokens = len(tokenizer(text))
+            if tokens > budget:
+                # The last chunk that fits partly: keep its beginning
+                text = text[:len(text) * budget // tokens]
+            if not text:
+                break
+            chunks.append(f"[{i}] (score {node.score or 0:.2f})\n{text}")
+            budget -= min(tokens, budget)
+        return "\n\n".join(chunks)
@@ -15,7 +15,8 @@ from autogen_agentchat.teams import (
 )
 from autogen_agentchat.ui import Console
 from autogen_project.loader import load_documents_from_folder
-from autogen_project.agents import create_agents
+from autogen_project.team import TeamFactory, TeamPool
+from autogen_project.rate_limit import RateLimiter, RateLimitedChatCompletionClient
 from autogen_project.index import create_index
 from autogen_project.settings import settings
 from autogen_ext.models.openai import OpenAIChatCompletionClient
@@ -35,12 +36,20 @@ main_logger = logging.getLogger("main")
 main_logger.debug("Debug Mode Active")
 # main_logger.setLevel(logging.INFO)
 
-model_client = OpenAIChatCompletionClient(
-                    model=settings.openai_model_name,
-                    api_key=settings.openai_api_key.get_secret_value(),
-                    temperature=settings.temperature,
-                    max_tokens=settings.max_tokens,
-                )
+# Requests and tokens per minute of the model, shared by all the agents and queries
+rate_limiter = RateLimiter(settings.rate_limit_rpm, settings.rate_limit_tpm, max_retries=settings.rate_limit_max_retries)
+
+model_client = RateLimitedChatCompletionClient(
+    OpenAIChatCompletionClient(
+        model=settings.openai_model_name,
+        api_key=settings.openai_api_key.get_secret_value(),
+        temperature=settings.temperature,
+        max_tokens=settings.max_tokens,
+        max_retries=0, # the 429s are retried by the rate limiter, with the server's reset hints
+    ),
+    rate_limiter,
+    max_tokens=settings.max_tokens,
+)
 
 # Load the documents
 documents = load_documents_from_folder(settings.knowledge_base_path)
@@ -48,16 +57,15 @@ documents = load_documents_from_folder(settings.knowledge_base_path)
 # Create the index
 index = create_index(documents)
 
-# Create the agents
-agents = create_agents(model_client, index)
-user_agent = agents[0] # hardcoded: user agent is the first one in the list
+# Define the agents once, the teams are created from these definitions
+team_factory = TeamFactory(model_client, index, speaker_selection=settings.speaker_selection)
 
-groupchat = SelectorGroupChat(     # this GroupChat only allows for ChatAgents. Some operations
-    participants=agents,           # might be more efficient if we use other types of agents.
-    model_client=model_client,     # e.g. ToolAgent, to execute tool calls.
-    termination_condition=TextMentionTermination("TERMINATE"), # Important! - otherwise the chat will never end
-    allow_repeated_speaker=True,
-)
+# this GroupChat only allows for ChatAgents. Some operations might be more efficient
+# if we use other types of agents. e.g. ToolAgent, to execute tool calls.
+groupchat = team_factory.create_team()
+
+# Teams of the API requests, one request per team at a time
+team_pool = TeamPool(team_factory.create_team, size=settings.team_pool_size, max_size=settings.team_pool_max_size)
 
 # ----------------------------------------------
 
@@ -75,32 +83,25 @@ async def query_agent(request: QueryRequest):
     """
     Handle incoming chat requests asynchronously.
     """
-    async def run_with_new_groupchat(task):
-        groupchat = SelectorGroupChat(
-            participants=create_agents(model_client, index),
-            model_client=model_client,
-            termination_condition=TextMentionTermination("TERMINATE"),
-            allow_repeated_speaker=True,
-        )
-        return await groupchat.run(task=task)
+    async def run_with_pooled_team(task):
+        async with team_pool.team() as team:
+            return await team.run(task=task)
     
     queries = request.query
     times = []
     for i in range(settings.num_iterations):
         start = time.time()
         results = await asyncio.gather(
-            *(run_with_new_groupchat(task=query) for query in queries)
-            # NOTE: we have to create a new groupchat with new agents for each query
+            *(run_with_pooled_team(task=query) for query in queries)
+            # NOTE: each query gets its own team from the pool, reset after use, so
+            # queries never share agent state
         )
         times.append(time.time() - start)
         
-        if i < settings.num_iterations-1:
-            main_logger.info(
-                f"Completed iteration: {i+1}/{settings.num_iterations}, \
-                took {times[-1]:.2f} seconds to process.\n \
-                Sleeping for 60 seconds to avoid token limit..."
-            )
-            time.sleep(60) # to make sure we don't hit the token limit
+        main_logger.info(
+            f"Completed iteration: {i+1}/{settings.num_iterations}, took {times[-1]:.2f} seconds to process "
+            f"({rate_limiter.waited:.0f}s waited for the rate limits so far, {rate_limiter.rate_limited} requests rate-limited)."
+        )
     
     print(
         f'''
@@ -0,0 +1,209 @@
+import re
+import time
+import random
+import asyncio
+import threading
+from logging import getLogger
+from typing import Any, AsyncGenerator, Awaitable, Callable, Mapping, Optional, Sequence, TypeVar, Union
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage, ModelInfo, RequestUsage
+from autogen_core.tools import Tool, ToolSchema
+
+
+rate_limit_logger = getLogger("rate_limit")
+
+T = TypeVar("T")
+
+DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Seconds of an OpenAI reset hint: "20ms", "1s", "6m0s", or a plain number of seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def reset_hint(error: BaseException) -> Optional[float]:
+    """
+    Seconds to wait before retrying a rate-limited (429) request, from the response headers:
+    `retry-after-ms` or `retry-after` when the server sends them; otherwise the reset of the
+    limit (requests or tokens) whose `x-ratelimit-remaining-*` is 0, or the later of both
+    resets when both limits are exhausted or the remaining counts are missing.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if headers.get("retry-after"):
+        hint = parse_duration(headers["retry-after"])
+        if hint is not None:
+            return hint
+
+    limits = ("requests", "tokens")
+    exhausted = [limit for limit in limits if headers.get(f"x-ratelimit-remaining-{limit}", "").strip() == "0"]
+    if len(exhausted) != 1:
+        exhausted = limits
+    hints = [parse_duration(headers[f"x-ratelimit-reset-{limit}"])
+             for limit in exhausted if headers.get(f"x-ratelimit-reset-{limit}")]
+    hints = [hint for hint in hints if hint is not None]
+    return max(hints) if hints else None
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    # openai.RateLimitError, and the errors of the clients wrapping it, carry the HTTP status
+    return getattr(error, "status_code", None) == 429
+
+
+class _TokenBucket:
+    """Holds up to `per_minute` units, refilled continuously at `per_minute` units per minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` units (the level may go negative) and return the wait until they are refilled."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+
+class RateLimiter:
+    """
+    Client-side limit of the requests per minute (RPM) and tokens per minute (TPM) of a
+    model deployment, shared by all the model clients of the process.
+
+    Each call reserves one request and its estimated tokens (prompt + max completion
+    tokens, which is what the API counts against the limit) and waits until both
+    buckets have refilled enough: the calls queue in arrival order and start at the
+    highest rate the limits sustain, instead of failing. A 429 answer pauses every call
+    until the reset announced by the server (or an exponential backoff without hint),
+    then the call is retried, up to `max_retries` times.
+
+    The waits never block: `acall` sleeps on the event loop, `call` (for the clients
+    calling the model from worker threads) sleeps in its thread.
+    """
+
+    def __init__(self, rpm: float, tpm: float, max_retries: int = 5, max_backoff: float = 60.0):
+        self.requests = _TokenBucket(rpm)
+        self.tokens = _TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.waited = 0.0
+        self.rate_limited = 0
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.requests.reserve(1, now), self.tokens.reserve(tokens, now), self._paused_until - now)
+            self.waited += max(wait, 0.0)
+            return max(wait, 0.0)
+
+    def _pause(self, error: BaseException, attempt: int) -> None:
+        hint = reset_hint(error)
+        if hint is None:
+            hint = min(self.max_backoff, 2 ** attempt) * random.uniform(0.5, 1.0)
+        with self._lock:
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + hint)
+        rate_limit_logger.warning(f"Rate limited (attempt {attempt + 1}/{self.max_retries + 1}), pausing for {hint:.1f}s")
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], tokens: int) -> T:
+        """Await `fn()` (a model call estimated at `tokens` tokens) within the limits."""
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self._reserve(tokens))
+            try:
+                return await fn()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                self._pause(e, attempt)
+        raise AssertionError("unreachable")
+
+    def call(self, fn: Callable[[], T], tokens: int) -> T:
+        """Call `fn()` (a model call estimated at `tokens` tokens) within the limits."""
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self._reserve(tokens))
+            try:
+                return fn()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                self._pause(e, attempt)
+        raise AssertionError("unreachable")
+
+
+class RateLimitedChatCompletionClient(ChatCompletionClient):
+    """
+    Model client calling the wrapped client within the limits of a shared `RateLimiter`.
+    Give the wrapped client `max_retries=0`, so the 429 answers (and their reset hints)
+    reach the limiter instead of being retried blindly.
+    """
+
+    def __init__(self, client: ChatCompletionClient, limiter: RateLimiter, max_tokens: int):
+        self._client = client
+        self._limiter = limiter
+        self._max_tokens = max_tokens
+
+    def _estimate(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema]) -> int:
+        try:
+            prompt_tokens = self._client.count_tokens(messages, tools=tools)
+        except Exception:
+            # No tokenizer for the model: about 4 characters per token
+            prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        return prompt_tokens + self._max_tokens
+
+    async def create(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = [],
+                     **kwargs: Any) -> CreateResult:
+        return await self._limiter.acall(
+            lambda: self._client.create(messages, tools=tools, **kwargs), self._estimate(messages, tools)
+        )
+
+    async def create_stream(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = [],
+                            **kwargs: Any) -> AsyncGenerator[Union[str, CreateResult], None]:
+        async def start() -> tuple[AsyncGenerator, Union[str, CreateResult]]:
+            stream = self._client.create_stream(messages, tools=tools, **kwargs)
+            return stream, await stream.__anext__()
+
+        # The 429 answer comes before the first chunk: a rate-limited stream is restarted
+        stream, first = await self._limiter.acall(start, self._estimate(messages, tools))
+        yield first
+        async for chunk in stream:
+            yield chunk
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    def actual_usage(self) -> RequestUsage:
+        return self._client.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self._client.total_usage()
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._client.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._client.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self) -> Mapping[str, Any]:
+        return self._client.capabilities
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self._client.model_info
@@ -0,0 +1,76 @@
+import re
+from logging import getLogger
+from typing import Mapping, Optional, Sequence
+from autogen_agentchat.messages import ToolCallSummaryMessage
+
+
+selector_logger = getLogger("selector")
+
+# A delegation line: "- <agent_name>, <task_description>" (the bullet and some markdown are optional)
+DELEGATION = re.compile(r"^[\s>*_`#-]*(?:\d+[.)]\s*)?([A-Za-z][A-Za-z _]*?)[\s*_`]*[,:]\s*\S", re.MULTILINE)
+
+# Default next speaker of the agents whose turn ends with a tool result, which carries no delegation:
+# the Database Access and Geometric Mean agents hand their data to the Data Processing Agent
+HANDOFFS = {
+    "Database_Access_Agent": "Data_Processing_Agent",
+    "Geometric_Mean_Agent": "Data_Processing_Agent",
+}
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+class DelegationSelector:
+    """
+    Selector function of the SelectorGroupChat choosing the next speaker from the
+    delegation format the agents' prompts mandate, "<agent_name>, <task_description>",
+    without calling the model:
+
+    - the task (a message from outside the team) goes to the orchestrator;
+    - a message delegating to an agent (its first delegation line naming another
+      participant, by its name or with spaces, e.g. "Database Access Agent") selects it;
+    - a tool result selects the `handoffs` of its agent.
+
+    Otherwise it returns None, and the SelectorGroupChat selects the speaker with the model.
+    """
+
+    def __init__(self, participants: Sequence[str], handoffs: Mapping[str, str] = HANDOFFS):
+        """
+        Args:
+            participants: Names of the agents of the team, the orchestrator first.
+            handoffs: Next speaker after a tool result of an agent.
+        """
+        self.participants = list(participants)
+        self.handoffs = {agent: next_agent for agent, next_agent in handoffs.items() if next_agent in self.participants}
+        self._names = {_normalize(name): name for name in self.participants}
+        self.selected = 0
+        self.fallbacks = 0
+
+    def delegate(self, text: str, source: str) -> Optional[str]:
+        """The agent the first delegation line of `text` names, other than its `source`."""
+        for match in DELEGATION.finditer(text):
+            # "Database Access Agent, ..." or e.g. "Delegating to Database Access Agent: ..."
+            phrase = _normalize(match.group(1))
+            for key, name in self._names.items():
+                if phrase.endswith(key) and name != source:
+                    return name
+        return None
+
+    def select(self, message) -> Optional[str]:
+        if message.source not in self.participants:
+            return self.participants[0]
+        if isinstance(message, ToolCallSummaryMessage):
+            return self.handoffs.get(message.source)
+        return self.delegate(message.content, message.source)
+
+    def __call__(self, thread: Sequence) -> Optional[str]:
+        # The last chat message of the thread (the inner events of the turn come before it)
+        message = next((message for message in reversed(thread) if isinstance(getattr(message, "content", None), str)), None)
+        speaker = self.select(message) if message is not None else None
+        if speaker is None:
+            self.fallbacks += 1
+            selector_logger.info(f"No delegation in the message of {getattr(message, 'source', None)}, selecting with the model")
+        else:
+            self.selected += 1
+        return speaker
@@ -13,6 +13,15 @@ class Settings(BaseSettings):
     api_port: int = 8000
     knowledge_base_path: str = "./knowledge-base"
     num_iterations: int = 1
+    team_pool_size: int = 4
+    team_pool_max_size: int = 32
+    rate_limit_rpm: int = 500
+    rate_limit_tpm: int = 200000
+    rate_limit_max_retries: int = 5
+    speaker_selection: str = "rules"
+    knowledge_search: str = "direct"
+    retriever_top_k: int = 5
+    retriever_max_tokens: int = 1000
 
     class Config:
         env_file = ".env"
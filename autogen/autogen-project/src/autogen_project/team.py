@@ -0,0 +1,104 @@
+import asyncio
+from logging import getLogger
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional
+from autogen_agentchat.base import Team
+from autogen_agentchat.conditions import TextMentionTermination
+from autogen_agentchat.teams import SelectorGroupChat
+from autogen_core.models import ChatCompletionClient
+from llama_index.core import VectorStoreIndex
+from autogen_project.agents import AgentDefinition, agent_definitions
+from autogen_project.selector import DelegationSelector
+
+
+team_logger = getLogger("team")
+
+# "rules": the next speaker is parsed from the delegations, the model selects it only when none is found
+# "model": the model selects every speaker
+SPEAKER_SELECTIONS = ("rules", "model")
+
+
+class TeamFactory:
+    """
+    Creates the SelectorGroupChat team of the agents. The agent definitions (prompts,
+    tools, LLM clients) are built once, so a new team only allocates the agents' state.
+    """
+
+    def __init__(self, model_client: ChatCompletionClient, index: VectorStoreIndex, speaker_selection: str = "rules"):
+        if speaker_selection not in SPEAKER_SELECTIONS:
+            raise ValueError(f"Unknown speaker selection '{speaker_selection}', expected one of {SPEAKER_SELECTIONS}.")
+        self.model_client = model_client
+        self.definitions: list[AgentDefinition] = agent_definitions(model_client, index)
+        # Stateless (but for its counters), so shared by the teams
+        self.selector = DelegationSelector([definition.name for definition in self.definitions]) \
+            if speaker_selection == "rules" else None
+
+    def create_team(self) -> SelectorGroupChat:
+        return SelectorGroupChat(
+            participants=[definition.create(self.model_client) for definition in self.definitions],
+            model_client=self.model_client,
+            termination_condition=TextMentionTermination("TERMINATE"), # Important! - otherwise the chat will never end
+            allow_repeated_speaker=True,
+            selector_func=self.selector,
+        )
+
+
+class TeamPool:
+    """
+    Pool of teams, each one used by a single request at a time: an agent keeps the
+    conversation in its model context, so concurrent requests cannot share one.
+
+    A request takes an idle team (a new one is created if none is idle and the pool
+    has less than `max_size` teams, otherwise it waits for one) and gives it back reset:
+    the agents' model contexts, the ReActAgent memory and the termination condition are
+    cleared, so the next request starts from a clean state without creating any agent.
+    """
+
+    def __init__(self, create_team: Callable[[], Team], size: int = 4, max_size: Optional[int] = None):
+        """
+        Args:
+            create_team: Creates a team, e.g. `TeamFactory.create_team`.
+            size: Teams created upfront.
+            max_size: Maximum number of teams, `size` if None.
+        """
+        self.create_team = create_team
+        self.max_size = max(max_size or size, size, 1)
+        self._idle: asyncio.Queue[Team] = asyncio.Queue()
+        self.created = 0
+        self.reused = 0
+        for _ in range(size):
+            self._idle.put_nowait(self._new_team())
+
+    def _new_team(self) -> Team:
+        self.created += 1
+        team_logger.info(f"Creating team {self.created}/{self.max_size}")
+        return self.create_team()
+
+    async def _acquire(self) -> Team:
+        if self._idle.empty() and self.created < self.max_size:
+            return self._new_team()
+        team = await self._idle.get()
+        self.reused += 1
+        return team
+
+    async def _release(self, team: Team) -> None:
+        try:
+            await team.reset()
+        except Exception:
+            # e.g. a run cancelled midway: the team may still be running, replace it (the
+            # requests waiting for a team would otherwise wait forever on a full pool)
+            team_logger.exception("Could not reset the team, replacing it")
+            self.created -= 1
+            team = self._new_team()
+        self._idle.put_nowait(team)
+
+    @asynccontextmanager
+    async def team(self) -> AsyncIterator[Team]:
+        """
+        Lend a team for one request, reset when it is given back.
+        """
+        team = await self._acquire()
+        try:
+            yield team
+        finally:
+            await self._release(team)
@@ -2,8 +2,8 @@ import os
 from logging import getLogger
 from crewai import Crew, Agent, Task, Process
 from crewai.project import CrewBase, agent, task, crew
-from langchain_openai import ChatOpenAI
 from .tools.geometric_mean_tool import GeometricMeanTool
+from .rate_limit import RateLimiter, RateLimitedLLM
 from .settings import settings
 from crewai_tools import (
     DirectoryReadTool,
@@ -16,8 +16,12 @@ agent_logger = getLogger("agent")
 class ChatBot():
 	"""ChatBot crew"""
 
-	llm = ChatOpenAI(
+	# Requests and tokens per minute of the model, shared by all the agents and queries
+	rate_limiter = RateLimiter(settings.rate_limit_rpm, settings.rate_limit_tpm, max_retries=settings.rate_limit_max_retries)
+
+	llm = RateLimitedLLM(
 		model=settings.openai_model_name, 
+		limiter=rate_limiter,
 		api_key=settings.openai_api_key.get_secret_value(),
 		temperature=settings.temperature,
 		max_tokens=settings.max_tokens,
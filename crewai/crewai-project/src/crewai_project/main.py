@@ -59,8 +59,10 @@ async def query_agent(request: QueryRequest):
         response = await crew.kickoff_for_each_async(inputs=[{"query": q} for q in query])
         times.append(time.time() - start)
         
-        if i < settings.num_iterations-1: 
-            time.sleep(60) # to make sure we don't hit the token limit
+        main_logger.info(
+            f"Completed iteration: {i+1}/{settings.num_iterations}, took {times[-1]:.2f} seconds to process "
+            f"({ChatBot.rate_limiter.waited:.0f}s waited for the rate limits so far, {ChatBot.rate_limiter.rate_limited} requests rate-limited)."
+        )
     
     main_logger.info(
         f"Queries took {sum(times)/len(times):.2f} seconds on average to process. \
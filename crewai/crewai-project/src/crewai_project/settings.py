@@ -12,6 +12,9 @@ class Settings(BaseSettings):
     api_port: int = 8000
     knowledge_base_path: str = "./knowledge-base"
     num_iterations: int = 1
+    rate_limit_rpm: int = 500
+    rate_limit_tpm: int = 200000
+    rate_limit_max_retries: int = 5
 
     class Config:
         env_file = ".env"
@@ -1,92 +1,262 @@
+import uuid
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from logging import getLogger
-from typing import cast
+from typing import Optional, cast
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from langchain_core.tools import BaseTool
 from langchain_openai import ChatOpenAI
 from langgraph_project.state import AgentState, Router
 from langgraph_project.agents.configuration import AgentsConfiguration
+from langgraph_project.agents.pre_router import PreRouter
+from langgraph_project.agents.context import PROMPT_TOOL_RESULT, ContextPolicy, message_tokens, truncate
+from langgraph_project.tools.retriever_tool import join_documents, split_documents
 from langgraph_project.agents.prompts import (
     EXECUTE_RAG_SYSTEM_PROMPT, 
     GENERAL_SYSTEM_PROMPT, 
     MORE_INFO_SYSTEM_PROMPT, 
     ROUTER_SYSTEM_PROMPT
 )
-from langchain_core.messages import ToolMessage
+from langchain_core.messages import AIMessage, ToolMessage
 
 agent_logger = getLogger("agents")
 
+# "reuse": the prefetched documents replace the RAG agent's tool call and search
+# "merge": they are added to the results of the RAG agent's own search
+SPECULATIVE_MODES = ("off", "reuse", "merge")
+
+# Threads of the speculative searches of the sync graph runs
+_speculation_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-retrieval")
+
 class BaseAgent:
-    def __init__(self, system_prompt: str, llm: ChatOpenAI = AgentsConfiguration.llm):
+    """
+    Graph node calling the LLM with the agent's prompt.
+
+    `__call__` is the sync implementation (graph.invoke/stream) and `acall` the async one
+    (graph.ainvoke/astream), so the event loop is never blocked by a model call. The config
+    is passed to the model, so its tokens can be streamed with stream_mode="messages".
+    Subclasses customise `_input` (prompt value), `_output` (state update) and `runnable`.
+    With a context policy, the prompt only gets the pruned conversation (`_messages`).
+    """
+
+    def __init__(self, system_prompt: str, llm: ChatOpenAI = AgentsConfiguration.llm,
+                 context: Optional[ContextPolicy] = None):
         self.llm = llm
+        self.context = context
+        self.runnable: Runnable = llm
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
             ("placeholder", "{messages}")
         ])
 
-    def __call__(self, state: AgentState, config: RunnableConfig):
-        agent_logger.info(f"{"-" * 12} {self.__class__.__name__} responding ... {"-" * 12}")
+    def _messages(self, state: AgentState) -> list:
         messages = state["messages"]
-        response = self.llm.invoke(self.prompt.format(messages=messages))
+        return self.context.prune(messages) if self.context is not None else messages
+
+    def _input(self, state: AgentState):
+        return self.prompt.format(messages=self._messages(state))
+
+    def _output(self, response) -> dict:
         return {"messages": response}
 
+    def __call__(self, state: AgentState, config: RunnableConfig):
+        agent_logger.info(f"{"-" * 12} {self.__class__.__name__} responding ... {"-" * 12}")
+        return self._output(self.runnable.invoke(self._input(state), config))
+
+    async def acall(self, state: AgentState, config: RunnableConfig):
+        agent_logger.info(f"{"-" * 12} {self.__class__.__name__} responding ... {"-" * 12}")
+        return self._output(await self.runnable.ainvoke(self._input(state), config))
+
+    def as_node(self) -> RunnableLambda:
+        """Node running `__call__` for sync graph runs and `acall` for async ones."""
+        return RunnableLambda(self.__call__, afunc=self.acall, name=self.__class__.__name__)
+
 
 class Orchestrator(BaseAgent):
-    def __init__(self, llm: ChatOpenAI = AgentsConfiguration.llm):
-        super().__init__(ROUTER_SYSTEM_PROMPT, llm)
+    """
+    Classifies the query. With a pre-router, the queries it can decide locally (rules,
+    kNN on labelled examples) skip the LLM call, the others are classified by the LLM.
+
+    With a `prefetch` tool, the search for the raw query runs concurrently with the
+    classification (speculative retrieval). Its documents are kept in the state
+    ("prefetched") when the route is `user`, and dropped otherwise. It is not started
+    when the pre-router routes elsewhere. Only the async runs can stop a search that is no
+    longer needed: in the sync runs, a search already started in `_speculation_pool` (one
+    of its 8 threads) runs to its end, embeddings call included, and its result is dropped.
+    """
+
+    def __init__(self, llm: ChatOpenAI = AgentsConfiguration.llm, pre_router: Optional[PreRouter] = None,
+                 prefetch: Optional[BaseTool] = None, context: Optional[ContextPolicy] = None):
+        super().__init__(ROUTER_SYSTEM_PROMPT, llm, context)
+        self.runnable = llm.with_structured_output(Router)
+        self.pre_router = pre_router
+        self.prefetch = prefetch
+        # used / discarded / failed speculative searches
+        self.speculation_stats: Counter = Counter()
+
+    def _output(self, response) -> dict:
+        return {"message": cast(Router, response)}
+
+    def _pre_route(self, query: Optional[str]) -> Optional[dict]:
+        if self.pre_router is None or query is None:
+            return None
+        route = self.pre_router(query)
+        return None if route is None else {"message": route}
+
+    @staticmethod
+    def _query(state: AgentState) -> Optional[str]:
+        query = state["messages"][-1].content
+        return query if isinstance(query, str) else None
+
+    def _speculate(self, update: Optional[dict], query: Optional[str]) -> bool:
+        """Whether to search ahead: there is a query and the route may still be `user`."""
+        return self.prefetch is not None and query is not None and (update is None or update["message"]["type"] == "user")
+
+    def _with_prefetched(self, update: dict, documents: Optional[str]) -> dict:
+        if self.prefetch is None:
+            return update
+        # Always written, so a thread never reuses the documents of a previous query
+        return {**update, "prefetched": documents}
 
     def __call__(self, state: AgentState, config: RunnableConfig):
-        agent_logger.info(f"{"-" * 12} {self.__class__.__name__} responding ... {"-" * 12}")
-        messages = state["messages"]
-        response = cast(
-            Router, self.llm.with_structured_output(Router).invoke(self.prompt.format(messages=messages))
-        )
-        return {"message": response}
+        query = self._query(state)
+        update = self._pre_route(query)
+        if not self._speculate(update, query):
+            return self._with_prefetched(update or super().__call__(state, config), None)
+
+        future = _speculation_pool.submit(self.prefetch.invoke, {"queries": [query]})
+        try:
+            update = update or super().__call__(state, config)
+        finally:
+            if update is None or update["message"]["type"] != "user":
+                # Only stops a search still waiting for a thread, a running one completes
+                future.cancel()
+        if update["message"]["type"] != "user":
+            self.speculation_stats["discarded"] += 1
+            return self._with_prefetched(update, None)
+        try:
+            documents = future.result()
+        except Exception as e:
+            agent_logger.warning(f"Speculative retrieval failed: {e!r}")
+            self.speculation_stats["failed"] += 1
+            return self._with_prefetched(update, None)
+        self.speculation_stats["used"] += 1
+        return self._with_prefetched(update, documents)
+
+    async def acall(self, state: AgentState, config: RunnableConfig):
+        query = self._query(state)
+        update = self._pre_route(query)
+        if not self._speculate(update, query):
+            return self._with_prefetched(update or await super().acall(state, config), None)
+
+        search = asyncio.ensure_future(self.prefetch.ainvoke({"queries": [query]}))
+        try:
+            update = update or await super().acall(state, config)
+        finally:
+            if update is None or update["message"]["type"] != "user":
+                search.cancel()
+        if update["message"]["type"] != "user":
+            self.speculation_stats["discarded"] += 1
+            return self._with_prefetched(update, None)
+        try:
+            documents = await search
+        except Exception as e:
+            agent_logger.warning(f"Speculative retrieval failed: {e!r}")
+            self.speculation_stats["failed"] += 1
+            return self._with_prefetched(update, None)
+        self.speculation_stats["used"] += 1
+        return self._with_prefetched(update, documents)
     
 
 class GeneralQuestionAgent(BaseAgent):
-    def __init__(self, llm: ChatOpenAI = AgentsConfiguration.llm):
-        super().__init__(GENERAL_SYSTEM_PROMPT, llm)
+    def __init__(self, llm: ChatOpenAI = AgentsConfiguration.llm, context: Optional[ContextPolicy] = None):
+        super().__init__(GENERAL_SYSTEM_PROMPT, llm, context)
 
 
 class AskMoreInfoAgent(BaseAgent):
-    def __init__(self, llm: ChatOpenAI = AgentsConfiguration.llm):
-        super().__init__(MORE_INFO_SYSTEM_PROMPT, llm)
+    def __init__(self, llm: ChatOpenAI = AgentsConfiguration.llm, context: Optional[ContextPolicy] = None):
+        super().__init__(MORE_INFO_SYSTEM_PROMPT, llm, context)
 
 
 class RAGAgent(BaseAgent):
-    def __init__(self, llm: ChatOpenAI = AgentsConfiguration.llm):
+    """
+    Searches the knowledge base through its tool. With `reuse_prefetched`, the documents
+    of the speculative retrieval (if any) are used as the result of a search for the
+    query, without the LLM call choosing the search nor the search itself.
+    """
+
+    def __init__(self, llm: ChatOpenAI = AgentsConfiguration.llm, tool_name: str = "retrieve_information_vectorbase",
+                 reuse_prefetched: bool = False, context: Optional[ContextPolicy] = None):
         super().__init__("You are a helpful customer support assistant for Mobile Operator. "
             "You are an expert programmer and problem-solver, tasked with answering any user's query. Use the provided \
 tools to help you find the information you need."
             " Use the provided tools to search for user's information to assist the user's queries. "
-            " When searching, be persistent. Expand your query bounds if the first search returns no results. "
-            " If a search comes up empty, expand your search before giving up.", llm)
-        
-    def __call__(self, state: AgentState, config: RunnableConfig):
+            " When searching, be persistent: put several phrasings of the query (names, account numbers, related terms) "
+            " in a single search call, as the tool takes a list of queries, rather than searching repeatedly.", llm, context)
+        self.tool_name = tool_name
+        self.reuse_prefetched = reuse_prefetched
+
+    def _shortcut(self, state: AgentState) -> Optional[dict]:
         messages = state["messages"]
 
         if isinstance(messages[-1], ToolMessage):
             return {"messages": messages[-1]}
 
-        result = self.llm.invoke(self.prompt.format(messages=messages))
-        return {"messages": result}
+        documents = state.get("prefetched") if self.reuse_prefetched else None
+        if documents is None:
+            return None
+        agent_logger.info("Reusing the documents of the speculative retrieval")
+        call_id = f"prefetched_{uuid.uuid4().hex[:12]}"
+        return {"messages": [
+            AIMessage(content="", tool_calls=[
+                {"name": self.tool_name, "args": {"queries": [messages[-1].content]}, "id": call_id}
+            ]),
+            ToolMessage(content=documents, name=self.tool_name, tool_call_id=call_id),
+        ]}
+
+    def __call__(self, state: AgentState, config: RunnableConfig):
+        shortcut = self._shortcut(state)
+        return shortcut if shortcut is not None else super().__call__(state, config)
+
+    async def acall(self, state: AgentState, config: RunnableConfig):
+        shortcut = self._shortcut(state)
+        return shortcut if shortcut is not None else await super().acall(state, config)
 
 
 class GenerateResponseAgent(BaseAgent):
-    def __init__(self, llm: ChatOpenAI = AgentsConfiguration.llm):
-        super().__init__(EXECUTE_RAG_SYSTEM_PROMPT, llm)
+    """
+    Answers from the search results. With `merge_prefetched`, the documents of the
+    speculative retrieval are added to them (the documents found by both only once).
 
-    def __call__(self, state: AgentState, config: RunnableConfig):
-        agent_logger.info(f"{"-" * 12} {self.__class__.__name__} responding ... {"-" * 12}")
+    The search results go in the system prompt. With a context policy, the tool message
+    holding them is replaced by a placeholder in the conversation, and its token budget
+    covers both: the results get what the pruned conversation leaves.
+    """
+
+    def __init__(self, llm: ChatOpenAI = AgentsConfiguration.llm, merge_prefetched: bool = False,
+                 context: Optional[ContextPolicy] = None):
+        super().__init__(EXECUTE_RAG_SYSTEM_PROMPT, llm, context)
+        self.merge_prefetched = merge_prefetched
+
+    def _input(self, state: AgentState):
         messages = state["messages"]
         # previous message was a tool message with the results
         tool_results = messages[-1].content
-        # second to last message was the tool call with the query
-        query = messages[-2].tool_calls[0]["args"]["query"]
-        response = self.llm.invoke(self.prompt.format(
-            messages=messages, 
-            query=query,
-            tool_results=tool_results))
-        return {"messages": response}
+        if self.merge_prefetched and state.get("prefetched"):
+            # whole documents, each one once (both searches return the same documents for the same hits)
+            documents = split_documents(tool_results) + split_documents(state["prefetched"])
+            tool_results = join_documents(list(dict.fromkeys(documents)))
+        # second to last message was the tool call with the queries
+        query = "; ".join(messages[-2].tool_calls[0]["args"]["queries"])
+        if self.context is None:
+            return self.prompt.format(messages=messages, query=query, tool_results=tool_results)
+
+        # the results are sent once, in the system prompt
+        pruned = self.context.prune(messages[:-1] + [messages[-1].model_copy(update={"content": PROMPT_TOOL_RESULT})])
+        if self.context.max_tokens is not None:
+            tool_results = truncate(tool_results, self.context.max_tokens - sum(message_tokens(m) for m in pruned))
+        return self.prompt.format(messages=pruned, query=query, tool_results=tool_results)
         
     
\ No newline at end of file
@@ -5,6 +5,7 @@ from __future__ import annotations
 from dataclasses import dataclass, field, fields
 from langchain_openai import ChatOpenAI
 import langgraph_project.agents.prompts as prompts
+from langgraph_project.agents.context import ContextPolicy
 from langgraph_project.settings import settings
 
 class AgentsConfiguration:
@@ -17,6 +18,18 @@ class AgentsConfiguration:
         api_key=settings.openai_api_key.get_secret_value(),
     )
 
+    # context of each node (see ContextPolicy), when `settings.context_pruning` is on
+
+    context_policies: dict[str, ContextPolicy] = {
+        # the route depends on the last question, a little history helps with follow-ups
+        "orchestrator": ContextPolicy(max_turns=3, max_tokens=1000),
+        "ask_user_more_info_agent": ContextPolicy(max_turns=4, max_tokens=2000),
+        "respond_to_general_question_agent": ContextPolicy(max_turns=4, max_tokens=2000),
+        "rag_agent": ContextPolicy(max_turns=4, max_tokens=2000),
+        # the budget also covers the search results of the current turn, in its system prompt
+        "generate_response_agent": ContextPolicy(max_turns=2, max_tokens=3000),
+    }
+
     # prompts
 
     router_system_prompt: str = field(
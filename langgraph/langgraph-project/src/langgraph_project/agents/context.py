@@ -0,0 +1,150 @@
+import functools
+from dataclasses import dataclass
+from typing import Callable, Optional
+import tiktoken
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph_project.settings import settings
+
+
+STALE_TOOL_RESULT = "[search results omitted: already answered]"
+PROMPT_TOOL_RESULT = "[search results: in the system prompt]"
+TRUNCATED = " ... (truncated)"
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    return len(_encoding(settings.openai_model_name).encode(text))
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """The beginning of `text` within `max_tokens` tokens (the truncation mark included)."""
+    tokens = _encoding(settings.openai_model_name).encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    keep = max(max_tokens - count_tokens(TRUNCATED), 0)
+    return _encoding(settings.openai_model_name).decode(tokens[:keep]) + TRUNCATED
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Tokens of a message as formatted into the prompt (role, content, tool calls)."""
+    text = f"{message.type}: {message.content}"
+    if getattr(message, "tool_calls", None):
+        text += str(message.tool_calls)
+    return count_tokens(text)
+
+
+def split_turns(messages: list[BaseMessage]) -> list[list[BaseMessage]]:
+    """Turns of a conversation: each one starts at a user message (leading messages form a turn too)."""
+    turns: list[list[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def brief_summary(turns: list[list[BaseMessage]], max_chars: int = 200) -> str:
+    """
+    Extractive summary of older turns, one line per turn: the question and the final
+    answer, shortened. No model call, so pruning adds no latency.
+    """
+    lines = []
+    for turn in turns:
+        question = str(turn[0].content) if isinstance(turn[0], HumanMessage) else ""
+        answer = next((str(m.content) for m in reversed(turn) if m.type == "ai" and m.content), "")
+        line = f"- User: {question[:max_chars]}"
+        if answer:
+            line += f" | Assistant: {answer[:max_chars]}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+@dataclass
+class ContextPolicy:
+    """
+    What a node sees of the conversation.
+
+    Attributes:
+        max_turns: Turns kept in full (the current one included), all if None.
+        drop_stale_tool_results: Replace the content of the tool results of the previous
+            turns, already answered, by a placeholder (the messages are kept, so the tool
+            calls still have their results).
+        summarize: Replace the turns dropped (by `max_turns` or the budget) by a summary.
+        max_summary_turns: Dropped turns covered by the summary, the most recent ones:
+            older turns are forgotten, so the summary does not grow with the thread.
+        max_tokens: Token budget of the messages: older turns are dropped first, then the
+            longest tool results of the current turn are truncated. No budget if None.
+        summarizer: Summary of the dropped turns, `brief_summary` by default (it could be
+            a model call, at the cost of its latency).
+    """
+
+    max_turns: Optional[int] = None
+    drop_stale_tool_results: bool = True
+    summarize: bool = True
+    max_summary_turns: int = 8
+    max_tokens: Optional[int] = None
+    summarizer: Callable[[list[list[BaseMessage]]], str] = brief_summary
+
+    def _summary(self, dropped: list[list[BaseMessage]]) -> list[BaseMessage]:
+        dropped = dropped[-self.max_summary_turns:] if self.max_summary_turns > 0 else []
+        if not self.summarize or not dropped:
+            return []
+        return [SystemMessage(f"Summary of the earlier conversation:\n{self.summarizer(dropped)}")]
+
+    def prune(self, messages: list[BaseMessage]) -> list[BaseMessage]:
+        if not messages:
+            return []
+        turns = split_turns(messages)
+        if self.drop_stale_tool_results:
+            turns = [
+                [m.model_copy(update={"content": STALE_TOOL_RESULT}) if isinstance(m, ToolMessage) else m for m in turn]
+                for turn in turns[:-1]
+            ] + turns[-1:]
+
+        dropped: list[list[BaseMessage]] = []
+        if self.max_turns is not None and len(turns) > self.max_turns:
+            keep = max(self.max_turns, 1)
+            dropped, turns = turns[:-keep], turns[-keep:]
+
+        if self.max_tokens is None:
+            return self._summary(dropped) + [m for turn in turns for m in turn]
+
+        # Drop the oldest turns until the rest (and the summary of the dropped ones) fits,
+        # then forget the oldest summarised turns if the summary alone does not
+        dropped = dropped[-self.max_summary_turns:] if self.max_summary_turns > 0 else []
+        sizes = [sum(message_tokens(m) for m in turn) for turn in turns]
+        while sum(message_tokens(m) for m in self._summary(dropped)) + sum(sizes) > self.max_tokens:
+            if len(turns) > 1:
+                dropped.append(turns.pop(0))
+                sizes.pop(0)
+            elif dropped:
+                dropped.pop(0)
+            else:
+                break
+
+        summary = self._summary(dropped)
+        current = self._fit(turns[-1], self.max_tokens - sum(message_tokens(m) for m in summary) - sum(sizes[:-1]))
+        return summary + [m for turn in turns[:-1] for m in turn] + current
+
+    def _fit(self, turn: list[BaseMessage], budget: int) -> list[BaseMessage]:
+        """Truncate the longest tool results of the turn until it fits in the budget."""
+        turn = list(turn)
+        excess = sum(message_tokens(m) for m in turn) - budget
+        while excess > 0:
+            tools = [i for i, m in enumerate(turn) if isinstance(m, ToolMessage) and m.content != TRUNCATED]
+            if not tools:
+                break
+            i = max(tools, key=lambda j: message_tokens(turn[j]))
+            tokens = _encoding(settings.openai_model_name).encode(str(turn[i].content))
+            keep = max(len(tokens) - excess - count_tokens(TRUNCATED), 0)
+            content = _encoding(settings.openai_model_name).decode(tokens[:keep]) + TRUNCATED
+            excess -= message_tokens(turn[i]) - message_tokens(turn[i].model_copy(update={"content": content}))
+            turn[i] = turn[i].model_copy(update={"content": content})
+        return turn
@@ -0,0 +1,255 @@
+import os
+import re
+import glob
+import json
+import hashlib
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Callable, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langgraph_project.state import Router
+from langgraph_project.settings import settings
+
+
+router_logger = getLogger("pre_router")
+
+# A detector returns a route when it can decide the query on its own, None otherwise
+Detector = Callable[[str], Optional[Router]]
+
+# Account numbers are 10 digits, phone and SIM numbers 9 (with an optional +351 prefix)
+ACCOUNT_NUMBER = re.compile(r"\b\d{10}\b")
+PHONE_NUMBER = re.compile(r"(?:\+351\s?)?\b9\d{2}\s?\d{3}\s?\d{3}\b")
+# Words of the questions about the users' accounts (plans, billing, SIM cards, usage)
+DOMAIN_TERMS = re.compile(
+    r"\b(?:account|bill|billing|bills|invoice|invoices|pay|paid|pays|payment|payments|plan|plans|subscribed|"
+    r"sim|sims|pin|puk|phone|number|address|data|usage|customer|customers|client|clients|user|users)\b",
+    re.IGNORECASE,
+)
+WORD = re.compile(r"\w+")
+STOP_WORDS = frozenset(
+    "a an and are can could did do does for from give has have how i in is it me my of on or "
+    "show tell that the this to was what when where which who why with you your".split()
+)
+KNOWLEDGE_BASE_NAME = re.compile(r"^\*\*Name:\*\*\s*(.+?)\s*$", re.MULTILINE)
+
+
+def identifier_detector(query: str) -> Optional[Router]:
+    """An account, phone or SIM number identifies the user: look it up."""
+    if ACCOUNT_NUMBER.search(query) or PHONE_NUMBER.search(query):
+        return {"type": "user", "logic": "pre-router: the query contains an account or phone number"}
+    return None
+
+
+def load_known_names(knowledge_base_path: str) -> list[str]:
+    """Full names of the users of the knowledge base (the `**Name:**` lines)."""
+    names = []
+    for path in sorted(glob.glob(os.path.join(knowledge_base_path, "*.md"))):
+        with open(path, encoding="utf-8") as f:
+            names += KNOWLEDGE_BASE_NAME.findall(f.read())
+    return names
+
+
+class NameDetector:
+    """
+    Routes to `user` an account question (plans, billing, SIM cards, usage…) naming a
+    user of the knowledge base in full. Anything less (a first name, a full name that is
+    not a user's, an account word alone) is left to the LLM.
+
+    The names are looked up as word n-grams of the query in a set, so a query costs
+    the same whatever the number of users.
+    """
+
+    def __init__(self, names: list[str]):
+        self.full_names = {tuple(WORD.findall(name.lower())) for name in names} - {()}
+        self.lengths = sorted({len(name) for name in self.full_names})
+
+    def __call__(self, query: str) -> Optional[Router]:
+        if not self.full_names or DOMAIN_TERMS.search(query) is None:
+            return None
+        words = WORD.findall(query.lower())
+        for n in self.lengths:
+            if any(tuple(words[i:i + n]) in self.full_names for i in range(len(words) - n + 1)):
+                return {"type": "user", "logic": "pre-router: account question naming a known user in full"}
+        return None
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Local embeddings without a model: hashed counts of the words and of their character
+    trigrams, L2 normalised. Enough to compare short queries with labelled examples.
+    """
+
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> list[str]:
+        words = [word for word in re.findall(r"\w+", text.lower()) if word not in STOP_WORDS]
+        trigrams = [word[i:i + 3] for word in (f" {w} " for w in words) for i in range(len(word) - 2)]
+        return words + trigrams
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in self._features(text):
+            vector[int.from_bytes(hashlib.md5(feature.encode()).digest()[:4], "little") % self.dimensions] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def load_examples(path: str) -> list[tuple[str, str]]:
+    """Labelled queries of a JSONL file, one {"query": ..., "type": ...} per line."""
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                example = json.loads(line)
+                examples.append((example["query"], example["type"]))
+    return examples
+
+
+class KNNRouter:
+    """
+    k-nearest-neighbours classifier over embedded labelled queries (cosine similarity).
+    It routes only when the nearest example is similar enough and the weighted vote of
+    the k neighbours is clear enough, so that unusual queries still go to the LLM, and
+    only to the `routes` it is trusted with (all the labels if None).
+    """
+
+    def __init__(self, examples: list[tuple[str, str]], embeddings: Optional[Embeddings] = None,
+                 k: int = 5, min_similarity: float = 0.3, min_confidence: float = 0.8,
+                 routes: Optional[set[str]] = None):
+        self.embeddings = embeddings or HashingEmbeddings()
+        self.labels = [label for _, label in examples]
+        self.vectors = np.array(self.embeddings.embed_documents([query for query, _ in examples]), dtype=np.float32)
+        self.k = min(k, len(examples))
+        self.min_similarity = min_similarity
+        self.min_confidence = min_confidence
+        self.routes = routes
+
+    def classify(self, query: str) -> tuple[Optional[str], float]:
+        """The majority label of the neighbours and its share of the vote (0 without examples)."""
+        if not self.labels:
+            return None, 0.0
+        similarities = self.vectors @ np.array(self.embeddings.embed_query(query), dtype=np.float32)
+        nearest = np.argsort(-similarities)[:self.k]
+        if similarities[nearest[0]] < self.min_similarity:
+            return None, 0.0
+        votes = Counter()
+        for i in nearest:
+            votes[self.labels[i]] += max(float(similarities[i]), 0.0)
+        label, weight = votes.most_common(1)[0]
+        return label, weight / sum(votes.values())
+
+    def __call__(self, query: str) -> Optional[Router]:
+        label, confidence = self.classify(query)
+        if label is None or confidence < self.min_confidence or (self.routes and label not in self.routes):
+            return None
+        return {"type": label, "logic": f"pre-router: nearest labelled examples ({confidence:.0%} {label})"}
+
+
+@dataclass
+class PreRouterDecision:
+    route: Optional[Router]
+    stage: Optional[str]
+
+
+class PreRouter:
+    """
+    Routing stages tried in order before the Orchestrator LLM call: the first stage that
+    decides gives the route, when none does the query goes to the LLM. Counts how many
+    queries each stage decided (`stats`, "llm" for the fallbacks).
+
+    The stages can be given built, or as a `build` function called on the first query,
+    so that creating the graph reads no file and calls no model.
+    """
+
+    def __init__(self, stages: Optional[list[tuple[str, Detector]]] = None,
+                 build: Optional[Callable[[], list[tuple[str, Detector]]]] = None):
+        if (stages is None) == (build is None):
+            raise ValueError("PreRouter needs either its stages or a function building them.")
+        self._stages = stages
+        self._build = build
+        self._lock = threading.Lock()
+        self.stats: Counter = Counter()
+
+    @property
+    def stages(self) -> list[tuple[str, Detector]]:
+        if self._stages is None:
+            with self._lock:
+                if self._stages is None:
+                    router_logger.info("Building the pre-router stages")
+                    self._stages = self._build()
+        return self._stages
+
+    def decide(self, query: str) -> PreRouterDecision:
+        for name, stage in self.stages:
+            route = stage(query)
+            if route is not None:
+                return PreRouterDecision(route, name)
+        return PreRouterDecision(None, None)
+
+    def __call__(self, query: str) -> Optional[Router]:
+        decision = self.decide(query)
+        self.stats[decision.stage or "llm"] += 1
+        if decision.route is not None:
+            router_logger.info(f"Routed to '{decision.route['type']}' by the {decision.stage} stage")
+        return decision.route
+
+    @classmethod
+    def from_settings(cls) -> Optional["PreRouter"]:
+        """
+        The default stages, built on the first query, or None if the pre-router is disabled.
+        """
+        if not settings.pre_router_enabled:
+            return None
+
+        def build() -> list[tuple[str, Detector]]:
+            path = settings.routing_examples_path
+            return default_stages(
+                load_examples(path) if os.path.exists(path) else [],
+                settings.knowledge_base_path,
+                settings.pre_router_min_confidence,
+                pre_router_embeddings(settings.pre_router_embeddings),
+            )
+
+        return cls(build=build)
+
+
+def pre_router_embeddings(name: str) -> Embeddings:
+    """
+    Embeddings of the kNN stage: "hashing" (local, no call) or "openai" (one embeddings
+    call per query, still much faster than the LLM call, and a better kNN).
+    """
+    if name == "hashing":
+        return HashingEmbeddings()
+    if name == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(model=settings.embeddings_model_name, api_key=settings.openai_api_key.get_secret_value())
+    raise ValueError(f"Unknown pre-router embeddings '{name}', expected 'hashing' or 'openai'.")
+
+
+def default_stages(examples: list[tuple[str, str]], knowledge_base_path: str, min_confidence: float,
+                   embeddings: Optional[Embeddings] = None) -> list[tuple[str, Detector]]:
+    """
+    The high-precision rules first (an identifier, or a known user's full name in an
+    account question, routes to `user`), then the kNN on the labelled examples for the
+    general questions. Everything else, e.g. a partial name or an account word alone,
+    goes to the LLM: the rules cannot tell `more-info` from a general question using
+    the same words ("How many users does Netflix have?").
+    """
+    stages: list[tuple[str, Detector]] = [
+        ("identifier", identifier_detector),
+        ("name", NameDetector(load_known_names(knowledge_base_path))),
+    ]
+    if examples:
+        stages.append(("knn", KNNRouter(examples, embeddings, min_confidence=min_confidence, routes={"general"})))
+    return stages
@@ -0,0 +1,79 @@
+"""
+Prompt tokens of each node over a long conversation, with and without context pruning.
+
+Runs a `--turns` conversation on one checkpointed thread against the mock LLM, with
+mock search results of `--document-chars` characters, and counts the tokens of every
+prompt sent to the model, by node.
+
+    python -m langgraph_project.benchmarks.context_pruning --turns 20
+"""
+import json
+import asyncio
+import argparse
+from collections import defaultdict
+from typing import Any
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph_project.agents.configuration import AgentsConfiguration
+from langgraph_project.agents.context import message_tokens
+from langgraph_project.graph import build_graph
+from langgraph_project.mock_llm import MockChatModel, mock_retriever_tool
+
+
+class PromptTokens(AsyncCallbackHandler):
+    """Tokens of the prompts sent to the model, by graph node (for the current turn)."""
+
+    def __init__(self):
+        self.tokens: dict[str, int] = defaultdict(int)
+
+    async def on_chat_model_start(self, serialized: dict, messages: list[list[BaseMessage]], *,
+                                  metadata: dict[str, Any] | None = None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node", "?")
+        self.tokens[node] += sum(message_tokens(m) for batch in messages for m in batch)
+
+
+async def conversation(turns: int, document_chars: int, pruning: bool) -> list[dict[str, int]]:
+    graph = build_graph(
+        MockChatModel(latency_ms=0),
+        mock_retriever_tool(0, document_chars),
+        MemorySaver(),
+        context_policies=AgentsConfiguration.context_policies if pruning else None,
+    )
+    config = {"configurable": {"thread_id": "benchmark"}}
+    per_turn = []
+    for turn in range(turns):
+        counter = PromptTokens()
+        await graph.ainvoke(
+            {"messages": [("user", f"What did John Doe pay in month {turn + 1}, and on which plan?")]},
+            {**config, "callbacks": [counter]},
+        )
+        per_turn.append(dict(counter.tokens))
+    return per_turn
+
+
+def print_table(off: list[dict[str, int]], on: list[dict[str, int]]) -> None:
+    nodes = sorted({node for turn in off + on for node in turn})
+    print("| turn | " + " | ".join(f"{node} (full / pruned)" for node in nodes) + " |")
+    print("|---" * (len(nodes) + 1) + "|")
+    for i, (full, pruned) in enumerate(zip(off, on), 1):
+        print(f"| {i} | " + " | ".join(f"{full.get(n, 0)} / {pruned.get(n, 0)}" for n in nodes) + " |")
+    total_off = sum(sum(turn.values()) for turn in off)
+    total_on = sum(sum(turn.values()) for turn in on)
+    print(f"\nPrompt tokens over {len(off)} turns: {total_off} full, {total_on} pruned "
+          f"({1 - total_on / total_off:.0%} less)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prompt tokens per node with and without context pruning (mock LLM).")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--document-chars", type=int, default=2000, help="Size of the mock search results.")
+    parser.add_argument("--output", help="Write the tokens per turn and node to this JSON file.")
+    args = parser.parse_args()
+
+    full = asyncio.run(conversation(args.turns, args.document_chars, pruning=False))
+    pruned = asyncio.run(conversation(args.turns, args.document_chars, pruning=True))
+    print_table(full, pruned)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"full": full, "pruned": pruned}, f, indent=2)
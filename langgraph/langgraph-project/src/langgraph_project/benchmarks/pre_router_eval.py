@@ -0,0 +1,128 @@
+"""
+Routing accuracy and latency saved by the pre-router.
+
+The queries of the held-out `--eval` set (`routing-eval.jsonl`, never used to write
+the rules nor to train the kNN) go through the pre-router stages, the kNN trained on
+all the `--examples`. Without an eval set, the examples are used leave-one-out for the
+kNN, but the rules were written on them: that score is in-sample.
+
+The queries the pre-router does not decide fall back to the LLM: with `--llm` the
+Orchestrator is called for them (and for the others, to compare), else they are not
+scored and its latency is taken from `--llm-latency-ms`.
+
+    python -m langgraph_project.benchmarks.pre_router_eval --eval routing-eval.jsonl
+"""
+import json
+import time
+import argparse
+from collections import Counter, defaultdict
+from langchain_core.messages import HumanMessage
+from langchain_core.embeddings import Embeddings
+from langgraph_project.agents.pre_router import PreRouter, default_stages, load_examples, pre_router_embeddings
+from langgraph_project.settings import settings
+
+
+def make_pre_router(train: list[tuple[str, str]], min_confidence: float, embeddings: Embeddings) -> PreRouter:
+    return PreRouter(default_stages(train, settings.knowledge_base_path, min_confidence, embeddings))
+
+
+def llm_route(query: str) -> tuple[str, float]:
+    """Route chosen by the Orchestrator LLM call and its latency (ms)."""
+    from langgraph_project.agents.agents import Orchestrator
+
+    start = time.perf_counter()
+    update = Orchestrator()({"messages": [HumanMessage(query)]}, {})
+    return update["message"]["type"], 1000 * (time.perf_counter() - start)
+
+
+def evaluate(examples: list[tuple[str, str]], eval_set: list[tuple[str, str]] | None,
+             min_confidence: float, embeddings: Embeddings, use_llm: bool, llm_latency_ms: float) -> dict:
+    shared = make_pre_router(examples, min_confidence, embeddings) if eval_set else None
+    per_stage: dict[str, Counter] = defaultdict(Counter)
+    pre_router_ms, llm_ms = [], []
+    correct = 0
+    records = []
+
+    for i, (query, label) in enumerate(eval_set or examples):
+        pre_router = shared or make_pre_router(examples[:i] + examples[i + 1:], min_confidence, embeddings)
+        start = time.perf_counter()
+        decision = pre_router.decide(query)
+        pre_router_ms.append(1000 * (time.perf_counter() - start))
+
+        llm_type = None
+        if use_llm:
+            llm_type, latency = llm_route(query)
+            llm_ms.append(latency)
+
+        stage = decision.stage or "llm"
+        # Without --llm, the route of the fallbacks is unknown: not scored
+        routed = decision.route["type"] if decision.route else llm_type
+        per_stage[stage]["queries"] += 1
+        per_stage[stage]["correct"] += routed == label
+        correct += routed == label
+        records.append({"query": query, "label": label, "stage": stage, "route": routed, "llm_route": llm_type})
+
+    total = len(records)
+    local = total - per_stage["llm"]["queries"]
+    llm_latency = sum(llm_ms) / len(llm_ms) if llm_ms else llm_latency_ms
+    overhead = sum(pre_router_ms) / total
+    return {
+        "queries": total,
+        "local_share": local / total,
+        "accuracy": correct / total if use_llm else None,
+        "local_accuracy": sum(per_stage[s]["correct"] for s in per_stage if s != "llm") / local if local else None,
+        "llm_accuracy": (sum(r["llm_route"] == r["label"] for r in records) / total) if use_llm else None,
+        "stages": {stage: dict(counts) for stage, counts in per_stage.items()},
+        "pre_router_ms": overhead,
+        "llm_latency_ms": llm_latency,
+        # Per query: the LLM calls skipped, minus the time spent in the pre-router by every query
+        "saved_ms_per_query": local / total * llm_latency - overhead,
+        "records": records,
+    }
+
+
+def print_report(report: dict) -> None:
+    print("| stage | queries | correct | accuracy |")
+    print("|---|---|---|---|")
+    for stage, counts in sorted(report["stages"].items()):
+        if stage == "llm" and report["accuracy"] is None:
+            print(f"| {stage} | {counts['queries']} | - | not scored (no --llm) |")
+            continue
+        print(f"| {stage} | {counts['queries']} | {counts.get('correct', 0)} | {counts.get('correct', 0) / counts['queries']:.0%} |")
+    print()
+    overall = f", overall {report['accuracy']:.0%}" if report["accuracy"] is not None else ""
+    print(f"Routed locally: {report['local_share']:.0%} of {report['queries']} queries, "
+          f"accuracy {report['local_accuracy'] or 0:.0%}{overall}")
+    if report["llm_accuracy"] is not None:
+        print(f"LLM-only accuracy: {report['llm_accuracy']:.0%}")
+    print(f"Pre-router: {report['pre_router_ms']:.2f} ms per query; LLM routing: {report['llm_latency_ms']:.0f} ms per call")
+    print(f"Latency saved: {report['saved_ms_per_query']:.0f} ms per query on average")
+    for record in report["records"]:
+        if record["route"] is not None and record["route"] != record["label"]:
+            print(f"  misrouted ({record['stage']}): {record['query']!r} -> {record['route']}, expected {record['label']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the pre-router on labelled queries.")
+    parser.add_argument("--examples", default=settings.routing_examples_path, help="Labelled queries (JSONL) used to train the kNN stage.")
+    parser.add_argument("--eval", default="./routing-eval.jsonl",
+                        help="Held-out labelled queries (JSONL). Leave-one-out on --examples (in-sample for the rules) if empty.")
+    parser.add_argument("--min-confidence", type=float, default=settings.pre_router_min_confidence)
+    parser.add_argument("--embeddings", default=settings.pre_router_embeddings, help="Embeddings of the kNN stage: hashing or openai.")
+    parser.add_argument("--llm", action="store_true", help="Call the Orchestrator LLM to measure its latency and accuracy.")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0, help="LLM routing latency assumed without --llm.")
+    parser.add_argument("--output", help="Write the report (with every query) to this JSON file.")
+    args = parser.parse_args()
+
+    report = evaluate(
+        load_examples(args.examples),
+        load_examples(args.eval) if args.eval else None,
+        args.min_confidence,
+        pre_router_embeddings(args.embeddings),
+        args.llm,
+        args.llm_latency_ms,
+    )
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,140 @@
+"""
+Load benchmark of the RetrievalGraph service against the mock LLM.
+
+Serves the graph with uvicorn on a local port and sends `--requests` questions per
+concurrency level, each on its own thread, through the HTTP API (the SSE endpoint with
+`--stream`). The baseline is the sync graph run one question at a time, as `main.py` does.
+
+    python -m langgraph_project.benchmarks.service_load --latency-ms 200 --concurrency 1,8,32,128
+"""
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import httpx
+import uvicorn
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph_project.graph import build_graph
+from langgraph_project.mock_llm import MockChatModel, mock_retriever_tool
+from langgraph_project.service import create_app
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def _row(mode: str, concurrency: int, latencies: list[float], elapsed: float, first_token: list[float]) -> dict:
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "first_token_p50_ms": _percentile(first_token, 50) if first_token else None,
+    }
+
+
+def run_sync_baseline(graph, requests: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(requests):
+        t0 = time.perf_counter()
+        graph.invoke({"messages": [("user", f"Question {i}")]}, {"configurable": {"thread_id": f"sync-{i}"}})
+        latencies.append(1000 * (time.perf_counter() - t0))
+    return _row("sync", 1, latencies, time.perf_counter() - start, [])
+
+
+async def _request(client: httpx.AsyncClient, question: str, stream: bool) -> tuple[float, float | None]:
+    """Latency of one run and, when streaming, the latency of its first token (ms)."""
+    thread_id = uuid.uuid4().hex
+    start = time.perf_counter()
+    if not stream:
+        response = await client.post(f"/threads/{thread_id}/runs", json={"question": question})
+        response.raise_for_status()
+        return 1000 * (time.perf_counter() - start), None
+
+    first_token = None
+    async with client.stream("POST", f"/threads/{thread_id}/runs/stream", json={"question": question}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_token is None and line == "event: token":
+                first_token = 1000 * (time.perf_counter() - start)
+            elif line == "event: error":
+                raise RuntimeError("Run failed")
+    return 1000 * (time.perf_counter() - start), first_token
+
+
+async def run_service(port: int, concurrency: int, requests: int, stream: bool) -> dict:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(client: httpx.AsyncClient, i: int) -> tuple[float, float | None]:
+        async with slots:
+            return await _request(client, f"Question {i}", stream)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(client, i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+    return _row(
+        "stream" if stream else "async",
+        concurrency,
+        [latency for latency, _ in results],
+        elapsed,
+        [first for _, first in results if first is not None],
+    )
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    llm = MockChatModel(latency_ms=args.latency_ms, token_ms=args.token_ms)
+    tool = mock_retriever_tool(args.tool_latency_ms)
+
+    rows = [run_sync_baseline(build_graph(llm, tool, MemorySaver()), args.sync_requests)]
+
+    app = create_app(build_graph(llm, tool, MemorySaver()), max_concurrency=max(args.concurrency))
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    try:
+        for concurrency in args.concurrency:
+            rows.append(await run_service(args.port, concurrency, args.requests, args.stream))
+    finally:
+        server.should_exit = True
+        await serving
+    return rows
+
+
+def print_table(rows: list[dict]) -> None:
+    print("| mode | concurrency | requests | req/s | p50 ms | p95 ms | first token p50 ms |")
+    print("|---|---|---|---|---|---|---|")
+    for row in rows:
+        first = f"{row['first_token_p50_ms']:.0f}" if row["first_token_p50_ms"] is not None else "-"
+        print(f"| {row['mode']} | {row['concurrency']} | {row['requests']} | {row['throughput']:.1f} "
+              f"| {row['p50_ms']:.0f} | {row['p95_ms']:.0f} | {first} |")
+    baseline = rows[0]["throughput"]
+    print(f"\nBest throughput over the sync baseline: x{max(row['throughput'] for row in rows) / baseline:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load benchmark of the RetrievalGraph service (mock LLM).")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Latency of each mock LLM call.")
+    parser.add_argument("--token-ms", type=float, default=0.0, help="Delay between the streamed tokens.")
+    parser.add_argument("--tool-latency-ms", type=float, default=20.0, help="Latency of the mock retrieval.")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=256, help="Requests per concurrency level.")
+    parser.add_argument("--sync-requests", type=int, default=10, help="Requests of the sync baseline.")
+    parser.add_argument("--stream", action="store_true", help="Use the SSE endpoint (and report the first token latency).")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Append the results to this JSONL file.")
+    args = parser.parse_args()
+
+    rows = asyncio.run(main(args))
+    print_table(rows)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
@@ -0,0 +1,70 @@
+"""
+End-to-end latency of the RetrievalGraph with and without speculative retrieval.
+
+Runs `--requests` questions through the graph (async path, one at a time) for each
+speculative retrieval mode and each route chosen by the mock orchestrator: `user`
+(the prefetched documents are used) and `general` (the speculative search is dropped).
+
+    python -m langgraph_project.benchmarks.speculative_retrieval --latency-ms 400 --tool-latency-ms 150
+"""
+import json
+import time
+import asyncio
+import argparse
+from langgraph_project.agents.agents import SPECULATIVE_MODES
+from langgraph_project.graph import build_graph
+from langgraph_project.mock_llm import MockChatModel, mock_retriever_tool
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+async def run(mode: str, route: str, args: argparse.Namespace) -> dict:
+    llm = MockChatModel(latency_ms=args.latency_ms, route=route)
+    graph = build_graph(llm, mock_retriever_tool(args.tool_latency_ms), speculative_retrieval=mode)
+    latencies = []
+    for i in range(args.requests):
+        start = time.perf_counter()
+        await graph.ainvoke({"messages": [("user", f"What is the plan of account {i}?")]})
+        latencies.append(1000 * (time.perf_counter() - start))
+    return {
+        "mode": mode,
+        "route": route,
+        "requests": args.requests,
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+    }
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    return [await run(mode, route, args) for route in ("user", "general") for mode in args.modes]
+
+
+def print_table(rows: list[dict]) -> None:
+    baselines = {row["route"]: row["mean_ms"] for row in rows if row["mode"] == "off"}
+    print("| route | speculative retrieval | mean ms | p50 ms | p95 ms | vs off |")
+    print("|---|---|---|---|---|---|")
+    for row in rows:
+        baseline = baselines.get(row["route"])
+        delta = f"{row['mean_ms'] - baseline:+.0f} ms" if baseline is not None else "-"
+        print(f"| {row['route']} | {row['mode']} | {row['mean_ms']:.0f} | {row['p50_ms']:.0f} | {row['p95_ms']:.0f} | {delta} |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency of the RetrievalGraph with and without speculative retrieval (mock LLM).")
+    parser.add_argument("--latency-ms", type=float, default=400.0, help="Latency of each mock LLM call.")
+    parser.add_argument("--tool-latency-ms", type=float, default=150.0, help="Latency of the mock retrieval.")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per mode and route.")
+    parser.add_argument("--modes", type=lambda s: s.split(","), default=list(SPECULATIVE_MODES))
+    parser.add_argument("--output", help="Append the results to this JSONL file.")
+    args = parser.parse_args()
+
+    rows = asyncio.run(main(args))
+    print_table(rows)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
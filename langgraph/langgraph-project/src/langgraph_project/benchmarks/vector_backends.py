@@ -0,0 +1,167 @@
+"""
+Build time, query latency and recall of the local vector backends on synthetic corpora.
+
+For each `--sizes` corpus (clustered unit vectors of `--dim` dimensions, so the
+neighbours are meaningful), builds each backend from scratch by upserts of `--batch`
+vectors, then runs `--queries` queries (drawn like the corpus) and compares their
+top `--k` with the exact neighbours. The flat backend is the exhaustive baseline; the
+IVF backend is queried with each `--nprobe` and the HNSW one (if hnswlib is installed)
+with each `--ef`.
+
+    python -m langgraph_project.benchmarks.vector_backends --sizes 10000,100000,1000000
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from langgraph_project.vector_store.backends import SCAN_BLOCK, HNSWBackend, IVFBackend, VectorBackend, normalize
+
+
+# Vectors generated per seed
+CHUNK = 10000
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def _centers(size: int, dim: int, seed: int) -> np.ndarray:
+    return normalize(np.random.default_rng(seed).standard_normal((max(int(np.sqrt(size)), 1), dim)))
+
+
+def corpus_block(size: int, dim: int, start: int, end: int, seed: int) -> np.ndarray:
+    """
+    Vectors start:end of the corpus, generated by chunks of CHUNK vectors (each with its
+    own seed, so any block gives the same vectors) to never hold the corpus in memory.
+    """
+    centers = _centers(size, dim, seed)
+    chunks = []
+    for chunk in range(start // CHUNK, (end - 1) // CHUNK + 1):
+        rng = np.random.default_rng((seed, chunk + 1))
+        n = min(CHUNK, size - chunk * CHUNK)
+        chunks.append(centers[rng.integers(0, len(centers), n)] + 0.5 / np.sqrt(dim) * rng.standard_normal((n, dim)))
+    offset = start // CHUNK * CHUNK
+    return normalize(np.concatenate(chunks)[start - offset:end - offset])
+
+
+def make_queries(size: int, dim: int, n: int, seed: int) -> np.ndarray:
+    """Queries drawn around the clusters of the corpus, like its vectors."""
+    centers = _centers(size, dim, seed)
+    rng = np.random.default_rng((seed, 0))
+    return normalize(centers[rng.integers(0, len(centers), n)] + 0.5 / np.sqrt(dim) * rng.standard_normal((n, dim)))
+
+
+def exact_neighbours(size: int, dim: int, queries: np.ndarray, k: int, seed: int) -> list[set[str]]:
+    best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+    best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+    for start in range(0, size, SCAN_BLOCK):
+        end = min(start + SCAN_BLOCK, size)
+        scores = queries @ corpus_block(size, dim, start, end, seed).T
+        best_scores = np.concatenate([best_scores, scores], axis=1)
+        best_rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, end), scores.shape)], axis=1)
+        top = np.argsort(-best_scores, axis=1)[:, :k]
+        best_rows = np.take_along_axis(best_rows, top, axis=1)
+        best_scores = np.take_along_axis(best_scores, top, axis=1)
+    return [{str(row) for row in rows} for rows in best_rows]
+
+
+def build(backend: VectorBackend, size: int, dim: int, batch: int, seed: int) -> float:
+    start_time = time.perf_counter()
+    for start in range(0, size, batch):
+        end = min(start + batch, size)
+        backend.upsert([str(row) for row in range(start, end)], corpus_block(size, dim, start, end, seed))
+    backend.flush()
+    return time.perf_counter() - start_time
+
+
+def query(backend: VectorBackend, queries: np.ndarray, truth: list[set[str]], k: int) -> dict:
+    latencies, recalls = [], []
+    for vector, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = backend.search(vector, k)
+        latencies.append(1000 * (time.perf_counter() - start))
+        recalls.append(len(expected & {id_ for id_, _ in found}) / k)
+    return {
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "recall": sum(recalls) / len(recalls),
+    }
+
+
+def disk_mb(path: str) -> float:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names) / 2 ** 20
+
+
+def run(size: int, args: argparse.Namespace, directory: str) -> list[dict]:
+    queries = make_queries(size, args.dim, args.queries, args.seed)
+    truth = exact_neighbours(size, args.dim, queries, args.k, args.seed)
+    n_lists = args.ivf_lists or max(int(np.sqrt(size)), 1)
+
+    backends = [
+        ("flat", lambda path: VectorBackend(path, args.dim), [None]),
+        ("ivf", lambda path: IVFBackend(path, args.dim, n_lists=n_lists), args.nprobe),
+    ]
+    try:
+        import hnswlib  # noqa: F401
+        backends.append(("hnsw", lambda path: HNSWBackend(path, args.dim), args.ef))
+    except ImportError:
+        print("hnswlib is not installed: skipping the hnsw backend")
+
+    rows = []
+    for kind, factory, settings in backends:
+        path = os.path.join(directory, f"{kind}-{size}")
+        backend = factory(path)
+        build_s = build(backend, size, args.dim, args.batch, args.seed)
+        for setting in settings:
+            if kind == "ivf":
+                backend.nprobe = setting
+            elif kind == "hnsw":
+                backend.ef = setting
+            rows.append({
+                "size": size,
+                "dim": args.dim,
+                "backend": kind,
+                "param": "-" if setting is None else f"{'nprobe' if kind == 'ivf' else 'ef'}={setting}",
+                "build_s": build_s,
+                "disk_mb": disk_mb(path),
+                **query(backend, queries, truth, args.k),
+            })
+        backend.close()
+        shutil.rmtree(path, ignore_errors=True)
+    return rows
+
+
+def print_table(rows: list[dict], k: int) -> None:
+    print(f"| corpus | backend | param | build s | disk MB | p50 ms | p95 ms | recall@{k} |")
+    print("|---|---|---|---|---|---|---|---|")
+    for row in rows:
+        print(f"| {row['size']} x {row['dim']} | {row['backend']} | {row['param']} | {row['build_s']:.1f} | "
+              f"{row['disk_mb']:.0f} | {row['p50_ms']:.2f} | {row['p95_ms']:.2f} | {row['recall']:.3f} |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build time, query latency and recall of the local vector backends.")
+    parser.add_argument("--sizes", type=lambda s: [int(size) for size in s.split(",")], default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=10000, help="Vectors per upsert.")
+    parser.add_argument("--ivf-lists", type=int, help="IVF lists, sqrt(size) by default.")
+    parser.add_argument("--nprobe", type=lambda s: [int(n) for n in s.split(",")], default=[1, 4, 16])
+    parser.add_argument("--ef", type=lambda s: [int(n) for n in s.split(",")], default=[16, 64, 256])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--directory", help="Where to build the stores, a temporary folder by default.")
+    parser.add_argument("--output", help="Append the results to this JSONL file.")
+    args = parser.parse_args()
+
+    directory = args.directory or tempfile.mkdtemp(prefix="vector-backends-")
+    rows = [row for size in args.sizes for row in run(size, args, directory)]
+    print_table(rows, args.k)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
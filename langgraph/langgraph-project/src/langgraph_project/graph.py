@@ -0,0 +1,114 @@
+from typing import Literal, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.state import CompiledStateGraph
+from langgraph_project.state import AgentState
+from langgraph_project.agents.agents import (
+    Orchestrator,
+    GeneralQuestionAgent,
+    AskMoreInfoAgent,
+    RAGAgent,
+    GenerateResponseAgent,
+    SPECULATIVE_MODES,
+)
+from langgraph_project.agents.configuration import AgentsConfiguration
+from langgraph_project.agents.pre_router import PreRouter
+from langgraph_project.agents.context import ContextPolicy
+from langgraph_project.utils import create_tool_node_with_fallback
+from langgraph_project.tools import retrieve_information_vectorbase
+
+
+def route_agent(
+    state: AgentState
+) -> Literal["rag_agent", "ask_user_more_info_agent", "respond_to_general_question_agent"]:
+    _type = state["message"]["type"]
+    if _type == "user":
+        return "rag_agent"
+    elif _type == "more-info":
+        return "ask_user_more_info_agent"
+    elif _type == "general":
+        return "respond_to_general_question_agent"
+    else:
+        raise ValueError(f"Unknown router type {_type}")
+
+
+def route_retrieval(state: AgentState) -> Literal["retrieve_information_vectorbase", "generate_response_agent"]:
+    # The RAG agent already has the results when it reused the speculative retrieval
+    if isinstance(state["messages"][-1], ToolMessage):
+        return "generate_response_agent"
+    return "retrieve_information_vectorbase"
+
+
+def build_graph(
+    llm: BaseChatModel = AgentsConfiguration.llm,
+    retriever_tool: BaseTool = retrieve_information_vectorbase,
+    checkpointer: Optional[BaseCheckpointSaver] = None,
+    pre_router: Optional[PreRouter] = None,
+    speculative_retrieval: str = "off",
+    context_policies: Optional[dict[str, ContextPolicy]] = None,
+) -> CompiledStateGraph:
+    """
+    Build and compile the RetrievalGraph.
+
+    The agent nodes have sync and async implementations, so the graph can be run with
+    invoke/stream as well as with ainvoke/astream. With a checkpointer, the conversation
+    of each `thread_id` (in the run config) is saved and resumed across runs.
+
+    Args:
+        llm: The model used by the agents.
+        retriever_tool: The retrieval tool, it must be named "retrieve_information_vectorbase".
+        checkpointer: Where the state of each thread is saved, no persistence if None.
+        pre_router: Local routing stages tried before the orchestrator's LLM call.
+        speculative_retrieval: One of SPECULATIVE_MODES: search the raw query while the
+            orchestrator classifies it, and reuse ("reuse") or add ("merge") the documents
+            found when the query is routed to the RAG agent.
+        context_policies: Pruning of the conversation in the prompt of each node, by node
+            name (e.g. `AgentsConfiguration.context_policies`). Full history if None.
+    """
+    if speculative_retrieval not in SPECULATIVE_MODES:
+        raise ValueError(f"Unknown speculative retrieval mode '{speculative_retrieval}', expected one of {SPECULATIVE_MODES}.")
+    prefetch = retriever_tool if speculative_retrieval != "off" else None
+    context = (context_policies or {}).get
+
+    builder = StateGraph(AgentState)
+
+    # Orchestrator
+    builder.add_node("orchestrator", Orchestrator(llm, pre_router, prefetch, context("orchestrator")).as_node())
+    # Ask for more info agent
+    builder.add_node("ask_user_more_info_agent", AskMoreInfoAgent(llm, context("ask_user_more_info_agent")).as_node())
+    # Responds to a general question (no RAG)
+    builder.add_node("respond_to_general_question_agent", GeneralQuestionAgent(llm, context("respond_to_general_question_agent")).as_node())
+    # RAG agent - with the tool for retrieving information
+    builder.add_node("rag_agent", RAGAgent(
+        llm.bind_tools([retriever_tool]),
+        retriever_tool.name,
+        reuse_prefetched=speculative_retrieval == "reuse",
+        context=context("rag_agent"),
+    ).as_node())
+    # Tools nodes
+    builder.add_node(
+        "retrieve_information_vectorbase", 
+        create_tool_node_with_fallback([retriever_tool])
+    )
+    # Generate responses after executing RAG
+    builder.add_node("generate_response_agent", GenerateResponseAgent(
+        llm, merge_prefetched=speculative_retrieval == "merge", context=context("generate_response_agent")
+    ).as_node())
+
+    # Edges
+    builder.add_edge(START, "orchestrator")
+    builder.add_conditional_edges(
+        "orchestrator", route_agent, ["rag_agent", "ask_user_more_info_agent", "respond_to_general_question_agent"]
+    )
+    builder.add_conditional_edges(
+        "rag_agent", route_retrieval, ["retrieve_information_vectorbase", "generate_response_agent"]
+    )
+    builder.add_edge("retrieve_information_vectorbase", "generate_response_agent")
+
+    # Compile into a graph object that you can invoke and deploy.
+    graph = builder.compile(checkpointer=checkpointer)
+    graph.name = "RetrievalGraph"
+    return graph
@@ -0,0 +1,358 @@
+import json
+import time
+import uuid
+import asyncio
+import threading
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from logging import getLogger
+from typing import Any, AsyncIterator, Iterator, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler, BaseCallbackManager
+from langchain_core.outputs import LLMResult
+from langgraph.graph.state import CompiledStateGraph
+
+
+trace_logger = getLogger("trace")
+
+# Name of the end-to-end row of the stats
+RUN = "(run)"
+
+# Raised into a run stopped by its caller (a stream closed early, a cancelled task): not a failure
+CANCELLATIONS = (GeneratorExit, asyncio.CancelledError)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+@dataclass
+class NodeSpan:
+    """One execution of a node: its retries (and the waits between them) are part of the same span."""
+
+    node: str
+    step: int
+    start_ms: float
+    duration_ms: float = 0.0
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retries: int = 0
+    errors: int = 0
+    cancelled: bool = False
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+@dataclass
+class RunTrace:
+    """The nodes executed by one run of the graph, in order, with times relative to the run start."""
+
+    run_id: str
+    graph: str
+    started_at: float
+    duration_ms: float = 0.0
+    nodes: list[NodeSpan] = field(default_factory=list)
+    error: Optional[str] = None
+    cancelled: bool = False
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class TraceHandler(BaseCallbackHandler):
+    """
+    Callback handler building the trace of one graph run.
+
+    The node executions are the runs tagged `graph:step:<n>` by LangGraph; the model and
+    tool calls made inside a node are attributed to it by their `langgraph_checkpoint_ns`
+    (the node's task), so the calls of concurrent branches are not mixed up. A node run
+    again by a retry policy keeps its task: the attempt is counted as a retry of the span.
+    """
+
+    # Called on the event loop for async runs, no executor hop
+    run_inline = True
+
+    def __init__(self, trace: RunTrace, start: float):
+        self.trace = trace
+        self.start = start
+        self._spans: dict[str, NodeSpan] = {}
+        self._node_runs: dict[UUID, NodeSpan] = {}
+        self._tasks: dict[UUID, str] = {}
+        self._lock = threading.Lock()
+
+    def _span(self, run_id: UUID, metadata: Optional[dict]) -> Optional[NodeSpan]:
+        task = (metadata or {}).get("langgraph_checkpoint_ns")
+        if task is not None:
+            self._tasks[run_id] = task
+        else:
+            task = self._tasks.get(run_id)
+        return self._spans.get(task)
+
+    def on_chain_start(self, serialized: dict, inputs: Any, *, run_id: UUID, tags: Optional[list[str]] = None,
+                       metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        if node is None or kwargs.get("name") != node or not any(tag.startswith("graph:step:") for tag in tags or []):
+            with self._lock:
+                self._span(run_id, metadata)
+            return
+        now = time.perf_counter()
+        task = metadata.get("langgraph_checkpoint_ns", str(run_id))
+        with self._lock:
+            span = self._spans.get(task)
+            if span is None:
+                span = self._spans[task] = NodeSpan(node, metadata.get("langgraph_step", 0), 1000 * (now - self.start))
+                self.trace.nodes.append(span)
+            else:
+                span.retries += 1
+            self._node_runs[run_id] = span
+
+    def _end_node(self, run_id: UUID, error: bool, cancelled: bool = False) -> None:
+        with self._lock:
+            span = self._node_runs.pop(run_id, None)
+            if span is None:
+                return
+            span.duration_ms = 1000 * (time.perf_counter() - self.start) - span.start_ms
+            span.errors += error
+            span.cancelled = cancelled
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_node(run_id, error=False)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        cancelled = isinstance(error, CANCELLATIONS)
+        self._end_node(run_id, error=not cancelled, cancelled=cancelled)
+
+    def on_chat_model_start(self, serialized: dict, messages: list, *, run_id: UUID,
+                            metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        with self._lock:
+            span = self._span(run_id, metadata)
+            if span is not None:
+                span.llm_calls += 1
+
+    def on_llm_start(self, serialized: dict, prompts: list[str], *, run_id: UUID,
+                     metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        self.on_chat_model_start(serialized, [], run_id=run_id, metadata=metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        prompt_tokens = completion_tokens = 0
+        for generation in (response.generations or [[]])[0]:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+        if not prompt_tokens and not completion_tokens:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_tokens, completion_tokens = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        with self._lock:
+            span = self._span(run_id, None)
+            if span is not None:
+                span.prompt_tokens += prompt_tokens
+                span.completion_tokens += completion_tokens
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID,
+                      metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        with self._lock:
+            self._span(run_id, metadata)
+
+    def _error(self, run_id: UUID) -> None:
+        with self._lock:
+            span = self._span(run_id, None)
+            if span is not None:
+                span.errors += 1
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._error(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        # Includes the tool errors recovered by the fallback of the tool node
+        self._error(run_id)
+
+    def on_retry(self, retry_state: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        # Retries of the runnables wrapped with `with_retry` inside a node
+        with self._lock:
+            span = self._span(run_id, None)
+            if span is not None:
+                span.retries += 1
+
+
+class GraphStats:
+    """
+    Aggregates the traces of the last `history` runs: percentiles of the time of each
+    node and of the whole run, tokens and retries per execution, and the share of the
+    run time spent in each node. The runs cancelled before their end (and the nodes they
+    stopped) are counted apart (`cancelled`), neither in the times nor as errors.
+    """
+
+    def __init__(self, history: int = 1000):
+        self.traces: deque[RunTrace] = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def add(self, trace: RunTrace) -> None:
+        with self._lock:
+            self.traces.append(trace)
+
+    def summary(self) -> list[dict]:
+        """One row per node (by total time, highest first), then the end-to-end row."""
+        with self._lock:
+            traces = list(self.traces)
+        if not traces:
+            return []
+        # The nodes of the cancelled runs count as cancelled (the node stopped) or not at all
+        spans: dict[str, list[NodeSpan]] = defaultdict(list)
+        cancelled: dict[str, int] = defaultdict(int)
+        for trace in traces:
+            for span in trace.nodes:
+                if span.cancelled:
+                    cancelled[span.node] += 1
+                elif not trace.cancelled:
+                    spans[span.node].append(span)
+        completed = [trace for trace in traces if not trace.cancelled]
+        run_time = sum(trace.duration_ms for trace in completed)
+
+        def row(name: str, durations: list[float], node_spans: list[NodeSpan]) -> dict:
+            executions = len(durations)
+            if not executions:
+                return {"node": name, "executions": 0, "cancelled": cancelled[name]}
+            return {
+                "node": name,
+                "executions": executions,
+                "mean_ms": sum(durations) / executions,
+                "p50_ms": _percentile(durations, 50),
+                "p95_ms": _percentile(durations, 95),
+                "p99_ms": _percentile(durations, 99),
+                "max_ms": max(durations),
+                "share": sum(durations) / run_time if run_time else 0.0,
+                "llm_calls": sum(span.llm_calls for span in node_spans) / executions,
+                "prompt_tokens": sum(span.prompt_tokens for span in node_spans) / executions,
+                "completion_tokens": sum(span.completion_tokens for span in node_spans) / executions,
+                "retries": sum(span.retries for span in node_spans),
+                "errors": sum(span.errors for span in node_spans),
+                "cancelled": cancelled[name],
+            }
+
+        nodes = {*spans, *cancelled}
+        rows = [row(node, [span.duration_ms for span in spans[node]], spans[node]) for node in nodes]
+        rows.sort(key=lambda r: r.get("mean_ms", 0) * r["executions"], reverse=True)
+        cancelled[RUN] = len(traces) - len(completed)
+        all_spans = [span for node_spans in spans.values() for span in node_spans]
+        run_row = row(RUN, [trace.duration_ms for trace in completed], all_spans)
+        if completed:
+            run_row["errors"] = sum(trace.error is not None for trace in completed)
+        return rows + [run_row]
+
+
+class InstrumentedGraph:
+    """
+    Wraps a compiled graph to trace every run: each invoke/ainvoke/stream/astream gets a
+    `TraceHandler`, its trace is kept as `last_trace`, added to `stats`, logged at debug
+    level and appended to `trace_path` (JSON lines) if set. Anything else (get_state,
+    get_graph, name, ...) goes to the wrapped graph.
+    """
+
+    def __init__(self, graph: CompiledStateGraph, stats: Optional[GraphStats] = None, trace_path: Optional[str] = None):
+        self.graph = graph
+        self.stats = stats or GraphStats()
+        self.trace_path = trace_path
+        self.last_trace: Optional[RunTrace] = None
+        self._file_lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.graph, name)
+
+    def _begin(self, config: Optional[dict]) -> tuple[dict, TraceHandler]:
+        config = dict(config or {})
+        trace = RunTrace(str(config.get("run_id") or uuid.uuid4()), self.graph.name, time.time())
+        handler = TraceHandler(trace, time.perf_counter())
+        callbacks = config.get("callbacks")
+        if isinstance(callbacks, BaseCallbackManager):
+            callbacks = callbacks.copy()
+            callbacks.add_handler(handler, inherit=True)
+        else:
+            callbacks = [*(callbacks or []), handler]
+        config["callbacks"] = callbacks
+        return config, handler
+
+    def _end(self, handler: TraceHandler, error: Optional[BaseException] = None) -> RunTrace:
+        trace = handler.trace
+        trace.duration_ms = 1000 * (time.perf_counter() - handler.start)
+        trace.cancelled = isinstance(error, CANCELLATIONS)
+        trace.error = repr(error) if error is not None and not trace.cancelled else None
+        self.last_trace = trace
+        self.stats.add(trace)
+        trace_logger.debug(f"Run {trace.run_id}: " + ", ".join(f"{s.node} {s.duration_ms:.0f} ms" for s in trace.nodes))
+        if self.trace_path:
+            with self._file_lock, open(self.trace_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(trace.to_dict()) + "\n")
+        return trace
+
+    def invoke(self, input: Any, config: Optional[dict] = None, **kwargs: Any) -> Any:
+        config, handler = self._begin(config)
+        try:
+            result = self.graph.invoke(input, config, **kwargs)
+        except BaseException as e:
+            self._end(handler, e)
+            raise
+        self._end(handler)
+        return result
+
+    async def ainvoke(self, input: Any, config: Optional[dict] = None, **kwargs: Any) -> Any:
+        config, handler = self._begin(config)
+        try:
+            result = await self.graph.ainvoke(input, config, **kwargs)
+        except BaseException as e:
+            self._end(handler, e)
+            raise
+        self._end(handler)
+        return result
+
+    def stream(self, input: Any, config: Optional[dict] = None, **kwargs: Any) -> Iterator[Any]:
+        config, handler = self._begin(config)
+        try:
+            yield from self.graph.stream(input, config, **kwargs)
+        except BaseException as e:
+            self._end(handler, e)
+            raise
+        self._end(handler)
+
+    async def astream(self, input: Any, config: Optional[dict] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        config, handler = self._begin(config)
+        try:
+            async for chunk in self.graph.astream(input, config, **kwargs):
+                yield chunk
+        except BaseException as e:
+            self._end(handler, e)
+            raise
+        self._end(handler)
+
+
+def instrument(graph: CompiledStateGraph, history: int = 1000, trace_path: Optional[str] = None) -> InstrumentedGraph:
+    return InstrumentedGraph(graph, GraphStats(history), trace_path)
+
+
+def print_trace(trace: RunTrace) -> None:
+    print(f"| {trace.graph} run {trace.run_id} | start ms | time ms | LLM calls | prompt tokens | completion tokens | retries | errors |")
+    print("|---|---|---|---|---|---|---|---|")
+    for span in trace.nodes:
+        print(f"| {span.node} | {span.start_ms:.0f} | {span.duration_ms:.0f} | {span.llm_calls} | {span.prompt_tokens} | "
+              f"{span.completion_tokens} | {span.retries} | {span.errors} |")
+    print(f"| {RUN}{' (cancelled)' if trace.cancelled else ''} | 0 | {trace.duration_ms:.0f} | {sum(s.llm_calls for s in trace.nodes)} | "
+          f"{sum(s.prompt_tokens for s in trace.nodes)} | {sum(s.completion_tokens for s in trace.nodes)} | "
+          f"{sum(s.retries for s in trace.nodes)} | {sum(s.errors for s in trace.nodes)} |")
+
+
+def print_stats(rows: list[dict]) -> None:
+    print("| node | executions | mean ms | p50 ms | p95 ms | p99 ms | share of run time | prompt tokens | completion tokens | retries | errors |")
+    print("|---|---|---|---|---|---|---|---|---|---|---|")
+    for row in rows:
+        if not row["executions"]:
+            print(f"| {row['node']} | 0 (cancelled: {row['cancelled']}) |" + " - |" * 9)
+            continue
+        cancelled = f" (cancelled: {row['cancelled']})" if row["cancelled"] else ""
+        print(f"| {row['node']} | {row['executions']}{cancelled} | {row['mean_ms']:.0f} | {row['p50_ms']:.0f} | {row['p95_ms']:.0f} | "
+              f"{row['p99_ms']:.0f} | {row['share']:.0%} | {row['prompt_tokens']:.0f} | {row['completion_tokens']:.0f} | "
+              f"{row['retries']} | {row['errors']} |")
@@ -1,17 +1,12 @@
+import os
 import logging
-from typing import Literal
-from langgraph.graph import StateGraph, START, END
-from langgraph_project.state import AgentState
-from langgraph_project.agents.agents import (
-    Orchestrator,
-    GeneralQuestionAgent,
-    AskMoreInfoAgent,
-    RAGAgent,
-    GenerateResponseAgent
-)
+import argparse
+from langgraph_project.graph import build_graph
+from langgraph_project.agents.pre_router import PreRouter
 from langgraph_project.agents.configuration import AgentsConfiguration
-from langgraph_project.utils import create_tool_node_with_fallback, save_graph_image, _print_event
-from langgraph_project.tools import retrieve_information_vectorbase
+from langgraph_project.utils import save_graph_image
+from langgraph_project.instrumentation import instrument, print_stats, print_trace
+from langgraph_project.vector_store.index import get_index
 from langgraph_project.settings import settings
 
 
@@ -26,65 +21,56 @@ main_logger = logging.getLogger("main")
 main_logger.debug("Debug Mode Active")
 
 
-# Define the graph
-builder = StateGraph(AgentState)
-
-# Orchestrator
-builder.add_node("orchestrator", Orchestrator())
-# Ask for more info agent
-builder.add_node("ask_user_more_info_agent", AskMoreInfoAgent())
-# Responds to a general question (no RAG)
-builder.add_node("respond_to_general_question_agent", GeneralQuestionAgent())
-# RAG agent - with the tool for retrieving information
-builder.add_node("rag_agent", RAGAgent(
-    AgentsConfiguration.llm.bind_tools([retrieve_information_vectorbase])
-))
-# Tools nodes
-builder.add_node(
-    "retrieve_information_vectorbase", 
-    create_tool_node_with_fallback([retrieve_information_vectorbase])
+# Define the graph, traced per node
+graph = instrument(
+    build_graph(
+        pre_router=PreRouter.from_settings(),
+        speculative_retrieval=settings.speculative_retrieval,
+        context_policies=AgentsConfiguration.context_policies if settings.context_pruning else None,
+    ),
+    history=settings.trace_history,
+    trace_path=settings.trace_path or None,
 )
-# Generate responses after executing RAG
-builder.add_node("generate_response_agent", GenerateResponseAgent())
-
-# Edges
-builder.add_edge(START, "orchestrator")
-
-def route_agent(
-    state: AgentState
-) -> Literal["rag_agent", "ask_user_more_info_agent", "respond_to_general_question_agent"]:
-    _type = state["message"]["type"]
-    if _type == "user":
-        return "rag_agent"
-    elif _type == "more-info":
-        return "ask_user_more_info_agent"
-    elif _type == "general":
-        return "respond_to_general_question_agent"
-    else:
-        raise ValueError(f"Unknown router type {_type}")
-
-builder.add_conditional_edges(
-    "orchestrator", route_agent, ["rag_agent", "ask_user_more_info_agent", "respond_to_general_question_agent"]
-)
-builder.add_edge("rag_agent", "retrieve_information_vectorbase")
-builder.add_edge("retrieve_information_vectorbase", "generate_response_agent")
-
-# Compile into a graph object that you can invoke and deploy.
-graph = builder.compile()
-graph.name = "RetrievalGraph"
 
-save_graph_image(graph, "./img", "graph.png")
 
-# result = graph.invoke({"messages": [("user", "How much does John Doe pay for his service?")]})
-
-# print(result)
-_printed = set()
-events = graph.stream(
-    {"messages": ("user", "What is John Doe's account number?")}, stream_mode="values" # RAG
-    # {"messages": ("user", "Can you tell me John's number?")}, stream_mode="values" # More info
-    # {"messages": ("user", "Which stocks showed the most growth in the last 5 years?")}, stream_mode="values" # General
-
-)
-
-for event in events:
-    _print_event(event, _printed)
\ No newline at end of file
+def ask(question: str, runs: int = 1) -> None:
+    """
+    Ask the question `runs` times: print the answer and the trace of each run (time,
+    tokens and retries of each node), then the percentiles across the runs.
+    """
+    for _ in range(runs):
+        state = graph.invoke({"messages": ("user", question)})
+        print(state["messages"][-1].pretty_repr())
+        print_trace(graph.last_trace)
+    if runs > 1:
+        print()
+        print_stats(graph.stats.summary())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the RetrievalGraph.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    ask_parser = subparsers.add_parser("ask", help="Ask the graph a question (default command).")
+    ask_parser.add_argument(
+        "question",
+        nargs="?",
+        default="What is John Doe's account number?", # RAG
+        # default="Can you tell me John's number?", # More info
+        # default="Which stocks showed the most growth in the last 5 years?", # General
+    )
+    ask_parser.add_argument("--runs", type=int, default=1, help="Repeat the question, to get latency percentiles per node.")
+
+    draw_parser = subparsers.add_parser("draw-graph", help="Render the graph as a mermaid PNG (remote call to mermaid.ink).")
+    draw_parser.add_argument("--output", default="./img/graph.png")
+
+    subparsers.add_parser("build-index", help="Build the persisted index of the knowledge base ahead of the first query.")
+
+    args = parser.parse_args()
+
+    if args.command == "draw-graph":
+        save_graph_image(graph, os.path.dirname(args.output) or ".", os.path.basename(args.output))
+    elif args.command == "build-index":
+        get_index()
+    else:
+        ask(getattr(args, "question", None) or ask_parser.get_default("question"), getattr(args, "runs", 1))
@@ -0,0 +1,119 @@
+import json
+import time
+import uuid
+import asyncio
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.tools import StructuredTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langgraph_project.tools.retriever_tool import join_documents
+
+
+class MockChatModel(BaseChatModel):
+    """
+    Chat model answering without any API call, after a fixed latency, to benchmark the
+    graph and the service. It follows the graph protocol: the Router structured output
+    gets `route`, a model with the retrieval tool calls it with the last user question,
+    and any other prompt gets a short text answer, streamed word by word. The usage
+    reported counts words as tokens.
+    """
+
+    latency_ms: float = 200.0
+    token_ms: float = 0.0
+    route: str = "user"
+
+    @property
+    def _llm_type(self) -> str:
+        return "mock"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable:
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    @staticmethod
+    def _usage(messages: list[BaseMessage], reply: AIMessage) -> dict:
+        input_tokens = sum(len(str(m.content).split()) for m in messages)
+        output_tokens = len(reply.content.split()) + sum(len(json.dumps(call["args"]).split()) for call in reply.tool_calls)
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _reply(self, messages: list[BaseMessage], tools: Optional[list[dict]]) -> AIMessage:
+        reply = self._answer(messages, tools)
+        reply.usage_metadata = self._usage(messages, reply)
+        return reply
+
+    def _answer(self, messages: list[BaseMessage], tools: Optional[list[dict]]) -> AIMessage:
+        question = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        # The agents send their formatted prompt as one message: keep the last user turn
+        question = question.rsplit("Human: ", 1)[-1].strip()
+        if tools:
+            name = tools[0]["function"]["name"]
+            args = {"type": self.route, "logic": "mock"} if name == "Router" else {"queries": [question]}
+            return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}])
+        return AIMessage(content=f"Mock answer to: {question}")
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, kwargs.get("tools")))])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, kwargs.get("tools")))])
+
+    def _chunks(self, message: AIMessage) -> Iterator[AIMessageChunk]:
+        if message.tool_calls:
+            call = message.tool_calls[0]
+            yield AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0}
+            ], usage_metadata=message.usage_metadata)
+            return
+        words = message.content.split(" ")
+        for i, word in enumerate(words):
+            # The usage comes with the last chunk, as with OpenAI's stream_usage
+            yield AIMessageChunk(
+                content=word if i == 0 else " " + word,
+                usage_metadata=message.usage_metadata if i == len(words) - 1 else None,
+            )
+
+    def _stream(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_ms / 1000)
+        for chunk in self._chunks(self._reply(messages, kwargs.get("tools"))):
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+            time.sleep(self.token_ms / 1000)
+
+    async def _astream(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_ms / 1000)
+        for chunk in self._chunks(self._reply(messages, kwargs.get("tools"))):
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+            await asyncio.sleep(self.token_ms / 1000)
+
+
+def mock_retriever_tool(latency_ms: float, document_chars: int = 0) -> StructuredTool:
+    """
+    Stand-in for the vector search: same name, fixed latency, no index. Each document is
+    padded to `document_chars` characters, like the user records of the knowledge base.
+    """
+    def documents(queries: list[str]) -> str:
+        return join_documents([f"Mock document about: {query}".ljust(document_chars, ".") for query in queries])
+
+    def retrieve(queries: list[str]) -> str:
+        time.sleep(latency_ms / 1000)
+        return documents(queries)
+
+    async def aretrieve(queries: list[str]) -> str:
+        await asyncio.sleep(latency_ms / 1000)
+        return documents(queries)
+
+    return StructuredTool.from_function(
+        func=retrieve,
+        coroutine=aretrieve,
+        name="retrieve_information_vectorbase",
+        description="Retrieve information from the knowledge base.",
+    )
@@ -0,0 +1,182 @@
+import json
+import time
+import asyncio
+import logging
+import argparse
+import weakref
+from typing import Any, AsyncIterator, Optional
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph.state import CompiledStateGraph
+from langgraph_project.graph import build_graph
+from langgraph_project.agents.pre_router import PreRouter
+from langgraph_project.agents.configuration import AgentsConfiguration
+from langgraph_project.instrumentation import InstrumentedGraph, instrument
+from langgraph_project.settings import settings
+
+
+service_logger = logging.getLogger("service")
+
+
+class RunRequest(BaseModel):
+    question: str
+
+
+class RunResponse(BaseModel):
+    thread_id: str
+    answer: str
+    route: Optional[dict] = None
+    duration_ms: float
+
+
+def _jsonable(value: Any) -> Any:
+    """Node outputs as JSON-compatible values (messages as type, content and tool calls)."""
+    if isinstance(value, BaseMessage):
+        data = {"type": value.type, "content": value.content}
+        if getattr(value, "tool_calls", None):
+            data["tool_calls"] = value.tool_calls
+        if getattr(value, "name", None):
+            data["name"] = value.name
+        return data
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class GraphService:
+    """
+    Runs the compiled RetrievalGraph for many clients at once on one event loop.
+
+    Every run uses the async path of the graph (ainvoke/astream), so the model calls of
+    concurrent requests overlap instead of queueing behind each other. Conversations are
+    checkpointed per `thread_id`: the runs of one thread are serialized (each one resumes
+    from the state left by the previous), while different threads run in parallel, up to
+    `max_concurrency` runs in flight.
+    """
+
+    def __init__(self, graph: CompiledStateGraph | InstrumentedGraph, max_concurrency: int = 64):
+        self.graph = graph
+        self.slots = asyncio.Semaphore(max_concurrency)
+        # thread_id -> lock, dropped once no run of the thread holds or awaits it
+        self._thread_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+
+    def _lock(self, thread_id: str) -> asyncio.Lock:
+        lock = self._thread_locks.get(thread_id)
+        if lock is None:
+            lock = self._thread_locks[thread_id] = asyncio.Lock()
+        return lock
+
+    @staticmethod
+    def _config(thread_id: str) -> dict:
+        return {"configurable": {"thread_id": thread_id}}
+
+    async def run(self, thread_id: str, question: str) -> RunResponse:
+        start = time.perf_counter()
+        async with self._lock(thread_id), self.slots:
+            state = await self.graph.ainvoke({"messages": [("user", question)]}, self._config(thread_id))
+        return RunResponse(
+            thread_id=thread_id,
+            answer=str(state["messages"][-1].content),
+            route=state.get("message"),
+            duration_ms=1000 * (time.perf_counter() - start),
+        )
+
+    async def stream(self, thread_id: str, question: str) -> AsyncIterator[str]:
+        """
+        Server-sent events of a run: "update" when a node finishes (with its output),
+        "token" for each token generated by an agent, then "end" (or "error").
+        """
+        start = time.perf_counter()
+        async with self._lock(thread_id), self.slots:
+            try:
+                async for mode, chunk in self.graph.astream(
+                    {"messages": [("user", question)]},
+                    self._config(thread_id),
+                    stream_mode=["updates", "messages"],
+                ):
+                    if mode == "updates":
+                        for node, update in chunk.items():
+                            yield _sse("update", {"node": node, "output": _jsonable(update)})
+                    else:
+                        message, metadata = chunk
+                        if isinstance(message, AIMessageChunk) and message.content:
+                            yield _sse("token", {"node": metadata.get("langgraph_node"), "content": message.content})
+            except Exception as e:
+                service_logger.exception(f"Run failed on thread {thread_id}")
+                yield _sse("error", {"error": repr(e)})
+                return
+        yield _sse("end", {"thread_id": thread_id, "duration_ms": 1000 * (time.perf_counter() - start)})
+
+    async def history(self, thread_id: str) -> list[dict]:
+        snapshot = await self.graph.aget_state(self._config(thread_id))
+        return _jsonable(snapshot.values.get("messages", []))
+
+
+def create_app(graph: Optional[CompiledStateGraph | InstrumentedGraph] = None, max_concurrency: Optional[int] = None) -> FastAPI:
+    """
+    Build the HTTP API of the RetrievalGraph.
+
+    The runs are traced per node (`instrumentation.InstrumentedGraph`): GET /stats gives
+    the percentiles of the time of each node over the last `settings.trace_history` runs.
+
+    Args:
+        graph: The compiled graph, it needs a checkpointer. By default the graph of the
+            agents with an in-memory checkpointer (and the pre-router of the settings).
+        max_concurrency: Maximum number of runs in flight, `settings.service_max_concurrency` by default.
+    """
+    if graph is None:
+        graph = build_graph(
+            checkpointer=MemorySaver(),
+            pre_router=PreRouter.from_settings(),
+            speculative_retrieval=settings.speculative_retrieval,
+            context_policies=AgentsConfiguration.context_policies if settings.context_pruning else None,
+        )
+    if not isinstance(graph, InstrumentedGraph):
+        graph = instrument(graph, settings.trace_history, settings.trace_path or None)
+    service = GraphService(graph, max_concurrency or settings.service_max_concurrency)
+    app = FastAPI(title=graph.name)
+    app.state.service = service
+
+    @app.get("/health")
+    async def health() -> dict:
+        return {"status": "ok"}
+
+    @app.get("/stats")
+    async def stats() -> list[dict]:
+        return graph.stats.summary()
+
+    @app.post("/threads/{thread_id}/runs", response_model=RunResponse)
+    async def run(thread_id: str, request: RunRequest) -> RunResponse:
+        return await service.run(thread_id, request.question)
+
+    @app.post("/threads/{thread_id}/runs/stream")
+    async def stream(thread_id: str, request: RunRequest) -> StreamingResponse:
+        return StreamingResponse(service.stream(thread_id, request.question), media_type="text/event-stream")
+
+    @app.get("/threads/{thread_id}/history")
+    async def history(thread_id: str) -> list[dict]:
+        return await service.history(thread_id)
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the RetrievalGraph over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    uvicorn.run(create_app(), host=args.host, port=args.port)
@@ -8,6 +8,24 @@ class Settings(BaseSettings):
     openai_model_name: str = "gpt-4o-mini"
     embeddings_model_name: str = "text-embedding-ada-002"
     knowledge_base_path: str = "./knowledge-base"
+    index_persist_path: str = "./.index"
+    vector_backend: str = "chroma"
+    ivf_lists: int = 256
+    ivf_nprobe: int = 8
+    hnsw_ef: int = 64
+    retrieval_k: int = 2
+    retrieval_search_type: str = "mmr"
+    retrieval_fetch_k: int = 20
+    retrieval_cache_size: int = 256
+    service_max_concurrency: int = 64
+    pre_router_enabled: bool = False
+    pre_router_min_confidence: float = 0.8
+    pre_router_embeddings: str = "hashing"
+    speculative_retrieval: str = "off"
+    context_pruning: bool = True
+    routing_examples_path: str = "./routing-examples.jsonl"
+    trace_path: str = ""
+    trace_history: int = 1000
 
     class Config:
         env_file = ".env"
@@ -5,7 +5,7 @@ definitions for agent state, input state, and router classification schema.
 """
 
 from dataclasses import dataclass, field
-from typing import Annotated, Literal, TypedDict
+from typing import Annotated, Literal, Optional, TypedDict
 
 from langchain_core.documents import Document
 from langchain_core.messages import AnyMessage
@@ -26,6 +26,8 @@ class AgentState(TypedDict):
     """
 
     messages: Annotated[list[AnyMessage], add_messages]
+    message: "Router" # the orchestrator's classification of the last query
+    prefetched: Optional[str] # documents of the speculative retrieval of the last query
     
 
 class Router(TypedDict):
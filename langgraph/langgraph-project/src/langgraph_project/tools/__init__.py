@@ -1,5 +1,8 @@
-from .retriever_tool import retrieve_information_vectorbase
+from .retriever_tool import DOCUMENT_HEADER, join_documents, retrieve_information_vectorbase, split_documents
 
 __all__ = [
+    "DOCUMENT_HEADER",
+    "join_documents",
     "retrieve_information_vectorbase",
+    "split_documents",
 ]
\ No newline at end of file
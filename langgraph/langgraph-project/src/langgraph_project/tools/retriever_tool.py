@@ -1,23 +1,34 @@
+import re
 from langchain_core.tools import tool
-from langchain_mongodb import MongoDBAtlasVectorSearch
-from langgraph_project.vector_store.loader import load_documents_from_folder
-from langgraph_project.vector_store.index import create_index
-from langgraph_project.settings import settings
+from langgraph_project.vector_store.retriever import get_retriever
 
+# Header line of each document of a search result, "[Document <n>]": the result splits
+# back into whole documents however many blank lines (or rules) they have
+DOCUMENT_HEADER = re.compile(r"^\[Document \d+\]\n", re.MULTILINE)
+
+
+def join_documents(documents: list[str]) -> str:
+    return "\n\n".join(f"[Document {i}]\n{document.strip()}" for i, document in enumerate(documents, start=1))
+
+
+def split_documents(result: str) -> list[str]:
+    return [document.strip() for document in DOCUMENT_HEADER.split(result) if document.strip()]
 
-# Initialize the VectorStore and set the index
-docs = load_documents_from_folder(settings.knowledge_base_path)
-index = create_index(docs)
 
 @tool
-def retrieve_information_vectorbase(query: str):
-    """Retrieve information from a MongoDB Atlas Vector Search index.
-    
+def retrieve_information_vectorbase(queries: list[str]):
+    """Retrieve information about the users (accounts, usage, billing) from the knowledge base.
+
+    Pass all the queries at once (e.g. several phrasings, or the name and the account
+    number): they are searched together in one call.
+
     Args:
-        query (str): The search query.
+        queries (list[str]): The search queries.
 
     Returns:
-        str: Retrieved documents concatenated as a string.
+        str: The documents found, each one once, each under a "[Document <n>]" line.
     """
-    documents = index.similarity_search(query=query, k=1)
-    return "\n\n".join([doc.page_content for doc in documents]) 
+    # The index is built (or loaded from disk) on the first search, not at import
+    documents = get_retriever().search(queries)
+    return join_documents([doc.page_content for doc in documents])
+
@@ -57,18 +57,3 @@ def save_graph_image(graph, directory, filename="graph.png"):
         print(f"Graph saved to {os.path.join(directory, filename)}")
     except Exception as e:
         print(f"Failed to save graph: {e}")
-
-def _print_event(event: dict, _printed: set, max_length=1500):
-    current_state = event.get("dialog_state")
-    if current_state:
-        print("Currently in: ", current_state[-1])
-    message = event.get("messages")
-    if message:
-        if isinstance(message, list):
-            message = message[-1]
-        if message.id not in _printed:
-            msg_repr = message.pretty_repr(html=True)
-            if len(msg_repr) > max_length:
-                msg_repr = msg_repr[:max_length] + " ... (truncated)"
-            print(msg_repr)
-            _printed.add(message.id)
@@ -0,0 +1,525 @@
+import os
+import re
+import json
+import shutil
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from logging import getLogger
+from typing import Optional
+import numpy as np
+
+
+backend_logger = getLogger("vector_backend")
+
+# Vectors searched per block by the exhaustive scans, to bound the memory used
+SCAN_BLOCK = 65536
+# SQLite limit on the parameters of a query
+SQL_BATCH = 900
+# Folder of a generation of the files of a store
+GENERATION = re.compile(r"^g(\d+)$")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class VectorBackend(ABC):
+    """
+    Persistent store of vectors keyed by string ids, searched by cosine similarity.
+
+    The vectors live in a memory-mapped file (`vectors.f32`), so the store is not bound
+    by RAM, and the id of each row in SQLite (`ids.sqlite`). Upserts append rows (the
+    previous row of an updated id is marked deleted) and deletes only mark rows, so both
+    are incremental; `compact()` rewrites the store without the deleted rows.
+
+    `meta.json` (written atomically) counts the rows before ids.sqlite refers to them,
+    and names the generation of the files in use (`g<n>/`): `compact()` writes the next
+    generation and switches to it by rewriting meta.json, so a crash at any point leaves
+    a store that opens with the data of the last completed update.
+
+    Subclasses add an index over the rows (`_candidates`, `_on_added`, ...); this base
+    class searches all of them.
+    """
+
+    kind = "flat"
+
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+        meta = self._read_meta()
+        if meta is not None and meta["dim"] != dim:
+            raise ValueError(f"The vector store {path} has dimension {meta['dim']}, not {dim}.")
+        self.generation = meta.get("generation", 0) if meta else 0
+        self._remove_other_generations()
+        os.makedirs(self._file(), exist_ok=True)
+
+        self._db = self._open_db()
+        self.rows, self.capacity, exists = self._recover_rows(meta)
+        self._vectors = self._open_vectors(self.capacity, "r+" if exists else "w+")
+        # row -> id of the live rows (None for deleted rows)
+        self._row_ids: list[Optional[str]] = [None] * self.rows
+        self._alive = np.zeros(self.capacity, dtype=bool)
+        for id_, row in self._db.execute("SELECT id, row FROM ids"):
+            self._row_ids[row] = id_
+            self._alive[row] = True
+
+    # ---- Storage -------------------------------------------------------------
+    def _read_meta(self) -> Optional[dict]:
+        path = os.path.join(self.path, "meta.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _meta(self) -> dict:
+        return {"kind": self.kind, "dim": self.dim, "rows": self.rows, "capacity": self.capacity,
+                "generation": self.generation}
+
+    def _write_meta(self) -> None:
+        path = os.path.join(self.path, "meta.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(self._meta(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{path}.tmp", path)
+
+    def _file(self, name: str = "") -> str:
+        """Path of a file of the current generation (its folder without `name`)."""
+        return os.path.join(self.path, f"g{self.generation}", name)
+
+    def _remove_other_generations(self) -> None:
+        # A compaction that did not complete, or the files it replaced
+        for entry in os.listdir(self.path):
+            match = GENERATION.match(entry)
+            if match and int(match.group(1)) != self.generation:
+                shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+
+    def _open_db(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self._file("ids.sqlite"), check_same_thread=False)
+        db.execute("CREATE TABLE IF NOT EXISTS ids (id TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        return db
+
+    def _recover_rows(self, meta: Optional[dict]) -> tuple[int, int, bool]:
+        """
+        Rows and capacity of the store, and whether its vectors file exists, checked
+        against the files: ids.sqlite may refer to rows that meta.json does not count yet
+        (written by an older version, or meta.json missing).
+        """
+        (max_row,) = self._db.execute("SELECT MAX(row) FROM ids").fetchone()
+        rows = max(meta["rows"] if meta else 0, 0 if max_row is None else max_row + 1)
+        path = self._file("vectors.f32")
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size == 0:
+            if rows:
+                raise ValueError(f"The vector store {self.path} has {rows} rows but no vectors, rebuild it.")
+            return 0, 1024, False
+        capacity = size // (4 * self.dim)
+        if size % (4 * self.dim) or capacity < rows:
+            raise ValueError(
+                f"The vectors file of {self.path} ({size} bytes) does not hold the {rows} rows of dimension "
+                f"{self.dim} of the store, rebuild it."
+            )
+        return rows, capacity, True
+
+    def _open_vectors(self, capacity: int, mode: str) -> np.memmap:
+        return np.memmap(self._file("vectors.f32"), dtype=np.float32, mode=mode, shape=(capacity, self.dim))
+
+    def _grow(self, rows: int) -> None:
+        if rows <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < rows:
+            capacity *= 2
+        self._vectors.flush()
+        del self._vectors
+        with open(self._file("vectors.f32"), "r+b") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._vectors = self._open_vectors(capacity, "r+")
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - self.capacity, dtype=bool)])
+        self._on_grow(capacity)
+        self.capacity = capacity
+
+    def _rows_of(self, ids: list[str]) -> dict[str, int]:
+        found = {}
+        for i in range(0, len(ids), SQL_BATCH):
+            batch = ids[i:i + SQL_BATCH]
+            query = f"SELECT id, row FROM ids WHERE id IN ({','.join('?' * len(batch))})"
+            found.update(self._db.execute(query, batch).fetchall())
+        return found
+
+    # ---- Updates -------------------------------------------------------------
+    def upsert(self, ids: list[str], vectors: np.ndarray) -> None:
+        """Add the vectors, replacing the ones of the ids already stored."""
+        latest = dict(zip(ids, normalize(vectors)))  # an id repeated in the batch: the last one wins
+        if not latest:
+            return
+        ids = list(latest)
+        vectors = np.stack(list(latest.values()))
+        with self._lock:
+            replaced = list(self._rows_of(ids).values())
+            self._mark_deleted(replaced)
+            self._append(ids, vectors)
+
+    def _append(self, ids: list[str], vectors: np.ndarray, write_meta: bool = True) -> None:
+        start = self.rows
+        rows = np.arange(start, start + len(ids))
+        self._grow(start + len(ids))
+        self._vectors[start:start + len(ids)] = vectors
+        self._row_ids.extend(ids)
+        self._alive[rows] = True
+        self.rows += len(ids)
+        if write_meta:
+            # meta.json first: after a crash, ids.sqlite never refers to rows it does not count
+            self._write_meta()
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO ids (id, row) VALUES (?, ?)", zip(ids, rows.tolist()))
+        self._on_added(rows, vectors)
+
+    def delete(self, ids: list[str]) -> int:
+        """Delete the vectors of the ids. Returns how many were stored."""
+        with self._lock:
+            rows = self._rows_of(list(ids))
+            self._mark_deleted(list(rows.values()))
+            with self._db:
+                self._db.executemany("DELETE FROM ids WHERE id = ?", [(id_,) for id_ in rows])
+            return len(rows)
+
+    def _mark_deleted(self, rows: list[int]) -> None:
+        if not rows:
+            return
+        for row in rows:
+            self._row_ids[row] = None
+        self._alive[rows] = False
+        self._on_deleted(rows)
+
+    def compact(self) -> None:
+        """
+        Rewrite the store without the rows of deleted and replaced vectors, and reindex.
+        The store is written as the next generation of its files, which replaces the
+        current one once complete.
+        """
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self.rows])
+            ids = [self._row_ids[row] for row in rows]
+            vectors = np.array(self._vectors[rows]) if len(rows) else np.zeros((0, self.dim), dtype=np.float32)
+            previous_files, previous_db = self._file(), self._db
+            self._vectors.flush()
+            del self._vectors
+
+            self.generation += 1
+            shutil.rmtree(self._file(), ignore_errors=True)
+            os.makedirs(self._file())
+            self._db = self._open_db()
+            self.rows, self.capacity = 0, 1024
+            self._vectors = self._open_vectors(self.capacity, "w+")
+            self._row_ids = []
+            self._alive = np.zeros(self.capacity, dtype=bool)
+            self._reset_index()
+            for i in range(0, len(ids), SCAN_BLOCK):
+                # meta.json still names the previous generation until the flush
+                self._append(ids[i:i + SCAN_BLOCK], vectors[i:i + SCAN_BLOCK], write_meta=False)
+            self.flush()
+
+            previous_db.close()
+            shutil.rmtree(previous_files, ignore_errors=True)
+
+    def flush(self) -> None:
+        """Write the vectors, the index and the metadata to disk."""
+        with self._lock:
+            self._vectors.flush()
+            self._save_index()
+            self._write_meta()
+
+    def close(self) -> None:
+        self.flush()
+        self._db.close()
+
+    # ---- Queries -------------------------------------------------------------
+    def __len__(self) -> int:
+        return int(self._alive[:self.rows].sum())
+
+    def get(self, ids: list[str]) -> np.ndarray:
+        """Vectors of the ids (normalised), in order. Raises KeyError for unknown ids."""
+        with self._lock:
+            rows = self._rows_of(list(ids))
+            return np.array(self._vectors[[rows[id_] for id_ in ids]])
+
+    def search(self, vector: np.ndarray, k: int) -> list[tuple[str, float]]:
+        """The k nearest ids and their cosine similarity, best first."""
+        query = normalize(vector)[0]
+        with self._lock:
+            rows, scores = self._search(query, k)
+            return [(self._row_ids[row], float(score)) for row, score in zip(rows, scores) if self._row_ids[row] is not None]
+
+    def _search(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        candidates = self._candidates(query)
+        if candidates is None:
+            return self._scan(query, k)
+        candidates = candidates[self._alive[candidates]]
+        scores = self._vectors[candidates] @ query
+        top = _top_k(scores, k)
+        return candidates[top], scores[top]
+
+    def _scan(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Exhaustive search, block by block."""
+        best_rows, best_scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        for start in range(0, self.rows, SCAN_BLOCK):
+            end = min(start + SCAN_BLOCK, self.rows)
+            rows = start + np.flatnonzero(self._alive[start:end])
+            scores = self._vectors[rows] @ query if len(rows) else np.zeros(0, dtype=np.float32)
+            best_rows, best_scores = np.concatenate([best_rows, rows]), np.concatenate([best_scores, scores])
+            top = _top_k(best_scores, k)
+            best_rows, best_scores = best_rows[top], best_scores[top]
+        return best_rows, best_scores
+
+    # ---- Index hooks ---------------------------------------------------------
+    def _candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """Rows to score for the query, None to scan them all."""
+        return None
+
+    def _on_added(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        pass
+
+    def _on_deleted(self, rows: list[int]) -> None:
+        pass
+
+    def _on_grow(self, capacity: int) -> None:
+        pass
+
+    def _save_index(self) -> None:
+        pass
+
+    def _reset_index(self) -> None:
+        pass
+
+
+class IVFBackend(VectorBackend):
+    """
+    Inverted file index: the vectors are clustered around `n_lists` centroids (spherical
+    k-means) and a query only scores the vectors of its `nprobe` nearest clusters.
+
+    The centroids are trained once the store holds `train_factor` vectors per list (the
+    store is scanned until then), and new vectors join the list of their nearest centroid.
+    Call `train()` to recluster after the data has changed a lot.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, path: str, dim: int, n_lists: int = 256, nprobe: int = 8, train_factor: int = 39):
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.train_factor = train_factor
+        self.centroids: Optional[np.ndarray] = None
+        # Lists of rows per centroid; rows added since the last search are kept in _pending
+        self._lists: list[np.ndarray] = []
+        self._pending: list[list[int]] = []
+        super().__init__(path, dim)
+
+        self._assign = self._open_assign(self.capacity)
+        centroids_path = self._file("centroids.npy")
+        if os.path.exists(centroids_path):
+            self.centroids = np.load(centroids_path)
+            self.n_lists = len(self.centroids)
+            self._build_lists()
+
+    def _meta(self) -> dict:
+        return {**super()._meta(), "n_lists": self.n_lists}
+
+    def _open_assign(self, capacity: int) -> np.memmap:
+        path = self._file("assign.i32")
+        if os.path.exists(path) and os.path.getsize(path) < capacity * 4:
+            with open(path, "r+b") as f:
+                f.truncate(capacity * 4)
+        return np.memmap(path, dtype=np.int32, mode="r+" if os.path.exists(path) else "w+", shape=(capacity,))
+
+    def _on_grow(self, capacity: int) -> None:
+        self._assign.flush()
+        del self._assign
+        self._assign = self._open_assign(capacity)
+
+    def _build_lists(self) -> None:
+        rows = np.flatnonzero(self._alive[:self.rows])
+        assign = np.asarray(self._assign[rows])
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(self.n_lists + 1))
+        self._lists = [rows[order[bounds[i]:bounds[i + 1]]] for i in range(self.n_lists)]
+        self._pending = [[] for _ in range(self.n_lists)]
+
+    def _nearest_centroids(self, vectors: np.ndarray) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(vectors[i:i + SCAN_BLOCK] @ self.centroids.T, axis=1)
+            for i in range(0, len(vectors), SCAN_BLOCK)
+        ]).astype(np.int32) if len(vectors) else np.zeros(0, dtype=np.int32)
+
+    def train(self, iterations: int = 10, sample: Optional[int] = None, seed: int = 0) -> None:
+        """Cluster the vectors (on a sample of `sample` vectors) and reassign all of them."""
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self.rows])
+            n_lists = min(self.n_lists, len(rows))
+            if n_lists == 0:
+                return
+            rng = np.random.default_rng(seed)
+            sample_rows = np.sort(rng.choice(rows, min(len(rows), sample or n_lists * 256), replace=False))
+            data = np.array(self._vectors[sample_rows])
+            centroids = data[rng.choice(len(data), n_lists, replace=False)]
+            for _ in range(iterations):
+                assign = np.argmax(data @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, data)
+                empty = np.bincount(assign, minlength=n_lists) == 0
+                # An empty cluster restarts from a random vector
+                sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+                centroids = normalize(sums)
+
+            self.centroids, self.n_lists = centroids, n_lists
+            for start in range(0, len(rows), SCAN_BLOCK):
+                block = rows[start:start + SCAN_BLOCK]
+                self._assign[block] = self._nearest_centroids(np.array(self._vectors[block]))
+            self._build_lists()
+            # The assignments refer to these centroids: save them together
+            self._save_index()
+            backend_logger.info(f"Trained {n_lists} lists on {len(sample_rows)} of {len(rows)} vectors")
+
+    def _on_added(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        if self.centroids is None:
+            if len(self) >= self.n_lists * self.train_factor:
+                self.train()
+            return
+        assign = self._nearest_centroids(vectors)
+        self._assign[rows] = assign
+        for row, list_id in zip(rows.tolist(), assign.tolist()):
+            self._pending[list_id].append(row)
+
+    def _candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        if self.centroids is None:
+            return None
+        probes = _top_k(self.centroids @ query, min(self.nprobe, self.n_lists))
+        for list_id in probes:
+            if self._pending[list_id]:
+                self._lists[list_id] = np.concatenate([self._lists[list_id], self._pending[list_id]])
+                self._pending[list_id] = []
+        return np.concatenate([self._lists[list_id] for list_id in probes])
+
+    def _save_index(self) -> None:
+        self._assign.flush()
+        if self.centroids is not None:
+            np.save(self._file("centroids.npy"), self.centroids)
+
+    def _reset_index(self) -> None:
+        # Called by `compact()`, on the files of the new generation
+        self.centroids = None
+        self._lists, self._pending = [], []
+        self._assign.flush()
+        del self._assign
+        self._assign = self._open_assign(self.capacity)
+
+
+class HNSWBackend(VectorBackend):
+    """
+    Hierarchical navigable small world graph over the rows (requires `hnswlib`): the
+    graph is updated on every upsert and delete, and saved next to the vectors.
+    """
+
+    kind = "hnsw"
+
+    def __init__(self, path: str, dim: int, m: int = 16, ef_construction: int = 200, ef: int = 64):
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise ImportError("The HNSW backend needs hnswlib: pip install hnswlib") from e
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef = ef
+        super().__init__(path, dim)
+
+        graph_path = self._file("hnsw.bin")
+        if os.path.exists(graph_path):
+            self._graph = hnswlib.Index(space="ip", dim=dim)
+            self._graph.load_index(graph_path, max_elements=self.capacity)
+        else:
+            self._reset_index()
+        self._sync_graph()
+
+    def _sync_graph(self) -> None:
+        """
+        Bring the graph in line with the rows: hnsw.bin is only written by `flush()`, so
+        after a crash it may miss the rows added since, and still hold the deleted ones.
+        """
+        indexed = np.asarray(self._graph.get_ids_list(), dtype=np.int64)
+        alive = np.flatnonzero(self._alive[:self.rows])
+        missing = np.setdiff1d(alive, indexed)
+        for start in range(0, len(missing), SCAN_BLOCK):
+            rows = missing[start:start + SCAN_BLOCK]
+            self._graph.add_items(np.array(self._vectors[rows]), rows)
+        for row in np.setdiff1d(indexed, alive).tolist():
+            try:
+                self._graph.mark_deleted(row)
+            except RuntimeError:
+                pass  # already marked deleted in the saved graph
+        if len(missing):
+            backend_logger.info(f"Added {len(missing)} rows missing from the saved HNSW graph")
+
+    def _on_added(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        self._graph.add_items(vectors, rows)
+
+    def _on_deleted(self, rows: list[int]) -> None:
+        for row in rows:
+            self._graph.mark_deleted(row)
+
+    def _on_grow(self, capacity: int) -> None:
+        self._graph.resize_index(capacity)
+
+    def _search(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        k = min(k, len(self))
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        self._graph.set_ef(max(self.ef, k))
+        labels, distances = self._graph.knn_query(query, k=k)
+        # "ip" distances are 1 - inner product
+        return labels[0].astype(np.int64), 1 - distances[0]
+
+    def _save_index(self) -> None:
+        self._graph.save_index(self._file("hnsw.bin"))
+
+    def _reset_index(self) -> None:
+        import hnswlib
+
+        self._graph = hnswlib.Index(space="ip", dim=self.dim)
+        self._graph.init_index(max_elements=self.capacity, ef_construction=self.ef_construction, M=self.m)
+
+
+BACKENDS: dict[str, type[VectorBackend]] = {
+    VectorBackend.kind: VectorBackend,
+    IVFBackend.kind: IVFBackend,
+    HNSWBackend.kind: HNSWBackend,
+}
+
+
+def open_backend(kind: str, path: str, dim: Optional[int] = None, **params) -> Optional[VectorBackend]:
+    """
+    Open the backend stored at `path`, or create it with `dim`. Returns None if there is
+    no store yet and no dimension to create it with.
+    """
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown vector backend '{kind}', expected one of {tuple(BACKENDS)}.")
+    meta_path = os.path.join(path, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            dim = json.load(f)["dim"]
+    if dim is None:
+        return None
+    return BACKENDS[kind](path, dim, **params)
@@ -1,18 +1,64 @@
+import os
+import re
+import glob
+import json
+import shutil
+import hashlib
+import threading
 from logging import getLogger
+from typing import Optional
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_mongodb import MongoDBAtlasVectorSearch
-from langchain_core.vectorstores import VectorStoreRetriever
+from langchain_core.vectorstores import VectorStore, VectorStoreRetriever
 from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langgraph_project.settings import settings
+from langgraph_project.vector_store.backends import BACKENDS
 
 
 index_logger = getLogger("index")
 
-def create_index(documents: list[Document]) -> Chroma:
+# Written once an index is fully built, so a partially built one is never reused
+COMPLETE_MARKER = ".complete"
+# State of the knowledge base a local store is in sync with
+SYNC_MARKER = "synced.json"
+# Name of the chroma index folders: the knowledge base hash
+KB_HASH = re.compile(r"[0-9a-f]{16}")
+
+VECTOR_BACKENDS = ("chroma", *BACKENDS)
+
+_index: Optional[VectorStore] = None
+_index_lock = threading.Lock()
+
+
+def _embeddings() -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(
+        model=settings.embeddings_model_name,
+        api_key=settings.openai_api_key.get_secret_value()
+    )
+
+
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def knowledge_base_hash(knowledge_base_path: str) -> str:
     """
-    Create a simple index using the in memory Chroma
+    Hash of the knowledge base content (the `.md` files and their names) and of the
+    embeddings model, used to key the persisted index: any change gives a new index.
+    """
+    digest = hashlib.sha256(settings.embeddings_model_name.encode())
+    for path in sorted(glob.glob(os.path.join(knowledge_base_path, "*.md"))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+def create_index(documents: list[Document], persist_directory: Optional[str] = None) -> Chroma:
+    """
+    Create a simple index using Chroma (in memory, or persisted to `persist_directory`)
     """
     index_logger.info(f"Processing Index for {len(documents)} docs")
     # text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
@@ -20,10 +66,118 @@ def create_index(documents: list[Document]) -> Chroma:
     # )
     # doc_splits = text_splitter.split_documents(documents)
     index = Chroma.from_documents(
-        documents, 
-        OpenAIEmbeddings(
-            model=settings.embeddings_model_name, 
-            api_key=settings.openai_api_key.get_secret_value()
-        ),
+        documents,
+        _embeddings(),
+        persist_directory=persist_directory,
     )
     return index
+
+
+def get_index() -> VectorStore:
+    """
+    Return the knowledge base index, initialised on first use.
+
+    With the `chroma` backend (`settings.vector_backend`), the index is persisted under
+    `settings.index_persist_path`, in a folder named after the knowledge base hash: it is
+    embedded once and reopened from disk afterwards, and rebuilt only when the knowledge
+    base (or the embeddings model) changes.
+
+    The local backends (`flat`, `ivf`, `hnsw`) are persisted in a folder named after the
+    backend and kept in sync with the knowledge base file by file: only the files added
+    or changed since the last sync are embedded, and the removed ones are deleted.
+    """
+    global _index
+    if settings.vector_backend not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend '{settings.vector_backend}', expected one of {VECTOR_BACKENDS}.")
+    with _index_lock:
+        if _index is None:
+            if settings.vector_backend == "chroma":
+                _index = _load_or_build_index(settings.knowledge_base_path, settings.index_persist_path)
+            else:
+                _index = _load_or_sync_local_index(
+                    settings.knowledge_base_path, settings.index_persist_path, settings.vector_backend
+                )
+        return _index
+
+
+def _load_or_build_index(knowledge_base_path: str, persist_path: str) -> Chroma:
+    kb_hash = knowledge_base_hash(knowledge_base_path)
+    directory = os.path.join(persist_path, kb_hash)
+
+    if os.path.exists(os.path.join(directory, COMPLETE_MARKER)):
+        index_logger.info(f"Loading persisted index {directory}")
+        return Chroma(embedding_function=_embeddings(), persist_directory=directory)
+
+    # Imported here: loading documents pulls in the unstructured parsers
+    from langgraph_project.vector_store.loader import load_documents_from_folder
+
+    shutil.rmtree(directory, ignore_errors=True)
+    index = create_index(load_documents_from_folder(knowledge_base_path), persist_directory=directory)
+    open(os.path.join(directory, COMPLETE_MARKER), "w").close()
+
+    # Remove the indexes of previous versions of the knowledge base, and nothing else:
+    # the persist path may be shared (the local stores, or any other folder)
+    for entry in os.listdir(persist_path):
+        old = os.path.join(persist_path, entry)
+        if entry != kb_hash and KB_HASH.fullmatch(entry) and os.path.exists(os.path.join(old, COMPLETE_MARKER)):
+            shutil.rmtree(old, ignore_errors=True)
+    return index
+
+
+def _backend_params(backend: str) -> dict:
+    if backend == "ivf":
+        return {"n_lists": settings.ivf_lists, "nprobe": settings.ivf_nprobe}
+    if backend == "hnsw":
+        return {"ef": settings.hnsw_ef}
+    return {}
+
+
+def _load_or_sync_local_index(knowledge_base_path: str, persist_path: str, backend: str) -> VectorStore:
+    # Imported here: the local store needs numpy (and hnswlib for the hnsw backend)
+    from langgraph_project.vector_store.local_store import LocalVectorStore
+
+    directory = os.path.join(persist_path, backend)
+    marker = os.path.join(directory, SYNC_MARKER)
+    synced = {}
+    if os.path.exists(marker):
+        with open(marker, encoding="utf-8") as f:
+            synced = json.load(f)
+    if synced and synced["embeddings_model"] != settings.embeddings_model_name:
+        # Vectors of another model cannot be mixed with new ones
+        shutil.rmtree(directory, ignore_errors=True)
+        synced = {}
+
+    store = LocalVectorStore(_embeddings(), directory, backend, **_backend_params(backend))
+    kb_hash = knowledge_base_hash(knowledge_base_path)
+    if synced.get("knowledge_base_hash") == kb_hash:
+        index_logger.info(f"Loading persisted {backend} index {directory}")
+        return store
+
+    files = {
+        os.path.basename(path): _file_hash(path)
+        for path in sorted(glob.glob(os.path.join(knowledge_base_path, "*.md")))
+    }
+    stored = {id_: metadata.get("file_hash") for id_, metadata in store.stored_metadata().items()}
+    changed = {name for name, file_hash in files.items() if stored.get(name) != file_hash}
+    removed = [id_ for id_ in stored if id_ not in files]
+
+    if changed:
+        # Imported here: loading documents pulls in the unstructured parsers
+        from langgraph_project.vector_store.loader import load_documents_from_folder
+
+        documents = [
+            document for document in load_documents_from_folder(knowledge_base_path)
+            if os.path.basename(document.metadata["source"]) in changed
+        ]
+        names = [os.path.basename(document.metadata["source"]) for document in documents]
+        store.add_texts(
+            [document.page_content for document in documents],
+            [{**document.metadata, "file_hash": files[name]} for document, name in zip(documents, names)],
+            ids=names,
+        )
+    store.delete(removed)
+    index_logger.info(f"Synced {backend} index {directory}: {len(changed)} files embedded, {len(removed)} removed")
+
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump({"knowledge_base_hash": kb_hash, "embeddings_model": settings.embeddings_model_name}, f)
+    return store
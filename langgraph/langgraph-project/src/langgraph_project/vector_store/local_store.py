@@ -0,0 +1,136 @@
+import os
+import json
+import uuid
+import sqlite3
+import threading
+from typing import Any, Iterable, Optional, Sequence
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+from langgraph_project.vector_store.backends import SQL_BATCH, VectorBackend, open_backend
+
+
+class LocalVectorStore(VectorStore):
+    """
+    LangChain vector store over a local `VectorBackend`: the vectors are searched by the
+    backend, the documents (text and metadata) are kept next to them in `docs.sqlite`.
+    """
+
+    def __init__(self, embedding: Embeddings, path: str, backend: str = "ivf", **backend_params):
+        """
+        Args:
+            embedding: Embeddings of the documents and queries.
+            path: Folder of the store, created if needed.
+            backend: One of `backends.BACKENDS`.
+            backend_params: Parameters of the backend (`nprobe`, `ef`, ...).
+        """
+        self.embedding = embedding
+        self.path = path
+        self.backend_kind = backend
+        self.backend_params = backend_params
+        os.makedirs(path, exist_ok=True)
+        # Created with the first vectors when the store is new, to know their dimension
+        self.backend: Optional[VectorBackend] = open_backend(backend, path, **backend_params)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(path, "docs.sqlite"), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, content TEXT NOT NULL, metadata TEXT NOT NULL)")
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[list[dict]] = None, *,
+                  ids: Optional[list[str]] = None, **kwargs: Any) -> list[str]:
+        """Add the texts, replacing the documents of the ids already stored."""
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [id_ or str(uuid.uuid4()) for id_ in ids] if ids else [str(uuid.uuid4()) for _ in texts]
+        vectors = np.asarray(self.embedding.embed_documents(texts), dtype=np.float32)
+        with self._lock:
+            if self.backend is None:
+                self.backend = open_backend(self.backend_kind, self.path, vectors.shape[1], **self.backend_params)
+            # The vectors first: after a crash, a document is never stored without its vector
+            # (a vector without its document is skipped by the searches)
+            self.backend.upsert(ids, vectors)
+            self.backend.flush()
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO docs (id, content, metadata) VALUES (?, ?, ?)",
+                    [(id_, text, json.dumps(metadata)) for id_, text, metadata in zip(ids, texts, metadatas)],
+                )
+        return ids
+
+    def delete(self, ids: Optional[list[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            with self._db:
+                self._db.executemany("DELETE FROM docs WHERE id = ?", [(id_,) for id_ in ids])
+            if self.backend is None:
+                return False
+            deleted = self.backend.delete(ids)
+            self.backend.flush()
+            return deleted > 0
+
+    def get_by_ids(self, ids: Sequence[str], /) -> list[Document]:
+        found = {}
+        for i in range(0, len(ids), SQL_BATCH):
+            batch = list(ids[i:i + SQL_BATCH])
+            query = f"SELECT id, content, metadata FROM docs WHERE id IN ({','.join('?' * len(batch))})"
+            for id_, content, metadata in self._db.execute(query, batch):
+                found[id_] = Document(id=id_, page_content=content, metadata=json.loads(metadata))
+        return [found[id_] for id_ in ids if id_ in found]
+
+    def stored_metadata(self) -> dict[str, dict]:
+        """Metadata of every stored document, by id."""
+        return {id_: json.loads(metadata) for id_, metadata in self._db.execute("SELECT id, metadata FROM docs")}
+
+    def similarity_search_with_score_by_vector(self, embedding: list[float], k: int = 4) -> list[tuple[Document, float]]:
+        if self.backend is None:
+            return []
+        hits = self.backend.search(np.asarray(embedding, dtype=np.float32), k)
+        documents = {document.id: document for document in self.get_by_ids([id_ for id_, _ in hits])}
+        return [(documents[id_], score) for id_, score in hits if id_ in documents]
+
+    def similarity_search_by_vector(self, embedding: list[float], k: int = 4, **kwargs: Any) -> list[Document]:
+        return [document for document, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> list[tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return [document for document, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities, in [-1, 1]
+        return lambda score: (score + 1) / 2
+
+    def max_marginal_relevance_search_by_vector(self, embedding: list[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, **kwargs: Any) -> list[Document]:
+        if self.backend is None:
+            return []
+        hits = self.backend.search(np.asarray(embedding, dtype=np.float32), fetch_k)
+        if not hits:
+            return []
+        ids = [id_ for id_, _ in hits]
+        selected = maximal_marginal_relevance(
+            np.asarray(embedding, dtype=np.float32), self.backend.get(ids), lambda_mult=lambda_mult, k=k
+        )
+        documents = {document.id: document for document in self.get_by_ids([ids[i] for i in selected])}
+        return [documents[ids[i]] for i in selected if ids[i] in documents]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, **kwargs: Any) -> list[Document]:
+        return self.max_marginal_relevance_search_by_vector(self.embedding.embed_query(query), k, fetch_k, lambda_mult)
+
+    @classmethod
+    def from_texts(cls, texts: list[str], embedding: Embeddings, metadatas: Optional[list[dict]] = None, *,
+                   ids: Optional[list[str]] = None, path: str = "./.index/local", backend: str = "ivf",
+                   **kwargs: Any) -> "LocalVectorStore":
+        store = cls(embedding, path, backend, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
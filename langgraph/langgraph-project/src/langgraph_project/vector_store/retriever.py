@@ -0,0 +1,122 @@
+import re
+import threading
+from collections import OrderedDict
+from logging import getLogger
+from typing import Optional
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from langgraph_project.settings import settings
+
+
+retriever_logger = getLogger("retriever")
+
+SEARCH_TYPES = ("similarity", "mmr")
+
+_retriever: Optional["BatchRetriever"] = None
+_retriever_lock = threading.Lock()
+
+
+def normalize_query(query: str) -> str:
+    """Cache key of a query: lowercase, single spaces, no surrounding punctuation."""
+    return re.sub(r"\s+", " ", query.lower()).strip(" \t.,;:!?\"'")
+
+
+class BatchRetriever:
+    """
+    Searches the index for several queries at once: the queries are embedded in one
+    batch, each vector is searched (top-k similarity, or MMR for diverse results), and
+    the documents found by several queries are returned once.
+
+    The documents of each query are cached (LRU) under its normalised text, so repeated
+    and follow-up searches only embed the queries not seen yet.
+    """
+
+    def __init__(self, index: VectorStore, k: int = 2, search_type: str = "mmr", fetch_k: int = 20,
+                 lambda_mult: float = 0.5, cache_size: int = 256):
+        """
+        Args:
+            index: The vector store, with its embeddings.
+            k: Documents per query.
+            search_type: One of SEARCH_TYPES.
+            fetch_k: Candidates per query among which MMR picks the k documents.
+            lambda_mult: MMR trade-off between relevance (1) and diversity (0).
+            cache_size: Queries whose documents are cached, 0 to disable the cache.
+        """
+        if search_type not in SEARCH_TYPES:
+            raise ValueError(f"Unknown search type '{search_type}', expected one of {SEARCH_TYPES}.")
+        self.index = index
+        self.k = k
+        self.search_type = search_type
+        self.fetch_k = fetch_k
+        self.lambda_mult = lambda_mult
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, list[Document]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key: str) -> Optional[list[Document]]:
+        with self._lock:
+            documents = self._cache.get(key)
+            if documents is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return documents
+
+    def _store(self, key: str, documents: list[Document]) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = documents
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _search_vector(self, vector: list[float]) -> list[Document]:
+        if self.search_type == "mmr":
+            return self.index.max_marginal_relevance_search_by_vector(
+                vector, k=self.k, fetch_k=max(self.fetch_k, self.k), lambda_mult=self.lambda_mult
+            )
+        return self.index.similarity_search_by_vector(vector, k=self.k)
+
+    def search(self, queries: list[str]) -> list[Document]:
+        """
+        Documents of all the queries, in query order, each document once.
+        """
+        keys = list(dict.fromkeys(key for key in map(normalize_query, queries) if key))
+        found = {key: self._cached(key) for key in keys}
+        missing = [key for key, documents in found.items() if documents is None]
+        if missing:
+            retriever_logger.info(f"Embedding {len(missing)} of {len(keys)} queries")
+            vectors = self.index.embeddings.embed_documents(missing)
+            for key, vector in zip(missing, vectors):
+                found[key] = self._search_vector(vector)
+                self._store(key, found[key])
+
+        documents = {}
+        for key in keys:
+            for document in found[key]:
+                documents.setdefault(document.page_content, document)
+        return list(documents.values())
+
+
+def get_retriever() -> BatchRetriever:
+    """
+    Return the retriever of the knowledge base index, created on first use.
+    """
+    global _retriever
+    # Imported here: the index module pulls in the vector store clients
+    from langgraph_project.vector_store.index import get_index
+
+    with _retriever_lock:
+        if _retriever is None:
+            _retriever = BatchRetriever(
+                get_index(),
+                k=settings.retrieval_k,
+                search_type=settings.retrieval_search_type,
+                fetch_k=settings.retrieval_fetch_k,
+                cache_size=settings.retrieval_cache_size,
+            )
+        return _retriever
@@ -1,6 +1,7 @@
 import os
 import time
 from datetime import date
+from typing import Any, Dict, List, Optional
 
 # Agno imports
 from agno.models.openai import OpenAIChat
@@ -29,12 +30,28 @@ from utils import get_tools_descriptions, parse_args, execute_agent
 from prompts import knowledge, role, goal, instructions
 
 # Tools
-from shared_functions import F1API, MetroAPI
+from shared_functions import F1API, MetroAPI, HybridSearch
 
 # Load environment variables
 from settings import settings
 
 
+class HybridDocumentKnowledgeBase(DocumentKnowledgeBase):
+    """
+    Agno knowledge base whose search goes through the shared HybridSearch (BM25 + vector store).
+    """
+    hybrid_search: Optional[Any] = None
+
+    def search(
+        self, query: str, num_documents: Optional[int] = None, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        if self.hybrid_search is None:
+            return super().search(query=query, num_documents=num_documents, filters=filters)
+        return [
+            document for document, _ in self.hybrid_search.search(query, k=num_documents or self.num_documents)
+        ]
+
+
 class AgnoRAGandAPIAgent:
     def __init__(
         self, 
@@ -76,6 +93,10 @@ class AgnoRAGandAPIAgent:
 
         knowledge_base.load(recreate=True)
 
+        # Add the BM25 index over the same chunks (kept to count the RAG tool calls)
+        self.rag_search = self.create_rag_search(docs, knowledge_base)
+        knowledge_base.hybrid_search = self.rag_search
+
         # Create the Agent
         self.agent = AgnoAgent(
             name="Agno Agent",
@@ -135,14 +156,14 @@ class AgnoRAGandAPIAgent:
         return documents
     
     @staticmethod
-    def create_knowledge_base(documents: list[Document]) -> DocumentKnowledgeBase:
+    def create_knowledge_base(documents: list[Document]) -> HybridDocumentKnowledgeBase:
         """
         Create a knowledge base from a list of documents.
 
         Args:
             documents: List of documents
         Returns:
-            DocumentKnowledgeBase
+            HybridDocumentKnowledgeBase
         """
         vector_db = ChromaDb(
             embedder = (
@@ -161,7 +182,7 @@ class AgnoRAGandAPIAgent:
             chunk_size=1024, overlap=50
         )
 
-        return DocumentKnowledgeBase(
+        return HybridDocumentKnowledgeBase(
             documents=documents,
             vector_db=vector_db,
             chunking_strategy=chunking_strategy,
@@ -169,6 +190,30 @@ class AgnoRAGandAPIAgent:
         )
     
 
+    @staticmethod
+    def create_rag_search(documents: list[Document], knowledge_base: DocumentKnowledgeBase) -> HybridSearch:
+        """
+        Wrap the knowledge base vector db with a BM25 index over the same chunks.
+        The retrieval mode ("vector", "bm25" or "hybrid") is read from the settings.
+
+        Args:
+            documents: List of documents loaded in the knowledge base
+            knowledge_base: The loaded knowledge base
+        Returns:
+            HybridSearch
+        """
+        chunks = [
+            chunk 
+            for document in documents 
+            for chunk in knowledge_base.chunking_strategy.chunk(document)
+        ]
+        return HybridSearch(
+            documents=chunks,
+            dense_search=lambda query, k: knowledge_base.vector_db.search(query=query, limit=k),
+            text_of=lambda document: document.content,
+            mode=settings.rag_retriever,
+        )
+
     @staticmethod
     @tool(name="date_tool", description="Gets the current date")
     def get_date():
@@ -0,0 +1,126 @@
+import argparse
+import importlib
+
+from shared_functions.hybrid_search import RETRIEVER_MODES, tokenize
+
+# RAG & API agents that expose a `rag_search` (HybridSearch)
+FRAMEWORKS = {
+    "agno": ("agno_rag_api_agent", "AgnoRAGandAPIAgent"),
+    "langgraph": ("langgraph_rag_api_agent", "LangGraphRAGandAPIAgent"),
+    "llama_index": ("llama_index_rag_api_agent", "LlamaIndexRAGandAPIAgent"),
+}
+
+# Labelled questions over knowledge_base/cl_matches: (question, expected answer)
+# Mostly team and player names, where pure dense retrieval is the weakest.
+QUESTIONS = [
+    ("Who scored for Liverpool against PSG?", "Harvey Elliott"),
+    ("Which Bayer Leverkusen player was sent off against Bayern Munich?", "Nordi Mukiele"),
+    ("Which goalkeeper made a critical error for Bayer Leverkusen?", "Matej Kovar"),
+    ("Who scored Barcelona's goal against Benfica?", "Raphinha"),
+    ("Who equalized for Lille against Borussia Dortmund?", "Hakon Haraldsson"),
+    ("Who scored PSV's goal against Arsenal?", "Johan Bakayoko"),
+    ("Which Real Madrid player scored in the 55th minute against Atlético Madrid?", "Brahim Díaz"),
+    ("Who scored the own goal in the Club Brugge game?", "Brandon Mechele"),
+    ("Which Feyenoord goalkeeper saved Piotr Zielinski's penalty?", "Timon Wellenreuther"),
+    ("Ball possession in Benfica's game?", "52%"),
+]
+
+
+def contains(text: str, expected: str) -> bool:
+    """
+    Accent and case insensitive check that the expected answer is in the text.
+    """
+    return " ".join(tokenize(expected)) in " ".join(tokenize(text))
+
+
+def recall_at_k(rag_search, mode: str, k: int) -> float:
+    """
+    Fraction of the questions whose expected answer is in the top-k retrieved chunks.
+    """
+    hits = 0
+    for question, expected in QUESTIONS:
+        results = rag_search.search(question, k=k, mode=mode)
+        if any(contains(rag_search.text_of(document), expected) for document, _ in results):
+            hits += 1
+    return hits / len(QUESTIONS)
+
+
+def tool_calls_per_answer(agent, mode: str) -> tuple[float, int]:
+    """
+    Run the agent over the questions and count the RAG tool calls.
+
+    Returns:
+        tuple[float, int]: RAG tool calls per answered question, number of answered questions.
+    """
+    agent.rag_search.mode = mode
+    agent.rag_search.num_searches = 0
+    answered = 0
+    for question, expected in QUESTIONS:
+        agent.clear_chat()
+        result = agent.chat(question)
+        # chat returns only an error message when it fails
+        if isinstance(result, tuple) and contains(result[0], expected):
+            answered += 1
+    calls = agent.rag_search.num_searches
+    return (calls / answered if answered else float("inf")), answered
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--framework",
+        type=str,
+        choices=list(FRAMEWORKS),
+        default="langgraph",
+        help="The RAG & API agent whose knowledge base is benchmarked."
+    )
+    parser.add_argument(
+        "--provider",
+        type=str,
+        choices=["azure", "openai", "other"],
+        default="azure",
+        help="The LLM provider to use in the agent."
+    )
+    parser.add_argument(
+        "--k",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4],
+        help="Values of k for recall@k."
+    )
+    parser.add_argument(
+        "--agent",
+        action="store_true",
+        help="Also run the agent over the questions to count RAG tool calls per answered question."
+    )
+    return parser.parse_args()
+
+
+def main():
+    """
+    Compare the "vector", "bm25" and "hybrid" retrievers on recall@k and,
+    optionally, on RAG tool calls per answered question.
+    """
+    args = parse_args()
+
+    module_name, class_name = FRAMEWORKS[args.framework]
+    Agent = getattr(importlib.import_module(module_name), class_name)
+    agent = Agent(provider=args.provider, memory=False)
+
+    rows = {f"Recall@{k}": [recall_at_k(agent.rag_search, mode, k) for mode in RETRIEVER_MODES] for k in args.k}
+    rows = {name: [f"{value:.2f}" for value in values] for name, values in rows.items()}
+
+    if args.agent:
+        results = [tool_calls_per_answer(agent, mode) for mode in RETRIEVER_MODES]
+        rows["Tool calls / answered"] = [f"{calls:.2f}" for calls, _ in results]
+        rows["Answered"] = [f"{answered} / {len(QUESTIONS)}" for _, answered in results]
+
+    print(f"{agent.name} - {len(QUESTIONS)} questions\n")
+    print(f"| Metrics | {' | '.join(RETRIEVER_MODES)} |")
+    print(f"|---------|{'|'.join('-' * (len(mode) + 2) for mode in RETRIEVER_MODES)}|")
+    for name, values in rows.items():
+        print(f"| {name} | {' | '.join(values)} |")
+
+
+if __name__ == "__main__":
+    main()
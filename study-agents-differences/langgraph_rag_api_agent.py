@@ -6,6 +6,8 @@ from typing import Annotated, TypedDict
 from langchain.tools.retriever import create_retriever_tool
 from langchain_openai import AzureChatOpenAI, ChatOpenAI, OpenAIEmbeddings, AzureOpenAIEmbeddings
 from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_community.document_loaders import DirectoryLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -25,7 +27,7 @@ from utils import get_tools_descriptions, parse_args, execute_agent
 from prompts import knowledge, role, goal, instructions
 
 # Tools
-from shared_functions import F1API, MetroAPI
+from shared_functions import F1API, MetroAPI, HybridSearch
 
 # Load environment variables
 from settings import settings
@@ -36,6 +38,19 @@ class State(TypedDict):
     messages: Annotated[list, add_messages]
 
 
+class HybridRetriever(BaseRetriever):
+    """
+    LangChain retriever backed by the shared HybridSearch (BM25 + vector store).
+    """
+    search: HybridSearch
+    k: int = 4
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return [document for document, _ in self.search.search(query, k=self.k)]
+
+
 class LangGraphRAGandAPIAgent:
     def __init__(
         self, 
@@ -49,6 +64,9 @@ class LangGraphRAGandAPIAgent:
         """
         self.name = "LangGraph RAG & API Agent"
 
+        # Create the RAG search (kept to count the RAG tool calls)
+        self.rag_search = self.create_rag_search()
+
         # Create tools
         self.tools = self._create_tools()
 
@@ -136,18 +154,31 @@ class LangGraphRAGandAPIAgent:
         return vectorstore
     
     @staticmethod
-    def create_rag_tool():
+    def create_rag_search() -> HybridSearch:
         """
-        RAG tool that loads documents, creates a vectorstore, and returns a retriever tool.
+        Loads documents, creates a vectorstore and wraps it with a BM25 index.
+        The retrieval mode ("vector", "bm25" or "hybrid") is read from the settings.
         """
         # Load documents
         docs = LangGraphRAGandAPIAgent.load_documents("knowledge_base/cl_matches/")
         # Create the vectorstore/index        
         vectorstore = LangGraphRAGandAPIAgent.create_vectorstore(docs)
 
+        return HybridSearch(
+            documents=docs,
+            dense_search=lambda query, k: vectorstore.similarity_search(query, k=k),
+            text_of=lambda document: document.page_content,
+            mode=settings.rag_retriever,
+        )
+
+    @staticmethod
+    def create_rag_tool(rag_search: HybridSearch):
+        """
+        RAG tool that returns a retriever tool over the given search.
+        """
         # Create the retriever tool
         return create_retriever_tool(
-            vectorstore.as_retriever(),
+            HybridRetriever(search=rag_search),
             name="RAG_tool",
             description="Search and retrieve information from the knowledge base about the matches of the 2025 UEFA Champions League.",
         )
@@ -179,7 +210,7 @@ class LangGraphRAGandAPIAgent:
         """
         return [
             # RAG tool
-            self.create_rag_tool(),
+            self.create_rag_tool(self.rag_search),
             # API tools - MetroAPI and F1API - Created using @tool
             self.get_driver_info,
             self.get_state_subway,
@@ -8,6 +8,8 @@ from llama_index.llms.huggingface_api import HuggingFaceInferenceAPI
 from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core import Document
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle
 from llama_index.core.agent import ReActAgent
 from llama_index.core.tools import FunctionTool
 from llama_index.core.memory import ChatMemoryBuffer
@@ -28,7 +30,7 @@ from prompts import llama_index_react_prompt # extra import
 from utils import get_tools_descriptions, parse_args, execute_agent
 
 # Tools
-from shared_functions import F1API, MetroAPI
+from shared_functions import F1API, MetroAPI, HybridSearch
 
 # Load environment variables
 from settings import settings
@@ -38,6 +40,23 @@ token_counter = TokenCountingHandler(
 )
 
 
+class HybridRetriever(BaseRetriever):
+    """
+    LlamaIndex retriever backed by the shared HybridSearch (BM25 + vector store).
+    """
+
+    def __init__(self, search: HybridSearch, similarity_top_k: int = 2):
+        self.search = search
+        self.similarity_top_k = similarity_top_k
+        super().__init__()
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        return [
+            NodeWithScore(node=node, score=score)
+            for node, score in self.search.search(query_bundle.query_str, k=self.similarity_top_k)
+        ]
+
+
 class LlamaIndexRAGandAPIAgent:
     def __init__(
         self, 
@@ -71,6 +90,9 @@ class LlamaIndexRAGandAPIAgent:
             )
         )
 
+        # Create the RAG search (kept to count the RAG tool calls)
+        self.rag_search = self.create_rag_search()
+
         # Create tools
         self.tools = self._create_tools()
 
@@ -117,13 +139,18 @@ class LlamaIndexRAGandAPIAgent:
         return SimpleDirectoryReader(docs_path).load_data()
 
     @staticmethod
-    def create_vectorstore_index(documents: list[Document]) -> VectorStoreIndex:
+    def split_documents(documents: list[Document]) -> list[BaseNode]:
         """
-        Create a simple vectorstore using VectorStoreIndex
+        Split the documents into the nodes indexed by the vectorstore.
         """
         splitter = SentenceSplitter(chunk_size=1024, chunk_overlap=50)
-        nodes = splitter.get_nodes_from_documents(documents)
-        
+        return splitter.get_nodes_from_documents(documents)
+
+    @staticmethod
+    def create_vectorstore_index(nodes: list[BaseNode]) -> VectorStoreIndex:
+        """
+        Create a simple vectorstore using VectorStoreIndex
+        """
         return VectorStoreIndex(
             nodes,
             embed_model= (
@@ -137,20 +164,37 @@ class LlamaIndexRAGandAPIAgent:
         )
     
     @staticmethod
-    def create_rag_tool() -> RetrieverTool:
+    def create_rag_search() -> HybridSearch:
         """
-        RAG tool that loads documents, creates a vectorstore, and returns a query engine tool.
+        Loads documents, creates a vectorstore and wraps it with a BM25 index over the same nodes.
+        The retrieval mode ("vector", "bm25" or "hybrid") is read from the settings.
         """
         # Load documents
         docs = LlamaIndexRAGandAPIAgent.load_documents("knowledge_base/cl_matches")
+        nodes = LlamaIndexRAGandAPIAgent.split_documents(docs)
         # Create the vectorstore/index        
-        vector_index = LlamaIndexRAGandAPIAgent.create_vectorstore_index(docs)
+        vector_index = LlamaIndexRAGandAPIAgent.create_vectorstore_index(nodes)
+
+        return HybridSearch(
+            documents=nodes,
+            dense_search=lambda query, k: [
+                result.node for result in vector_index.as_retriever(similarity_top_k=k).retrieve(query)
+            ],
+            text_of=lambda node: node.get_content(),
+            key_of=lambda node: node.node_id,
+            mode=settings.rag_retriever,
+        )
 
+    @staticmethod
+    def create_rag_tool(rag_search: HybridSearch) -> RetrieverTool:
+        """
+        RAG tool that returns a retriever tool over the given search.
+        """
         # Create the retriever tool - We use a retriever tool to query the knowledge base
         # because we want a tool that only return information gathered from the knowledge base
         # and does not reason or generate new information. (This happens with QueryEngineTool)
         return RetrieverTool.from_defaults(
-            retriever=vector_index.as_retriever(),
+            retriever=HybridRetriever(rag_search),
             name="RAG_tool",
             description="Search and retrieve information about the matches of the 2025 UEFA Champions League."
         )
@@ -159,7 +203,7 @@ class LlamaIndexRAGandAPIAgent:
     def _create_tools(self):
         return [
             # RAG Tool
-            self.create_rag_tool(),
+            self.create_rag_tool(self.rag_search),
             # API Tools
             FunctionTool.from_defaults(
                 F1API.get_driver_info,
@@ -15,6 +15,7 @@ class Settings(BaseSettings):
     embeddings_model_name: str = "text-embedding-ada-002"
     embeddings_api_version: str = "2023-05-15"
     local_embeddings_model_name: str
+    rag_retriever: str = "vector"  # "vector", "bm25" or "hybrid"
 
     class Config:
         env_file = ".env"
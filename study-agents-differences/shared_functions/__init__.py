@@ -1,9 +1,11 @@
 from .f1_api import F1API
 from .generic_calls import Generic
+from .hybrid_search import HybridSearch
 from .metro_api import MetroAPI
 
 __all__ = [
     "F1API",
     "Generic",
+    "HybridSearch",
     "MetroAPI",
 ]
\ No newline at end of file
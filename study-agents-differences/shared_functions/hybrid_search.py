@@ -0,0 +1,170 @@
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+# Retrieval modes supported by HybridSearch
+RETRIEVER_MODES = ("vector", "bm25", "hybrid")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercase, strip accents and split a text into word tokens.
+
+    Args:
+        text (str): The text to tokenize.
+    Returns:
+        list[str]: The list of tokens.
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r"\w+", text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index (term -> postings of (doc_id, term frequency)).
+    """
+
+    def __init__(self, texts: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: list[int] = []
+
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            self.doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                self.postings[term].append((doc_id, frequency))
+
+        self.num_docs = len(self.doc_lengths)
+        self.avg_doc_length = sum(self.doc_lengths) / self.num_docs if self.num_docs else 0.0
+
+    def idf(self, term: str) -> float:
+        """
+        Inverse document frequency of a term, as in Lucene: log(1 + (N - n + 0.5) / (n + 0.5)),
+        which stays positive for the terms found in most documents.
+        """
+        doc_frequency = len(self.postings.get(term, []))
+        return math.log(1 + (self.num_docs - doc_frequency + 0.5) / (doc_frequency + 0.5))
+
+    def search(self, query: str, k: int = 10) -> list[tuple[int, float]]:
+        """
+        Score the documents against the query.
+
+        Args:
+            query (str): The query.
+            k (int): Number of results to return.
+        Returns:
+            list[tuple[int, float]]: The (doc_id, score) pairs, best first.
+        """
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            idf = self.idf(term)
+            for doc_id, frequency in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_doc_length)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], rrf_k: int = 60) -> list[tuple[str, float]]:
+    """
+    Fuse several rankings with Reciprocal Rank Fusion: score(d) = sum(1 / (rrf_k + rank(d))).
+
+    Args:
+        rankings (list[list[str]]): Lists of document keys, each ordered best first.
+        rrf_k (int): Damping constant, 60 as in the original paper.
+    Returns:
+        list[tuple[str, float]]: The (key, fused score) pairs, best first.
+    """
+    scores: dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] += 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridSearch(Generic[T]):
+    """
+    Framework-agnostic hybrid retriever: a local BM25 index plus an existing vector store,
+    fused with Reciprocal Rank Fusion.
+
+    The documents are whatever the framework uses (LangChain Document, LlamaIndex node,
+    Agno Document...), so the same object can back the retriever of every agent.
+    """
+
+    def __init__(
+        self,
+        documents: list[T],
+        dense_search: Callable[[str, int], list[T]],
+        text_of: Callable[[T], str],
+        key_of: Callable[[T], str] | None = None,
+        mode: str = "hybrid",
+        num_candidates: int = 10,
+        rrf_k: int = 60,
+    ):
+        """
+        Args:
+            documents (list[T]): The chunks indexed by the vector store.
+            dense_search (Callable[[str, int], list[T]]): Vector store search, (query, k) -> documents.
+            text_of (Callable[[T], str]): Returns the text of a document.
+            key_of (Callable[[T], str]): Returns a stable id for a document. Defaults to its text.
+            mode (str): One of "vector", "bm25" or "hybrid".
+            num_candidates (int): Number of candidates taken from each ranking before fusion.
+            rrf_k (int): Reciprocal Rank Fusion damping constant.
+        """
+        if mode not in RETRIEVER_MODES:
+            raise ValueError(f"Unknown retriever mode '{mode}'. Should be one of {RETRIEVER_MODES}.")
+
+        self.documents = documents
+        self.dense_search = dense_search
+        self.text_of = text_of
+        self.key_of = key_of or text_of
+        self.mode = mode
+        self.num_candidates = num_candidates
+        self.rrf_k = rrf_k
+        self.bm25 = BM25Index([text_of(document) for document in documents])
+
+        # Number of searches done, used to count RAG tool calls per answered question
+        self.num_searches = 0
+
+    def search(self, query: str, k: int = 4, mode: str | None = None) -> list[tuple[T, float]]:
+        """
+        Retrieve the top-k documents for the query.
+
+        Args:
+            query (str): The query.
+            k (int): Number of documents to return.
+            mode (str): Overrides the retriever mode for this search.
+        Returns:
+            list[tuple[T, float]]: The (document, score) pairs, best first.
+        """
+        mode = mode or self.mode
+        self.num_searches += 1
+        num_candidates = max(k, self.num_candidates)
+
+        if mode == "vector":
+            documents = self.dense_search(query, k)
+            return [(document, 1.0 / (self.rrf_k + rank)) for rank, document in enumerate(documents, start=1)]
+
+        sparse = [(self.documents[doc_id], score) for doc_id, score in self.bm25.search(query, num_candidates)]
+        if mode == "bm25":
+            return sparse[:k]
+
+        dense = self.dense_search(query, num_candidates)
+        by_key = {self.key_of(document): document for document in dense}
+        by_key.update({self.key_of(document): document for document, _ in sparse})
+        fused = reciprocal_rank_fusion(
+            [
+                [self.key_of(document) for document in dense],
+                [self.key_of(document) for document, _ in sparse],
+            ],
+            rrf_k=self.rrf_k,
+        )
+        return [(by_key[key], score) for key, score in fused[:k]]
@@ -0,0 +1,269 @@
+import os
+import time
+import random
+import inspect
+import argparse
+import importlib
+import multiprocessing as mp
+from multiprocessing.connection import Connection
+
+import numpy as np
+from scipy import stats
+
+TOKEN_KEYS = [
+    "total_embedding_token_count",
+    "prompt_llm_token_count",
+    "completion_llm_token_count",
+    "total_llm_token_count",
+]
+
+
+def load_agent_class(module_name: str) -> type:
+    """
+    Find the agent class of an agent module: `Agent` if it exists,
+    otherwise the class defined in the module that has a `chat` method.
+
+    Args:
+        module_name (str): Name of the agent module (e.g. "agno_rag_api_agent").
+    Returns:
+        type: The agent class.
+    """
+    module = importlib.import_module(module_name)
+    if hasattr(module, "Agent") and inspect.isclass(module.Agent):
+        return module.Agent
+    for _, obj in inspect.getmembers(module, inspect.isclass):
+        if obj.__module__ == module_name and hasattr(obj, "chat"):
+            return obj
+    raise ValueError(f"No agent class found in {module_name}")
+
+
+def worker(module_name: str, cores: list[int], conn: Connection, options: dict):
+    """
+    Worker process: pins itself to its cores, creates the agent and answers the
+    parent's "run" commands with the execution time and token counts of one chat.
+
+    Protocol (over the pipe):
+        worker -> parent: ("ready", agent name) or ("error", message)
+        parent -> worker: ("run", query) or ("stop", None)
+        worker -> parent: ("result", (exec_time, tokens)) or ("error", message)
+    """
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+
+    def create_agent():
+        return Agent(
+            provider=options["provider"],
+            memory=not options["no_memory"],
+            verbose=False,
+            tokens=True
+        )
+
+    try:
+        Agent = load_agent_class(module_name)
+        agent = create_agent()
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        conn.close()
+        return
+    conn.send(("ready", agent.name))
+
+    while True:
+        command, query = conn.recv()
+        if command == "stop":
+            break
+        try:
+            if options["create"]:
+                agent = create_agent()
+            result = agent.chat(query)
+            # chat returns only an error message when it fails
+            if not isinstance(result, tuple):
+                conn.send(("error", str(result)))
+                continue
+            _, exec_time, tokens = result
+            conn.send(("result", (exec_time, tokens)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+def assign_cores(num_workers: int, cores_per_worker: int) -> list[list[int]]:
+    """
+    Split the available cores into dedicated blocks, one per worker.
+    The first core is left to the parent process when there are enough cores.
+
+    Returns:
+        list[list[int]]: The cores of each worker (empty lists if pinning is not supported).
+    """
+    if not hasattr(os, "sched_getaffinity"):
+        print("CPU pinning is not supported on this platform, workers will not be isolated.")
+        return [[] for _ in range(num_workers)]
+
+    available = sorted(os.sched_getaffinity(0))
+    if len(available) > num_workers * cores_per_worker:
+        available = available[1:]
+    if len(available) < num_workers * cores_per_worker:
+        print(
+            f"Only {len(available)} cores for {num_workers} workers x {cores_per_worker} cores, "
+            "some workers will share cores."
+        )
+    return [
+        [available[(i * cores_per_worker + j) % len(available)] for j in range(cores_per_worker)]
+        for i in range(num_workers)
+    ]
+
+
+def confidence_interval(values: list[float], confidence: float = 0.95) -> float:
+    """
+    Half-width of the Student's t confidence interval of the mean.
+    """
+    if len(values) < 2:
+        return float("nan")
+    t = stats.t.ppf((1 + confidence) / 2, len(values) - 1)
+    return t * stats.sem(values)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--agents",
+        type=str,
+        nargs="+",
+        default=["agno_rag_api_agent", "langgraph_rag_api_agent", "llama_index_rag_api_agent"],
+        help="Agent modules to compare."
+    )
+    parser.add_argument(
+        "--provider",
+        type=str,
+        choices=["azure", "openai", "other"],
+        default="azure",
+        help="The LLM provider to use in the agents."
+    )
+    parser.add_argument(
+        "--query",
+        type=str,
+        required=True,
+        help="The prompt sent to every agent."
+    )
+    parser.add_argument(
+        "--iter",
+        type=int,
+        default=30,
+        help="Number of measured iterations per agent."
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=1,
+        help="Number of discarded warm-up iterations per agent."
+    )
+    parser.add_argument(
+        "--cores",
+        type=int,
+        default=1,
+        help="Number of dedicated cores per agent process."
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Maintain conversation history in the agent."
+    )
+    parser.add_argument(
+        "--create",
+        action="store_true",
+        help="Create a new agent instance each time."
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the order in which the agents run in each round."
+    )
+    return parser.parse_args()
+
+
+def main():
+    """
+    Run every agent in its own pinned process and interleave the iterations:
+    each round sends the query once to every agent, in a shuffled order, so that
+    drift (API load, network, caches) is spread evenly across frameworks.
+    """
+    args = parse_args()
+    options = {"provider": args.provider, "no_memory": args.no_memory, "create": args.create}
+
+    # Spawn gives every agent a fresh interpreter, without inherited imports or caches
+    ctx = mp.get_context("spawn")
+    workers = {}
+    for module_name, cores in zip(args.agents, assign_cores(len(args.agents), args.cores)):
+        parent_conn, child_conn = ctx.Pipe()
+        process = ctx.Process(target=worker, args=(module_name, cores, child_conn, options), daemon=True)
+        process.start()
+        workers[module_name] = (process, parent_conn, cores)
+
+    names = {}
+    for module_name, (process, conn, cores) in list(workers.items()):
+        status, message = conn.recv()
+        if status == "error":
+            print(f"Error loading {module_name}: {message}")
+            process.join()
+            del workers[module_name]
+            continue
+        names[module_name] = message
+        print(f"{message} ({module_name}) ready on cores {cores or 'any'}")
+
+    times = {module_name: [] for module_name in workers}
+    tokens = {module_name: {key: [] for key in TOKEN_KEYS} for module_name in workers}
+    errors = {module_name: 0 for module_name in workers}
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    for i in range(args.warmup + args.iter):
+        order = list(workers)
+        rng.shuffle(order)
+        for module_name in order:
+            _, conn, _ = workers[module_name]
+            conn.send(("run", args.query))
+            status, result = conn.recv()
+            if i < args.warmup:
+                continue
+            if status == "error":
+                errors[module_name] += 1
+                continue
+            exec_time, token_counter = result
+            times[module_name].append(exec_time)
+            for key in TOKEN_KEYS:
+                tokens[module_name][key].append(token_counter.get(key, 0))
+        print(f"Round {i + 1}/{args.warmup + args.iter}{' (warm-up)' if i < args.warmup else ''} done")
+    total = time.perf_counter() - start
+
+    for process, conn, _ in workers.values():
+        conn.send(("stop", None))
+        process.join()
+
+    # Comparison report
+    columns = list(workers)
+    rows = {
+        "Response time": [f"{np.mean(times[m]):.2f} ± {np.std(times[m]):.2f}s" if times[m] else "-" for m in columns],
+        "95% CI (mean)": [f"± {confidence_interval(times[m]):.2f}s" if times[m] else "-" for m in columns],
+        "Median / p95": [
+            f"{np.median(times[m]):.2f} / {np.percentile(times[m], 95):.2f}s" if times[m] else "-" for m in columns
+        ],
+        "LLM Prompt Tokens": [f"{np.mean(tokens[m]['prompt_llm_token_count'] or [0]):.1f}" for m in columns],
+        "LLM Completion Tokens": [f"{np.mean(tokens[m]['completion_llm_token_count'] or [0]):.1f}" for m in columns],
+        "Total LLM Token Count": [f"{np.mean(tokens[m]['total_llm_token_count'] or [0]):.1f}" for m in columns],
+        "Errors": [f"{errors[m]} / {args.iter}" for m in columns],
+    }
+
+    print(
+        f"{'-'*50}\n"
+        f"Query: {args.query}\n"
+        f"Iterations: {args.iter} (+{args.warmup} warm-up), interleaved - total {total:.1f}s\n"
+        f"{'-'*50}\n"
+    )
+    print(f"| Metrics | {' | '.join(names[m] for m in columns)} |")
+    print(f"|---------|{'|'.join('-' * (len(names[m]) + 2) for m in columns)}|")
+    for name, values in rows.items():
+        print(f"| {name} | {' | '.join(values)} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,8 @@ import asyncio
 import argparse
 import json
 import os
-from typing import Any, Optional, Union
-from aioconsole import aprint
+import time
+from typing import Any, Optional
 
 from settings import settings
 os.environ["OPENAI_API_KEY"] = settings.OPENAI_API_KEY.get_secret_value()
@@ -14,7 +14,25 @@ os.environ["OPENAI_API_KEY"] = settings.OPENAI_API_KEY.get_secret_value()
 from openai import AsyncOpenAI
 
 from summoner.client import SummonerClient
-from summoner.protocol import Direction, Event, Stay, Action
+from summoner.protocol import Direction, Event, Stay, Test, Action
+
+from utils import (
+    ADMISSION_POLICIES,
+    LOG_LEVELS,
+    LOG_OUTPUTS,
+    ChunkCoalescer,
+    LogSink,
+    Metrics,
+    MockOpenAI,
+    ResponseCache,
+    WorkerPool,
+    default_max_pending,
+    new_stream_id,
+    overload_warning,
+    parse_priorities,
+    stream_chunk,
+    with_deadline,
+)
 
 # -----------------------------------------------------------------------------
 # Minimal config
@@ -22,18 +40,92 @@ from summoner.protocol import Direction, Event, Stay, Action
 AGENT_ID = "1_simple_agent"
 MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
-# One queue: receive handler buffers payloads, send handler consumes them.
-message_buffer: Optional[asyncio.Queue] = None
-buffer_lock: Optional[asyncio.Lock] = None
+# Worker pool: receive handler submits payloads, up to N workers answer them
+# concurrently (FIFO per sender), send handler drains the replies.
+worker_pool: Optional[WorkerPool] = None
+
+# Admission control: the pool is bounded; shed messages can be signalled with a
+# Test(Trigger.overloaded) event instead of Stay(Trigger.ok).
+sender_priorities: dict[str, int] = {}
+signal_overload: bool = False
+
+# Streaming (--stream): replies are relayed as coalesced chunks while the model
+# generates them, instead of one reply once the completion is done.
+stream_chunk_chars: int = 200
+stream_window_ms: float = 100.0
+
+# Response cache (--cache-size): identical payloads (routing fields aside) are
+# answered once, concurrent duplicates share the in-flight completion.
+response_cache: Optional[ResponseCache] = None
+
+# Metrics: served as Prometheus text (--metrics-port) and/or appended to a JSONL file
+metrics = Metrics(const_labels={"agent": AGENT_ID})
+background: list[Any] = []  # metrics server and JSONL writer, stopped on shutdown
+
+# Log: records are queued and written by a background task, off the handlers' path
+log = LogSink()
 
 # OpenAI client (direct, no wrappers)
 open_client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 
 
-async def setup() -> None:
-    global message_buffer, buffer_lock
-    message_buffer = asyncio.Queue()
-    buffer_lock = asyncio.Lock()
+async def setup(args: argparse.Namespace) -> None:
+    global worker_pool, sender_priorities, signal_overload, open_client, response_cache, log
+    global stream_chunk_chars, stream_window_ms
+    log = LogSink(
+        level=args.log_level,
+        sample=args.log_sample,
+        output=args.log_output,
+        path=args.log_file or f"logs/{AGENT_ID}.{'jsonl' if args.log_output == 'jsonl' else 'log'}",
+        metrics=metrics,
+    )
+    log.start()
+    if args.mock_llm is not None:
+        open_client = MockOpenAI(latency_ms=args.mock_llm)
+    sender_priorities = parse_priorities(args.priority)
+    signal_overload = args.overload_event
+    stream_chunk_chars, stream_window_ms = args.stream_chunk_chars, args.stream_window_ms
+    max_pending = default_max_pending() if args.max_pending is None else (args.max_pending or None)
+    if args.stream:
+        handler = answer_stream
+    elif args.batch_size > 1:
+        handler = answer_batch
+    else:
+        handler = answer
+    worker_pool = WorkerPool(
+        handler,
+        size=args.workers,
+        on_error=report_error,
+        batch_size=args.batch_size,
+        batch_wait_ms=args.batch_wait_ms,
+        max_pending=max_pending,
+        policy=args.shed_policy,
+        priority_of=sender_priority,
+        metrics=metrics,
+    )
+    worker_pool.start()
+
+    if args.cache_size > 0:
+        response_cache = ResponseCache(max_entries=args.cache_size, ttl=args.cache_ttl, metrics=metrics)
+
+    if args.metrics_port:
+        background.append(await metrics.serve(args.metrics_host, args.metrics_port))
+    if args.metrics_jsonl:
+        background.append(asyncio.create_task(metrics.write_jsonl(args.metrics_jsonl, args.metrics_interval)))
+
+
+async def shutdown() -> None:
+    # Cancel the in-flight completions
+    if worker_pool is not None:
+        await worker_pool.close()
+    if response_cache is not None:
+        response_cache.close()
+    for item in background:
+        if isinstance(item, asyncio.Task):
+            item.cancel()
+        else:
+            item.close()
+    await log.close()
 
 
 # -----------------------------------------------------------------------------
@@ -86,75 +178,221 @@ async def add_sender_id(payload: Any) -> Optional[dict]:
 # -----------------------------------------------------------------------------
 @agent.receive(route="message")
 async def recv_message(msg: Any) -> Event:
-    assert message_buffer is not None
+    assert worker_pool is not None
     content = msg["content"]
-
-    # Buffer raw payload; the send handler will decide what to do with it.
-    await message_buffer.put(content)
+    metrics.inc("messages_received_total", route="message")
+
+    # Buffer raw payload per sender; a worker will answer it.
+    shed = await worker_pool.submit(msg["remote_addr"], content)
+    if shed:
+        log.warning("overloaded", policy=worker_pool.policy, shed_total=worker_pool.shed)
+        if worker_pool.policy == "reject":
+            for _, incoming in shed:
+                worker_pool.reply(overload_warning(incoming))
+        if signal_overload:
+            metrics.inc("events_total", route="message", trigger="overloaded")
+            return Test(Trigger.overloaded)
+    metrics.inc("events_total", route="message", trigger="ok")
     return Stay(Trigger.ok)
 
 
+def sender_priority(sender: str, incoming: Any) -> int:
+    """
+    Priority of a message, looked up by its "from" field, then by the sender address.
+    """
+    name = incoming.get("from") if isinstance(incoming, dict) else None
+    return sender_priorities.get(str(name), sender_priorities.get(sender, 0))
+
+
 # -----------------------------------------------------------------------------
-# Send handler: pop one buffered message and call OpenAI directly
+# Answer one buffered message by calling OpenAI directly
 # -----------------------------------------------------------------------------
-@agent.send(route="message", on_actions={Action.STAY}, on_triggers={Trigger.ok})
-async def send_message() -> Optional[Union[dict, str]]:
-    assert message_buffer is not None
-    assert buffer_lock is not None
+def build_prompt(incoming: Any) -> str:
+    return (
+        "You are an helpful assistant.\n\n"
+        "Incoming message (str):\n"
+        f"{json.dumps(incoming, ensure_ascii=False, indent=2)}\n\n"
+        "Task: Find and address all implicit requests suggested by the message. "
+        "Keep your response consistent with these requests (if there are multiple). "
+        "Any other extra information in the message (other than the requests) should ONLY be used for context to respond to the requests. "
+    )
 
-    if message_buffer.empty():
-        await asyncio.sleep(0.05)
-        return None
 
-    async with buffer_lock:
-        if message_buffer.empty():
-            return None
-        incoming = message_buffer.get_nowait()
+async def answer(incoming: Any) -> dict:
+    if response_cache is not None:
+        answers = await response_cache.get_or_compute(incoming, lambda: complete(incoming))
+    else:
+        answers = await complete(incoming)
+    return make_reply(incoming, answers)
+
 
+async def complete(incoming: Any) -> Any:
+    # -------------------------------
+    # You can replace the OpenAI call with any other agent
+    # -------------------------------
+    user_prompt = build_prompt(incoming)
+    log.debug("prompt", prompt=user_prompt)
+
+    with metrics.timer("llm_call_seconds", route="message"):
+        resp = await open_client.chat.completions.create(
+            model=settings.OPENAI_MODEL_NAME,
+            messages=[
+                {"role": "system", "content": "You are an assistant helping other agents with their requests."},
+                {"role": "user", "content": user_prompt},
+            ]
+        )
+    metrics.add_usage(resp.usage, route="message")
+    text = (resp.choices[0].message.content or "").strip()
     try:
-        # -------------------------------
-        # You can replace the OpenAI call with any other agent
-        # -------------------------------
-        user_prompt = (
-            "You are an helpful assistant.\n\n"
-            "Incoming message (str):\n"
-            f"{json.dumps(incoming, ensure_ascii=False, indent=2)}\n\n"
-            "Task: Find and address all implicit requests suggested by the message. "
-            "Keep your response consistent with these requests (if there are multiple). "
-            "Any other extra information in the message (other than the requests) should ONLY be used for context to respond to the requests. "
+        answers = json.loads(text)
+    except:
+        answers = text
+    
+    log.info("answer", answers=answers)
+
+    return answers
+
+
+def make_reply(incoming: Any, answers: Any) -> dict:
+    # Minimal reply envelope (keep routing fields if present).
+    out: dict[str, Any] = {"message": answers}
+
+    # Common Summoner convention: reply to incoming["from"] when present.
+    if isinstance(incoming, dict) and "from" in incoming:
+        out["to"] = incoming["from"]
+    # Echo the correlation id so the sender can match the reply
+    if isinstance(incoming, dict) and "id" in incoming:
+        out["id"] = incoming["id"]
+
+    return out
+
+
+# -----------------------------------------------------------------------------
+# Answer one buffered message with a streamed completion
+# -----------------------------------------------------------------------------
+async def answer_stream(incoming: Any) -> None:
+    """
+    Relay the answer as it is generated: token deltas are coalesced into chunks
+    (by size or time window) and each chunk is queued as its own reply, tagged with
+    the stream id and its sequence number. The last chunk carries the final marker.
+    The InputAgent reassembles the reply (agents/agent_InputAgent/streaming.py).
+    """
+    assert worker_pool is not None
+    user_prompt = build_prompt(incoming)
+    log.debug("prompt", prompt=user_prompt)
+
+    received_at = worker_pool.received_at()
+    stream_id = new_stream_id(incoming)
+    coalescer = ChunkCoalescer(stream_chunk_chars, stream_window_ms)
+    parts: list[str] = []
+    seq = 0
+    start = time.perf_counter()
+
+    with metrics.timer("llm_call_seconds", route="message"):
+        stream = await open_client.chat.completions.create(
+            model=settings.OPENAI_MODEL_NAME,
+            messages=[
+                {"role": "system", "content": "You are an assistant helping other agents with their requests."},
+                {"role": "user", "content": user_prompt},
+            ],
+            stream=True,
+            stream_options={"include_usage": True},
         )
-        await aprint(user_prompt)
+        # Wakes up when the buffered chunk is due, even if the model stalls
+        async for chunk in with_deadline(stream, coalescer.remaining):
+            if chunk is None:
+                worker_pool.reply(stream_chunk(make_reply(incoming, coalescer.flush()), stream_id, seq), received_at)
+                seq += 1
+                continue
+            if chunk.usage is not None:
+                metrics.add_usage(chunk.usage, route="message")
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if delta and not parts:
+                metrics.observe("llm_first_token_seconds", time.perf_counter() - start, route="message")
+            parts.append(delta)
+            text = coalescer.add(delta)
+            if text:
+                worker_pool.reply(stream_chunk(make_reply(incoming, text), stream_id, seq), received_at)
+                seq += 1
+    worker_pool.reply(stream_chunk(make_reply(incoming, coalescer.flush()), stream_id, seq, final=True), received_at)
+
+    log.info("answer", answers="".join(parts), chunks=seq + 1)
 
+
+# -----------------------------------------------------------------------------
+# Answer a micro-batch of buffered messages with one OpenAI call
+# -----------------------------------------------------------------------------
+async def answer_batch(batch: list[tuple[str, Any]]) -> list[Optional[dict]]:
+    """
+    Answer several messages in one JSON-object completion, so the instructions
+    are sent once per batch instead of once per message. Messages are keyed by
+    a message id (a sender may have several messages in the same batch).
+    """
+    if len(batch) == 1:
+        return [await answer(batch[0][1])]
+
+    keyed = {f"m{i}": {"sender": sender, "message": incoming} for i, (sender, incoming) in enumerate(batch)}
+    user_prompt = (
+        "You are an helpful assistant.\n\n"
+        "Incoming messages (JSON object keyed by message id):\n"
+        f"{json.dumps(keyed, ensure_ascii=False, indent=2)}\n\n"
+        "Task: For each message, find and address all implicit requests suggested by the message. "
+        "Keep each response consistent with the requests of its message (if there are multiple). "
+        "Any other extra information in a message (other than the requests) should ONLY be used for context to respond to its requests. "
+        "Messages are independent: do not mix information between them. "
+        "Answer with a JSON object mapping every message id to your response to that message."
+    )
+    log.debug("prompt", prompt=user_prompt)
+
+    with metrics.timer("llm_call_seconds", route="message"):
         resp = await open_client.chat.completions.create(
             model=settings.OPENAI_MODEL_NAME,
             messages=[
                 {"role": "system", "content": "You are an assistant helping other agents with their requests."},
                 {"role": "user", "content": user_prompt},
-            ]
+            ],
+            response_format={"type": "json_object"},
         )
-        text = (resp.choices[0].message.content or "").strip()
-        try:
-            answers = json.loads(text)
-        except:
-            answers = text
-        
-        await aprint(f"\033[34m{json.dumps(answers, indent=2)}\033[34m")
+    metrics.add_usage(resp.usage, route="message")
+    text = (resp.choices[0].message.content or "").strip()
+    try:
+        answers = json.loads(text)
+    except json.JSONDecodeError:
+        answers = {}
+    if not isinstance(answers, dict):
+        answers = {}
 
-        # Minimal reply envelope (keep routing fields if present).
-        out: dict[str, Any] = {"message": answers}
+    log.info("answer", answers=answers)
 
-        # Common Summoner convention: reply to incoming["from"] when present.
-        if isinstance(incoming, dict) and "from" in incoming:
-            out["to"] = incoming["from"]
+    # Fan the replies back out; messages the model skipped are answered on their own.
+    replies = []
+    for key, (_, incoming) in zip(keyed, batch):
+        if key in answers:
+            replies.append(make_reply(incoming, answers[key]))
+        else:
+            replies.append(await answer(incoming))
+    return replies
 
-        return out
 
-    finally:
-        # Mark task done for queue hygiene.
-        try:
-            message_buffer.task_done()
-        except Exception:
-            pass
+async def report_error(sender: str, incoming: Any, error: BaseException) -> None:
+    metrics.inc("errors_total", route="message")
+    log.error("answer_failed", sender=sender, error=repr(error))
+
+
+# -----------------------------------------------------------------------------
+# Send handler: wait for replies and send all that are ready
+# -----------------------------------------------------------------------------
+@agent.send(route="message", multi=True, on_actions={Action.STAY}, on_triggers={Trigger.ok})
+async def send_message() -> Optional[list[dict]]:
+    assert worker_pool is not None
+
+    # Sleep until a worker queues a reply, then drain everything that is ready
+    # in the same wake-up (no polling, no added queueing delay).
+    replies = await worker_pool.next_replies()
+    metrics.inc("messages_sent_total", len(replies), route="message")
+    return replies
 
 
 # -----------------------------------------------------------------------------
@@ -171,10 +409,37 @@ if __name__ == "__main__":
     )
     parser.add_argument("--host", default="127.0.0.1")
     parser.add_argument("--port", default=8888, type=int)
+    parser.add_argument("--workers", default=4, type=int, help="Number of concurrent model calls.")
+    parser.add_argument("--max-pending", default=None, type=int, help="Maximum number of buffered messages (default: the server throttle threshold, 0 = unbounded).")
+    parser.add_argument("--shed-policy", default="drop-oldest", choices=ADMISSION_POLICIES, help="What to shed when the buffer is full.")
+    parser.add_argument("--priority", action="append", metavar="SENDER=PRIORITY", help="Priority of a sender (its 'from' field or address), used by the 'priority' policy.")
+    parser.add_argument("--overload-event", action="store_true", help="Return Test(Trigger.overloaded) instead of Stay(Trigger.ok) when a message is shed.")
+    parser.add_argument("--metrics-host", default="127.0.0.1")
+    parser.add_argument("--metrics-port", default=None, type=int, help="Serve Prometheus metrics on this port (off by default).")
+    parser.add_argument("--metrics-jsonl", default=None, help="Append a metrics snapshot to this JSONL file every --metrics-interval seconds.")
+    parser.add_argument("--metrics-interval", default=10.0, type=float)
+    parser.add_argument("--cache-size", default=0, type=int, help="Cache up to N answers of identical payloads (0 = off).")
+    parser.add_argument("--cache-ttl", default=300.0, type=float, help="Time to live of a cached answer, in seconds.")
+    parser.add_argument("--log-level", default="info", choices=list(LOG_LEVELS), help="Minimum level logged (prompts are logged at debug).")
+    parser.add_argument("--log-sample", default=1.0, type=float, help="Fraction of the debug/info records kept.")
+    parser.add_argument("--log-output", default="console", choices=LOG_OUTPUTS)
+    parser.add_argument("--log-file", default=None, help="Log file of the 'file' and 'jsonl' outputs (default: logs/<agent>.log or .jsonl).")
+    parser.add_argument("--mock-llm", default=None, type=float, metavar="LATENCY_MS", help="Answer with a mock model instead of OpenAI (load tests).")
+    parser.add_argument("--batch-size", default=1, type=int, help="Answer up to K buffered messages in one model call (1 = off).")
+    parser.add_argument("--batch-wait-ms", default=50.0, type=float, help="Maximum time to wait for a batch to fill up.")
+    parser.add_argument("--stream", action="store_true", help="Relay the answers in chunks while they are generated.")
+    parser.add_argument("--stream-chunk-chars", default=200, type=int, help="Send a chunk once it holds this many characters.")
+    parser.add_argument("--stream-window-ms", default=100.0, type=float, help="Send a chunk at the latest this long after its first token.")
     args = parser.parse_args()
+    if args.stream and args.batch_size > 1:
+        parser.error("--stream cannot be combined with --batch-size.")
 
-    if not os.environ.get("OPENAI_API_KEY"):
+    if args.mock_llm is None and not os.environ.get("OPENAI_API_KEY"):
         raise RuntimeError("OPENAI_API_KEY is missing in the environment.")
 
-    agent.loop.run_until_complete(setup())
-    agent.run(host=args.host, port=args.port, config_path=args.config_path)
+    agent.loop.run_until_complete(setup(args))
+    try:
+        agent.run(host=args.host, port=args.port, config_path=args.config_path)
+    finally:
+        if not agent.loop.is_closed():
+            agent.loop.run_until_complete(shutdown())
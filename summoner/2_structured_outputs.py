@@ -5,8 +5,7 @@ import asyncio
 import argparse
 import json
 import os
-from typing import Any, Optional, Union
-from aioconsole import aprint
+from typing import Any, Optional
 
 from settings import settings
 os.environ["OPENAI_API_KEY"] = settings.OPENAI_API_KEY.get_secret_value()
@@ -14,7 +13,30 @@ os.environ["OPENAI_API_KEY"] = settings.OPENAI_API_KEY.get_secret_value()
 from openai import AsyncOpenAI
 
 from summoner.client import SummonerClient
-from summoner.protocol import Direction, Event, Stay, Action
+from summoner.protocol import Direction, Event, Stay, Test, Action
+
+from utils import (
+    ADMISSION_POLICIES,
+    JSON_OBJECT,
+    LOG_LEVELS,
+    LOG_OUTPUTS,
+    IncrementalJSONParser,
+    LogSink,
+    Metrics,
+    MockOpenAI,
+    ResponseCache,
+    StructuredOutputError,
+    WorkerPool,
+    default_max_pending,
+    field_validators,
+    new_stream_id,
+    overload_warning,
+    parse_priorities,
+    parse_structured,
+    repair_message,
+    schema_instructions,
+    stream_chunk,
+)
 
 
 # -----------------------------------------------------------------------------
@@ -22,18 +44,81 @@ from summoner.protocol import Direction, Event, Stay, Action
 # -----------------------------------------------------------------------------
 AGENT_ID = "2_structure_outputs"
 
-# One queue: receive handler buffers payloads, send handler consumes them.
-message_buffer: Optional[asyncio.Queue] = None
-buffer_lock: Optional[asyncio.Lock] = None
+# Schema of the answers per route: any JSON object by default. Replace it with a
+# pydantic model to enforce a structure (its JSON schema is added to the prompt).
+ROUTE_SCHEMAS: dict[str, Any] = {"message": JSON_OBJECT}
+
+# Worker pool: receive handler submits payloads, up to N workers answer them
+# concurrently (FIFO per sender), send handler drains the replies.
+worker_pool: Optional[WorkerPool] = None
+
+# Admission control: the pool is bounded; shed messages can be signalled with a
+# Test(Trigger.overloaded) event instead of Stay(Trigger.ok).
+sender_priorities: dict[str, int] = {}
+signal_overload: bool = False
+
+# Response cache (--cache-size): identical payloads (routing fields aside) are
+# answered once, concurrent duplicates share the in-flight completion.
+response_cache: Optional[ResponseCache] = None
+
+# Metrics: served as Prometheus text (--metrics-port) and/or appended to a JSONL file
+metrics = Metrics(const_labels={"agent": AGENT_ID})
+background: list[Any] = []  # metrics server and JSONL writer, stopped on shutdown
+
+# Log: records are queued and written by a background task, off the handlers' path
+log = LogSink()
 
 # OpenAI client (direct, no wrappers)
 open_client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 
 
-async def setup() -> None:
-    global message_buffer, buffer_lock
-    message_buffer = asyncio.Queue()
-    buffer_lock = asyncio.Lock()
+async def setup(args: argparse.Namespace) -> None:
+    global worker_pool, sender_priorities, signal_overload, open_client, response_cache, log
+    log = LogSink(
+        level=args.log_level,
+        sample=args.log_sample,
+        output=args.log_output,
+        path=args.log_file or f"logs/{AGENT_ID}.{'jsonl' if args.log_output == 'jsonl' else 'log'}",
+        metrics=metrics,
+    )
+    log.start()
+    if args.mock_llm is not None:
+        open_client = MockOpenAI(latency_ms=args.mock_llm)
+    sender_priorities = parse_priorities(args.priority)
+    signal_overload = args.overload_event
+    max_pending = default_max_pending() if args.max_pending is None else (args.max_pending or None)
+    worker_pool = WorkerPool(
+        answer_stream if args.stream else answer,
+        size=args.workers,
+        on_error=report_error,
+        max_pending=max_pending,
+        policy=args.shed_policy,
+        priority_of=sender_priority,
+        metrics=metrics,
+    )
+    worker_pool.start()
+
+    if args.cache_size > 0:
+        response_cache = ResponseCache(max_entries=args.cache_size, ttl=args.cache_ttl, metrics=metrics)
+
+    if args.metrics_port:
+        background.append(await metrics.serve(args.metrics_host, args.metrics_port))
+    if args.metrics_jsonl:
+        background.append(asyncio.create_task(metrics.write_jsonl(args.metrics_jsonl, args.metrics_interval)))
+
+
+async def shutdown() -> None:
+    # Cancel the in-flight completions
+    if worker_pool is not None:
+        await worker_pool.close()
+    if response_cache is not None:
+        response_cache.close()
+    for item in background:
+        if isinstance(item, asyncio.Task):
+            item.cancel()
+        else:
+            item.close()
+    await log.close()
 
 
 # -----------------------------------------------------------------------------
@@ -86,76 +171,200 @@ async def add_sender_id(payload: Any) -> Optional[dict]:
 # -----------------------------------------------------------------------------
 @agent.receive(route="message")
 async def recv_message(msg: Any) -> Event:
-    assert message_buffer is not None
+    assert worker_pool is not None
     content = msg["content"]
-
-    # Buffer raw payload; the send handler will decide what to do with it.
-    await message_buffer.put(content)
+    metrics.inc("messages_received_total", route="message")
+
+    # Buffer raw payload per sender; a worker will answer it.
+    shed = await worker_pool.submit(msg["remote_addr"], content)
+    if shed:
+        log.warning("overloaded", policy=worker_pool.policy, shed_total=worker_pool.shed)
+        if worker_pool.policy == "reject":
+            for _, incoming in shed:
+                worker_pool.reply(overload_warning(incoming))
+        if signal_overload:
+            metrics.inc("events_total", route="message", trigger="overloaded")
+            return Test(Trigger.overloaded)
+    metrics.inc("events_total", route="message", trigger="ok")
     return Stay(Trigger.ok)
 
 
+def sender_priority(sender: str, incoming: Any) -> int:
+    """
+    Priority of a message, looked up by its "from" field, then by the sender address.
+    """
+    name = incoming.get("from") if isinstance(incoming, dict) else None
+    return sender_priorities.get(str(name), sender_priorities.get(sender, 0))
+
+
 # -----------------------------------------------------------------------------
-# Send handler: pop one buffered message and call OpenAI directly
+# Answer one buffered message by calling OpenAI directly
 # -----------------------------------------------------------------------------
-@agent.send(route="message", on_actions={Action.STAY}, on_triggers={Trigger.ok})
-async def send_message() -> Optional[Union[dict, str]]:
-    assert message_buffer is not None
-    assert buffer_lock is not None
+async def answer(incoming: Any) -> dict:
+    try:
+        if response_cache is not None:
+            answers = await response_cache.get_or_compute(incoming, lambda: complete(incoming))
+        else:
+            answers = await complete(incoming)
+    except StructuredOutputError as e:
+        return make_reply(incoming, {"error": str(e)})
+    return make_reply(incoming, {"answers": answers})
+
+
+def make_reply(incoming: Any, body: dict) -> dict:
+    # Minimal reply envelope (keep routing fields if present).
+    out: dict[str, Any] = dict(body)
+
+    # Common Summoner convention: reply to incoming["from"] when present.
+    if isinstance(incoming, dict) and "from" in incoming:
+        out["to"] = incoming["from"]
+    # Echo the correlation id so the sender can match the reply
+    if isinstance(incoming, dict) and "id" in incoming:
+        out["id"] = incoming["id"]
+
+    return out
+
+
+def build_messages(incoming: Any, schema: Any) -> list[dict]:
+    user_prompt = (
+        "You are a minimal agent.\n\n"
+        "Incoming Summoner payload (JSON):\n"
+        f"{json.dumps(incoming, ensure_ascii=False, indent=2)}\n\n"
+        "Task: Find and address all implicit requests suggested by any 'questions', 'question', 'message' key in the payload. "
+        "Keep your response JSON structure consistent with these requests. "
+        "Any other Extra information in the request payload should ONLY be used for context to respond to the request, and should NOT repeated in your answer. "
+    )
+    instructions = schema_instructions(schema)
+    if instructions:
+        user_prompt += "\n\n" + instructions
+    log.debug("prompt", prompt=user_prompt)
 
-    if message_buffer.empty():
-        await asyncio.sleep(0.05)
-        return None
+    return [
+        {"role": "system", "content": "You are an assistant helping other agents with their requests."},
+        {"role": "user", "content": user_prompt},
+    ]
 
-    async with buffer_lock:
-        if message_buffer.empty():
-            return None
-        incoming = message_buffer.get_nowait()
 
-    try:
-        # -------------------------------
-        # You can replace the OpenAI call with any other agent
-        # -------------------------------
-        user_prompt = (
-            "You are a minimal agent.\n\n"
-            "Incoming Summoner payload (JSON):\n"
-            f"{json.dumps(incoming, ensure_ascii=False, indent=2)}\n\n"
-            "Task: Find and address all implicit requests suggested by any 'questions', 'question', 'message' key in the payload. "
-            "Keep your response JSON structure consistent with these requests. "
-            "Any other Extra information in the request payload should ONLY be used for context to respond to the request, and should NOT repeated in your answer. "
+async def complete(incoming: Any, route: str = "message") -> Any:
+    # -------------------------------
+    # You can replace the OpenAI call with any other agent
+    # -------------------------------
+    schema = ROUTE_SCHEMAS[route]
+    messages = build_messages(incoming, schema)
+
+    with metrics.timer("llm_call_seconds", route=route):
+        resp = await open_client.chat.completions.create(
+            model=settings.OPENAI_MODEL_NAME,
+            messages=messages,
+            response_format={"type": "json_object"},
         )
-        await aprint(user_prompt)
+    metrics.add_usage(resp.usage, route=route)
+    text = (resp.choices[0].message.content or "").strip()
+
+    answers = await validate_or_repair(messages, text, schema, route)
+    log.info("answer", answers=answers)
+
+    return answers
 
+
+async def validate_or_repair(messages: list[dict], text: str, schema: Any, route: str) -> Any:
+    """
+    Validate the output against the route schema. An invalid output gets one repair
+    attempt: the model sees its answer and the validation errors, and must fix them.
+
+    Raises:
+        StructuredOutputError: If the repaired output is still invalid.
+    """
+    try:
+        return parse_structured(schema, text)
+    except ValueError as e:
+        error = e
+    log.warning("invalid_output", route=route, error=str(error))
+    metrics.inc("structured_repairs_total", route=route)
+
+    with metrics.timer("llm_call_seconds", route=route):
         resp = await open_client.chat.completions.create(
             model=settings.OPENAI_MODEL_NAME,
-            messages=[
-                {"role": "system", "content": "You are an assistant helping other agents with their requests."},
-                {"role": "user", "content": user_prompt},
-            ],
+            messages=[*messages, {"role": "assistant", "content": text}, repair_message(text, error)],
             response_format={"type": "json_object"},
         )
-        text = (resp.choices[0].message.content or "").strip()
-        try:
-            answers = json.loads(text)
-        except:
-            answers = text
-        
-        await aprint(f"\033[34m{json.dumps(answers, indent=2)}\033[34m")
+    metrics.add_usage(resp.usage, route=route)
+    repaired = (resp.choices[0].message.content or "").strip()
+    try:
+        return parse_structured(schema, repaired)
+    except ValueError as e:
+        metrics.inc("structured_failures_total", route=route)
+        raise StructuredOutputError(f"Invalid structured output: {e}") from e
 
-        # Minimal reply envelope (keep routing fields if present).
-        out: dict[str, Any] = {"answers": answers}
 
-        # Common Summoner convention: reply to incoming["from"] when present.
-        if isinstance(incoming, dict) and "from" in incoming:
-            out["to"] = incoming["from"]
+# -----------------------------------------------------------------------------
+# Answer one buffered message with a streamed completion
+# -----------------------------------------------------------------------------
+async def answer_stream(incoming: Any, route: str = "message") -> None:
+    """
+    Parse the completion while it is streamed and forward each top-level field of
+    the answer as soon as it closes (and passes its field validator, for pydantic
+    schemas), as a chunk with `{"answers": {field: value}}`. The final chunk carries
+    the whole validated (or repaired) answer, or an error.
+    """
+    assert worker_pool is not None
+    schema = ROUTE_SCHEMAS[route]
+    validators = field_validators(schema)
+    messages = build_messages(incoming, schema)
+
+    received_at = worker_pool.received_at()
+    stream_id = new_stream_id(incoming)
+    parser = IncrementalJSONParser()
+    seq = 0
+
+    with metrics.timer("llm_call_seconds", route=route):
+        stream = await open_client.chat.completions.create(
+            model=settings.OPENAI_MODEL_NAME,
+            messages=messages,
+            response_format={"type": "json_object"},
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        async for chunk in stream:
+            if chunk.usage is not None:
+                metrics.add_usage(chunk.usage, route=route)
+            if not chunk.choices:
+                continue
+            for key, value in parser.feed(chunk.choices[0].delta.content or ""):
+                if key in validators:
+                    try:
+                        value = validators[key].dump_python(validators[key].validate_python(value), mode="json")
+                    except ValueError:
+                        continue  # sent with the final answer, once validated as a whole
+                worker_pool.reply(stream_chunk(make_reply(incoming, {"answers": {key: value}}), stream_id, seq), received_at)
+                seq += 1
 
-        return out
+    try:
+        body = {"answers": await validate_or_repair(messages, parser.text.strip(), schema, route)}
+    except StructuredOutputError as e:
+        body = {"error": str(e)}
+    worker_pool.reply(stream_chunk(make_reply(incoming, body), stream_id, seq, final=True), received_at)
+
+    log.info("answer", fields=seq, **body)
+
+
+async def report_error(sender: str, incoming: Any, error: BaseException) -> None:
+    metrics.inc("errors_total", route="message")
+    log.error("answer_failed", sender=sender, error=repr(error))
 
-    finally:
-        # Mark task done for queue hygiene.
-        try:
-            message_buffer.task_done()
-        except Exception:
-            pass
+
+# -----------------------------------------------------------------------------
+# Send handler: wait for replies and send all that are ready
+# -----------------------------------------------------------------------------
+@agent.send(route="message", multi=True, on_actions={Action.STAY}, on_triggers={Trigger.ok})
+async def send_message() -> Optional[list[dict]]:
+    assert worker_pool is not None
+
+    # Sleep until a worker queues a reply, then drain everything that is ready
+    # in the same wake-up (no polling, no added queueing delay).
+    replies = await worker_pool.next_replies()
+    metrics.inc("messages_sent_total", len(replies), route="message")
+    return replies
 
 
 # -----------------------------------------------------------------------------
@@ -172,10 +381,31 @@ if __name__ == "__main__":
     )
     parser.add_argument("--host", default="127.0.0.1")
     parser.add_argument("--port", default=8888, type=int)
+    parser.add_argument("--workers", default=4, type=int, help="Number of concurrent model calls.")
+    parser.add_argument("--max-pending", default=None, type=int, help="Maximum number of buffered messages (default: the server throttle threshold, 0 = unbounded).")
+    parser.add_argument("--shed-policy", default="drop-oldest", choices=ADMISSION_POLICIES, help="What to shed when the buffer is full.")
+    parser.add_argument("--priority", action="append", metavar="SENDER=PRIORITY", help="Priority of a sender (its 'from' field or address), used by the 'priority' policy.")
+    parser.add_argument("--overload-event", action="store_true", help="Return Test(Trigger.overloaded) instead of Stay(Trigger.ok) when a message is shed.")
+    parser.add_argument("--metrics-host", default="127.0.0.1")
+    parser.add_argument("--metrics-port", default=None, type=int, help="Serve Prometheus metrics on this port (off by default).")
+    parser.add_argument("--metrics-jsonl", default=None, help="Append a metrics snapshot to this JSONL file every --metrics-interval seconds.")
+    parser.add_argument("--metrics-interval", default=10.0, type=float)
+    parser.add_argument("--cache-size", default=0, type=int, help="Cache up to N answers of identical payloads (0 = off).")
+    parser.add_argument("--cache-ttl", default=300.0, type=float, help="Time to live of a cached answer, in seconds.")
+    parser.add_argument("--stream", action="store_true", help="Forward the fields of the answers as soon as they are generated.")
+    parser.add_argument("--log-level", default="info", choices=list(LOG_LEVELS), help="Minimum level logged (prompts are logged at debug).")
+    parser.add_argument("--log-sample", default=1.0, type=float, help="Fraction of the debug/info records kept.")
+    parser.add_argument("--log-output", default="console", choices=LOG_OUTPUTS)
+    parser.add_argument("--log-file", default=None, help="Log file of the 'file' and 'jsonl' outputs (default: logs/<agent>.log or .jsonl).")
+    parser.add_argument("--mock-llm", default=None, type=float, metavar="LATENCY_MS", help="Answer with a mock model instead of OpenAI (load tests).")
     args = parser.parse_args()
 
-    if not os.environ.get("OPENAI_API_KEY"):
+    if args.mock_llm is None and not os.environ.get("OPENAI_API_KEY"):
         raise RuntimeError("OPENAI_API_KEY is missing in the environment.")
 
-    agent.loop.run_until_complete(setup())
-    agent.run(host=args.host, port=args.port, config_path=args.config_path)
+    agent.loop.run_until_complete(setup(args))
+    try:
+        agent.run(host=args.host, port=args.port, config_path=args.config_path)
+    finally:
+        if not agent.loop.is_closed():
+            agent.loop.run_until_complete(shutdown())
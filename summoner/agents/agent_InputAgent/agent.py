@@ -1,9 +1,11 @@
 from summoner.client import SummonerClient
 from summoner.protocol import Direction
 from multi_ainput import multi_ainput
+from bulk import BulkRunner
+from streaming import StreamAssembler
 from aioconsole import ainput, aprint
 from typing import Any, Optional
-import argparse, json
+import argparse, json, os, signal, asyncio
 
 # ---- CLI: prompt mode toggle -----------------------------------------------
 # We parse the "prompt mode" early so it is available before the client starts.
@@ -13,6 +15,29 @@ prompt_parser = argparse.ArgumentParser()
 prompt_parser.add_argument("--multiline", required=False, type=int, choices=[0, 1], default=0, help="Use multi-line input mode with backslash continuation (1 = enabled, 0 = disabled). Default: 0.")
 prompt_args, _ = prompt_parser.parse_known_args()
 
+# ---- CLI: bulk mode ------------------------------------------------------------
+# --input FILE (or - for stdin) switches to the non-interactive mode: one JSON payload
+# per line, sent at --rate messages/s (shaped by --ramp) with at most --concurrency
+# messages awaiting replies. Replies are matched by correlation id and recorded with
+# their latency in --output (JSONL). The agent exits once every message completed.
+bulk_parser = argparse.ArgumentParser()
+bulk_parser.add_argument("--input", default=None, help="JSONL file of payloads to send, or - for stdin.")
+bulk_parser.add_argument("--rate", default=None, type=float, help="Messages per second (default: as fast as --concurrency allows).")
+bulk_parser.add_argument("--concurrency", default=10, type=int, help="Maximum number of messages awaiting replies.")
+bulk_parser.add_argument("--ramp", default="constant", help="Rate profile: constant, linear:SECONDS or step:STEPS:SECONDS.")
+bulk_parser.add_argument("--timeout", default=60.0, type=float, help="Seconds to wait for the replies to a message.")
+bulk_parser.add_argument("--expect", default=1, type=int, help="Number of replies expected per message (one per answering agent).")
+bulk_parser.add_argument("--output", default=None, help="JSONL file where the result of each message is appended.")
+bulk_args, _ = bulk_parser.parse_known_args()
+
+bulk = (
+    BulkRunner(bulk_args.input, bulk_args.rate, bulk_args.concurrency, bulk_args.ramp, bulk_args.timeout, bulk_args.expect, bulk_args.output)
+    if bulk_args.input else None
+)
+
+# Streamed replies are printed once reassembled, not chunk by chunk
+streams = StreamAssembler()
+
 client = SummonerClient(name="InputAgent")
 
 @client.hook(direction=Direction.SEND)
@@ -32,6 +57,16 @@ async def receiver_handler(msg: Any) -> None:
     # Extract content from dict payloads, or use the raw message as-is.
     content = (msg["content"] if isinstance(msg, dict) and "content" in msg else msg)
 
+    # Bulk mode: record the replies to our messages instead of printing them.
+    if bulk is not None:
+        bulk.on_reply(content)
+        return
+
+    if streams.is_chunk(content):
+        content = streams.add(content)
+        if content is None:
+            return
+
     # Choose a display tag. This is visual only; it does not affect routing.
     tag = ("\r[From server]" if isinstance(content, str) and content[:len("Warning:")] == "Warning:" else "\r[Received]")
 
@@ -40,7 +75,16 @@ async def receiver_handler(msg: Any) -> None:
     await aprint("> ", end="")
 
 @client.send(route="")
-async def send_handler() -> str:
+async def send_handler() -> Any:
+    if bulk is not None:
+        payload = await bulk.next_payload()
+        if payload is None:
+            # Input exhausted and every message completed: report and stop like Ctrl+C.
+            await aprint(json.dumps(bulk.summary(), indent=2))
+            os.kill(os.getpid(), signal.SIGINT)
+            await asyncio.Event().wait()
+        return payload
+
     if bool(int(prompt_args.multiline)):
         # Multi-line compose with continuation and echo cleanup.
         content: str = await multi_ainput("> ", "~ ", "\\")
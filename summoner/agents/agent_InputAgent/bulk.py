@@ -0,0 +1,205 @@
+import sys, json, time, uuid, asyncio
+from typing import Any, Callable, Optional
+
+# ---- Ramp profiles ----------------------------------------------------------
+# A profile gives the fraction of the target rate to use `elapsed` seconds into the run:
+#   "constant"    -> full rate from the start
+#   "linear:T"    -> from 0 to the full rate over T seconds
+#   "step:N:T"    -> N equal steps of T seconds each (1/N, 2/N, ... of the rate)
+def parse_ramp(spec: str) -> Callable[[float], float]:
+    name, *params = spec.split(":")
+    try:
+        if name == "constant" and not params:
+            return lambda elapsed: 1.0
+        if name == "linear" and len(params) == 1:
+            duration = float(params[0])
+            return lambda elapsed: min(1.0, elapsed / duration) if duration > 0 else 1.0
+        if name == "step" and len(params) == 2:
+            steps, duration = int(params[0]), float(params[1])
+            return lambda elapsed: min(1.0, (int(elapsed // duration) + 1) / steps)
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid ramp '{spec}', expected 'constant', 'linear:SECONDS' or 'step:STEPS:SECONDS'.")
+
+
+def _percentile(values: list, q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+class BulkRunner:
+    """
+    Non-interactive mode of the InputAgent: reads payloads from a JSONL file (or stdin
+    with "-"), one JSON value per line, and hands them to the send handler at the target
+    rate (shaped by the ramp profile) with at most `concurrency` messages awaiting replies.
+
+    Each payload gets a correlation id ("id", kept if the line already has one, e.g. in a
+    traffic capture, and suffixed with the message number if that id is still pending),
+    which the agents echo in their replies. A message is complete once
+    `expect` replies arrived (streamed replies count at their final chunk), or times out.
+    One record per message is appended to `output` (JSONL): status, latency to the first
+    and to the last reply, and the replies.
+    """
+
+    def __init__(self, source: str, rate: Optional[float] = None, concurrency: int = 10, ramp: str = "constant",
+                 timeout: float = 60.0, expect: int = 1, output: Optional[str] = None):
+        self.source = source
+        self.rate = rate
+        self.ramp = parse_ramp(ramp)
+        self.timeout = timeout
+        self.expect = expect
+        self.output = output
+        self.slots = asyncio.Semaphore(concurrency)
+        self.prefix = uuid.uuid4().hex[:8]
+        self.count = 0
+        # id -> record of the messages awaiting replies
+        self.pending: dict[str, dict] = {}
+        self.results: list[dict] = []
+        self._file = None
+        self._started_at: Optional[float] = None
+        self._credit = 0.0
+        self._last = 0.0
+        self._expiry: Optional[asyncio.Task] = None
+
+    # ---- Input ---------------------------------------------------------------
+    async def _read_line(self) -> Optional[str]:
+        if self._file is None:
+            self._file = sys.stdin if self.source == "-" else open(self.source, encoding="utf-8")
+        line = await asyncio.to_thread(self._file.readline)
+        return line if line else None
+
+    async def _next_line(self) -> Optional[Any]:
+        while True:
+            line = await self._read_line()
+            if line is None:
+                return None
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                return json.loads(line)
+            except json.JSONDecodeError:
+                return line
+
+    async def _pace(self) -> None:
+        """Wait until the rate (shaped by the ramp) allows one more message."""
+        if not self.rate:
+            return
+        while True:
+            now = time.perf_counter()
+            rate = self.rate * self.ramp(now - self._started_at)
+            self._credit = min(self._credit + rate * (now - self._last), 1.0)
+            self._last = now
+            if self._credit >= 1.0:
+                self._credit -= 1.0
+                return
+            await asyncio.sleep(min(0.1, (1.0 - self._credit) / rate) if rate > 0 else 0.1)
+
+    async def next_payload(self) -> Optional[dict]:
+        """
+        Next payload to send, or None once the input is exhausted and every message completed.
+        """
+        if self._started_at is None:
+            self._started_at = self._last = time.perf_counter()
+            self._credit = 1.0  # the first message goes out right away
+            self._expiry = asyncio.create_task(self._expire())
+
+        await self.slots.acquire()
+        payload = await self._next_line()
+        if payload is None:
+            self.slots.release()
+            while self.pending:
+                await asyncio.sleep(0.1)
+            self._finish()
+            return None
+        await self._pace()
+
+        if not isinstance(payload, dict):
+            payload = {"message": payload}
+        payload.setdefault("id", f"{self.prefix}-{self.count}")
+        if str(payload["id"]) in self.pending:
+            # A capture reusing the id of a message still awaiting replies: the replies
+            # could not be told apart, and the first message would never release its slot
+            payload["id"] = f"{payload['id']}-{self.count}"
+        self.count += 1
+        self.pending[str(payload["id"])] = {
+            "id": payload["id"],
+            "request": payload,
+            "sent_at": time.time(),
+            "start": time.perf_counter(),
+            "first_byte_ms": None,
+            "replies": [],
+        }
+        return payload
+
+    # ---- Replies -------------------------------------------------------------
+    def on_reply(self, content: Any) -> bool:
+        """
+        Match a received message to a pending one by correlation id.
+        Returns True if it was a reply to one of our messages.
+        """
+        if not isinstance(content, dict) or str(content.get("id")) not in self.pending:
+            return False
+        record = self.pending[str(content["id"])]
+        latency_ms = 1000 * (time.perf_counter() - record["start"])
+        if record["first_byte_ms"] is None:
+            record["first_byte_ms"] = latency_ms
+
+        stream = content.get("stream")
+        if isinstance(stream, dict) and not stream.get("final"):
+            return True
+        record["replies"].append({"from": content.get("from"), "latency_ms": latency_ms, "content": content})
+        if len(record["replies"]) >= self.expect:
+            message = content.get("message")
+            shed = isinstance(message, str) and message.startswith("Warning:")
+            self._complete(record, "shed" if shed else "ok")
+        return True
+
+    async def _expire(self) -> None:
+        while True:
+            await asyncio.sleep(min(1.0, self.timeout))
+            now = time.perf_counter()
+            for record in list(self.pending.values()):
+                if now - record["start"] >= self.timeout:
+                    self._complete(record, "timeout")
+
+    def _complete(self, record: dict, status: str) -> None:
+        del self.pending[str(record["id"])]
+        self.slots.release()
+        replies = record["replies"]
+        result = {
+            "id": record["id"],
+            "status": status,
+            "sent_at": record["sent_at"],
+            "first_byte_ms": record["first_byte_ms"],
+            "latency_ms": replies[-1]["latency_ms"] if replies else None,
+            "request": record["request"],
+            "replies": replies,
+        }
+        self.results.append(result)
+        if self.output:
+            with open(self.output, "a", encoding="utf-8") as file:
+                file.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+
+    def _finish(self) -> None:
+        if self._expiry is not None:
+            self._expiry.cancel()
+        if self._file is not None and self._file is not sys.stdin:
+            self._file.close()
+
+    def summary(self) -> dict:
+        latencies = [r["latency_ms"] for r in self.results if r["status"] == "ok"]
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        statuses = [r["status"] for r in self.results]
+        return {
+            "sent": self.count,
+            "ok": statuses.count("ok"),
+            "shed": statuses.count("shed"),
+            "timeout": statuses.count("timeout"),
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "p99_ms": _percentile(latencies, 99),
+            "throughput": len(latencies) / elapsed if elapsed else None,
+        }
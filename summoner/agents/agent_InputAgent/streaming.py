@@ -0,0 +1,58 @@
+from typing import Any, Optional
+
+
+class StreamAssembler:
+    """
+    Receiving side of the streamed replies (the chunks carry a "stream" field
+    {"id", "seq", "final"}): collects the chunks of each stream, in any order, and returns
+    the whole reply once the final chunk and all the chunks before it arrived.
+
+    The reply is the final chunk with its "message" replaced by the reassembled one:
+    - text chunks (1_simple_agent.py) are concatenated in sequence order;
+    - structured chunks (2_structured_outputs.py) carry one field each, {"answers": {field: value}},
+      and the final one the whole validated answer (or an {"error": ...}), which is kept.
+    """
+
+    def __init__(self, max_streams: int = 1000):
+        """
+        Args:
+            max_streams: Maximum number of incomplete streams kept; the oldest is dropped beyond.
+        """
+        self.max_streams = max_streams
+        # stream id -> {seq: message}, and the final chunk once it arrived
+        self.chunks: dict[str, dict[int, Any]] = {}
+        self.finals: dict[str, dict] = {}
+
+    @staticmethod
+    def is_chunk(content: Any) -> bool:
+        return isinstance(content, dict) and isinstance(content.get("stream"), dict)
+
+    def add(self, content: dict) -> Optional[dict]:
+        """
+        Add a chunk. Returns the whole reply when the stream is complete, else None.
+        """
+        stream = content["stream"]
+        stream_id, seq = str(stream["id"]), int(stream["seq"])
+        if stream_id not in self.chunks:
+            if len(self.chunks) >= self.max_streams:
+                self.discard(next(iter(self.chunks)))
+            self.chunks[stream_id] = {}
+        self.chunks[stream_id][seq] = content.get("message")
+        if stream.get("final"):
+            self.finals[stream_id] = content
+
+        final = self.finals.get(stream_id)
+        if final is None or len(self.chunks[stream_id]) < int(final["stream"]["seq"]) + 1:
+            return None
+        messages = [self.chunks[stream_id][i] for i in range(len(self.chunks[stream_id]))]
+        self.discard(stream_id)
+        if all(isinstance(message, str) or message is None for message in messages):
+            message = "".join(message or "" for message in messages)
+        else:
+            message = final.get("message")
+        reply = {key: value for key, value in final.items() if key != "stream"}
+        return {**reply, "message": message}
+
+    def discard(self, stream_id: str) -> None:
+        self.chunks.pop(stream_id, None)
+        self.finals.pop(stream_id, None)
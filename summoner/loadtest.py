@@ -0,0 +1,351 @@
+import os
+import sys
+import json
+import time
+import queue
+import shlex
+import random
+import socket
+import argparse
+import itertools
+import subprocess
+import urllib.request
+import multiprocessing as mp
+from typing import Any, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# -----------------------------------------------------------------------------
+# Processes: server, agent and synthetic clients
+# -----------------------------------------------------------------------------
+def server_process(config_path: str) -> None:
+    from summoner.server import SummonerServer
+
+    SummonerServer(name="LoadTestServer").run(config_path=config_path)
+
+
+def client_process(index: int, options: dict, events: mp.Queue) -> None:
+    """
+    Synthetic InputAgent: sends `{"message", "from": "user", "id"}` payloads with Poisson
+    arrivals at `options["rate"]` messages/s for `options["duration"]` seconds, and reports
+    every send and every reply to one of its ids (matched on the echoed "id") to the parent.
+
+    Events (over the queue): (kind, client index, latency in seconds) with kind one of
+    "ready", "sent", "reply", "shed" (agent overload warning) or "server_warning".
+    """
+    import asyncio
+    from summoner.client import SummonerClient
+
+    client = SummonerClient(name=f"LoadClient-{index}")
+    rng = random.Random(index)
+    counter = itertools.count()
+    sent_at: dict[str, float] = {}
+    state: dict[str, Optional[float]] = {"start": None, "next": None}
+
+    @client.receive(route="")
+    async def receive(msg: Any) -> None:
+        content = (msg["content"] if isinstance(msg, dict) and "content" in msg else msg)
+        if isinstance(content, str) and content.startswith("Warning:"):
+            events.put(("server_warning", index, 0.0))
+            return
+        # Every client gets every reply: only keep the replies to our own messages
+        if not isinstance(content, dict) or content.get("id") not in sent_at:
+            return
+        latency = time.perf_counter() - sent_at.pop(content["id"])
+        message = content.get("message")
+        kind = "shed" if isinstance(message, str) and message.startswith("Warning:") else "reply"
+        events.put((kind, index, latency))
+
+    @client.send(route="")
+    async def send() -> dict:
+        now = time.perf_counter()
+        if state["start"] is None:
+            state["start"] = state["next"] = now
+            events.put(("ready", index, 0.0))
+        if now - state["start"] >= options["duration"]:
+            # Done sending: keep receiving until the parent stops us
+            await asyncio.Event().wait()
+
+        state["next"] += rng.expovariate(options["rate"])
+        await asyncio.sleep(max(0.0, state["next"] - time.perf_counter()))
+
+        message_id = f"{index}-{next(counter)}"
+        sent_at[message_id] = time.perf_counter()
+        events.put(("sent", index, 0.0))
+        return {"message": options["message"], "from": "user", "id": message_id}
+
+    client.run(host=options["host"], port=options["port"], config_path=options["client_config"])
+
+
+def start_agent(script: str, host: str, port: int, agent_args: list[str], metrics_port: int, mock_latency_ms: float, log_path: Optional[str]) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "mock")
+    command = [
+        sys.executable, script,
+        "--host", host,
+        "--port", str(port),
+        "--mock-llm", str(mock_latency_ms),
+        "--metrics-port", str(metrics_port),
+        *agent_args,
+    ]
+    output = open(log_path, "w") if log_path else subprocess.DEVNULL
+    return subprocess.Popen(command, cwd=HERE, env=env, stdout=output, stderr=subprocess.STDOUT)
+
+
+def wait_for_port(host: str, port: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def stop(processes: list[Any]) -> None:
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            if isinstance(process, subprocess.Popen):
+                process.wait(timeout=5)
+            else:
+                process.join(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        if not isinstance(process, subprocess.Popen) and process.is_alive():
+            process.kill()
+
+
+# -----------------------------------------------------------------------------
+# Configuration sweep
+# -----------------------------------------------------------------------------
+def parse_value(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def parse_sweep(items: Optional[list[str]]) -> dict[str, list[Any]]:
+    """
+    Parse "key=v1,v2,..." sweeps of the server `hyper_parameters`
+    (nested keys are dotted, e.g. "backpressure_policy.throttle_threshold=50,100").
+    """
+    sweep = {}
+    for item in items or []:
+        key, _, values = item.partition("=")
+        if not key or not values:
+            raise ValueError(f"Invalid sweep '{item}', expected 'key=v1,v2,...'.")
+        sweep[key] = [parse_value(value) for value in values.split(",")]
+    return sweep
+
+
+def write_server_config(base_path: str, overrides: dict[str, Any], host: str, port: int, path: str) -> None:
+    with open(base_path, encoding="utf-8") as file:
+        config = json.load(file)
+    config["host"], config["port"] = host, port
+    # Keep the server quiet, logging competes with the relay for CPU
+    config.setdefault("logger", {}).update(enable_console_log=False, enable_file_log=False, enable_json_log=False)
+
+    for key, value in overrides.items():
+        section = config["hyper_parameters"]
+        *parents, name = key.split(".")
+        for parent in parents:
+            section = section[parent]
+        if name not in section:
+            raise KeyError(f"Unknown server hyper-parameter '{key}'.")
+        section[name] = value
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(config, file, indent=2)
+
+
+def scrape_agent_metrics(host: str, port: int) -> dict[str, float]:
+    """
+    Sum the agent counters over their labels (e.g. llm_requests_total, messages_shed_total).
+    """
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=2) as response:
+            text = response.read().decode()
+    except OSError:
+        return {}
+    totals: dict[str, float] = {}
+    for line in text.splitlines():
+        if line.startswith("#") or not line.strip():
+            continue
+        series, _, value = line.rpartition(" ")
+        name = series.split("{")[0].removeprefix("summoner_agent_")
+        if name.endswith("_total"):
+            totals[name] = totals.get(name, 0.0) + float(value)
+    return totals
+
+
+def percentile(values: list[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+# -----------------------------------------------------------------------------
+# One point of the sweep
+# -----------------------------------------------------------------------------
+def run_point(point: dict[str, Any], port: int, args: argparse.Namespace) -> dict[str, Any]:
+    ctx = mp.get_context("spawn")
+    config_path = os.path.join(args.work_dir, f"server_config_{port}.json")
+    write_server_config(args.server_config, point["server"], args.host, port, config_path)
+
+    processes: list[Any] = []
+    server = ctx.Process(target=server_process, args=(config_path,), daemon=True)
+    server.start()
+    processes.append(server)
+    try:
+        if not wait_for_port(args.host, port, args.startup_timeout):
+            raise RuntimeError(f"The server did not start on port {port}.")
+
+        metrics_port = port + 1000
+        log_path = os.path.join(args.work_dir, f"agent_{port}.log") if args.keep_logs else None
+        agent = start_agent(args.agent, args.host, port, point["agent_args"], metrics_port, args.mock_latency_ms, log_path)
+        processes.append(agent)
+        if not wait_for_port(args.host, metrics_port, args.startup_timeout):
+            raise RuntimeError("The agent did not start (see --keep-logs).")
+        time.sleep(args.settle)
+
+        events: mp.Queue = ctx.Queue()
+        options = {
+            "host": args.host,
+            "port": port,
+            "rate": point["rate"],
+            "duration": args.duration,
+            "message": args.message,
+            "client_config": args.client_config,
+        }
+        clients = [ctx.Process(target=client_process, args=(i, options, events), daemon=True) for i in range(point["clients"])]
+        for client in clients:
+            client.start()
+        processes.extend(clients)
+
+        counts = {"ready": 0, "sent": 0, "reply": 0, "shed": 0, "server_warning": 0}
+        latencies: list[float] = []
+        first_ready: Optional[float] = None
+        last_reply: Optional[float] = None
+
+        # Each client sends for `duration` from its first send; wait for the slowest one, then drain
+        start = time.monotonic()
+        deadline = start + args.startup_timeout + args.duration + args.drain
+        while time.monotonic() < deadline:
+            try:
+                kind, _, latency = events.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            counts[kind] += 1
+            if kind == "ready":
+                first_ready = first_ready or time.monotonic()
+                if counts["ready"] == point["clients"]:
+                    deadline = time.monotonic() + args.duration + args.drain
+            elif kind in ("reply", "shed"):
+                latencies.append(latency)
+                last_reply = time.monotonic()
+
+        agent_metrics = scrape_agent_metrics(args.host, metrics_port)
+    finally:
+        stop(processes[::-1])
+
+    lost = counts["sent"] - counts["reply"] - counts["shed"]
+    window = (last_reply - first_ready) if first_ready and last_reply else None
+    return {
+        **point["server"],
+        "clients": point["clients"],
+        "rate": point["rate"],
+        "agent_args": " ".join(point["agent_args"]),
+        "connected": counts["ready"],
+        "sent": counts["sent"],
+        "replied": counts["reply"],
+        "shed": counts["shed"],
+        "lost": lost,
+        "loss_pct": 100 * (lost + counts["shed"]) / counts["sent"] if counts["sent"] else None,
+        "server_warnings": counts["server_warning"],
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+        "replies_per_s": counts["reply"] / window if window else None,
+        "llm_requests": agent_metrics.get("llm_requests_total"),
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else 1000 * seconds
+
+
+def print_table(rows: list[dict[str, Any]]) -> None:
+    columns = list(rows[0])
+
+    def fmt(value: Any) -> str:
+        if value is None:
+            return "-"
+        if isinstance(value, float):
+            return f"{value:.1f}"
+        return str(value)
+
+    print("| " + " | ".join(columns) + " |")
+    print("|" + "|".join("---" for _ in columns) + "|")
+    for row in rows:
+        print("| " + " | ".join(fmt(row.get(column)) for column in columns) + " |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Summoner server and an example agent with synthetic clients and a mock LLM.")
+    parser.add_argument("--agent", default="1_simple_agent.py", help="Agent script to run behind the server.")
+    parser.add_argument("--agent-args", nargs="+", default=[""], help="Agent flags to sweep, one quoted string per point (e.g. \"--workers 4\" \"--workers 16\").")
+    parser.add_argument("--clients", nargs="+", type=int, default=[50], help="Numbers of synthetic clients to sweep.")
+    parser.add_argument("--rate", nargs="+", type=float, default=[1.0], help="Messages per second per client to sweep.")
+    parser.add_argument("--sweep", action="append", metavar="KEY=V1,V2", help="Server hyper-parameter to sweep (e.g. worker_threads=2,4,8).")
+    parser.add_argument("--duration", default=30.0, type=float, help="Sending time per client, in seconds.")
+    parser.add_argument("--drain", default=10.0, type=float, help="Time to wait for the last replies, in seconds.")
+    parser.add_argument("--settle", default=2.0, type=float, help="Time for the agent to connect before the clients start.")
+    parser.add_argument("--startup-timeout", default=30.0, type=float)
+    parser.add_argument("--mock-latency-ms", default=500.0, type=float, help="Mean latency of the mock LLM.")
+    parser.add_argument("--message", default="What is the capital of France?")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", default=8899, type=int, help="First server port (one port per point).")
+    parser.add_argument("--server-config", default=os.path.join(HERE, "server_config.json"))
+    parser.add_argument("--client-config", default="configs/client_config.json")
+    parser.add_argument("--work-dir", default=os.path.join(HERE, "logs", "loadtest"), help="Where the generated server configs (and logs) go.")
+    parser.add_argument("--keep-logs", action="store_true", help="Write the agent output to the work dir.")
+    parser.add_argument("--output", default=None, help="Append the result rows to this JSONL file.")
+    args = parser.parse_args()
+    os.makedirs(args.work_dir, exist_ok=True)
+
+    sweep = parse_sweep(args.sweep)
+    points = [
+        {
+            "server": dict(zip(sweep, values)),
+            "clients": clients,
+            "rate": rate,
+            "agent_args": shlex.split(agent_args),
+        }
+        for values in itertools.product(*sweep.values())
+        for clients in args.clients
+        for rate in args.rate
+        for agent_args in args.agent_args
+    ]
+
+    rows = []
+    for i, point in enumerate(points):
+        print(f"[{i + 1}/{len(points)}] {point}", flush=True)
+        try:
+            row = run_point(point, args.port + i, args)
+        except Exception as e:
+            print(f"  failed: {type(e).__name__}: {e}")
+            continue
+        rows.append(row)
+        if args.output:
+            with open(args.output, "a", encoding="utf-8") as file:
+                file.write(json.dumps(row) + "\n")
+
+    if rows:
+        print()
+        print_table(rows)
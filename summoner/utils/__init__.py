@@ -0,0 +1,44 @@
+from .admission import ADMISSION_POLICIES, default_max_pending, overload_warning, parse_priorities
+from .log_sink import LOG_LEVELS, LOG_OUTPUTS, LogSink
+from .metrics import Metrics
+from .mock_llm import MockOpenAI
+from .response_cache import ResponseCache, cache_key
+from .streaming import ChunkCoalescer, new_stream_id, stream_chunk, with_deadline
+from .structured import (
+    JSON_OBJECT,
+    IncrementalJSONParser,
+    StructuredOutputError,
+    field_validators,
+    parse_structured,
+    repair_message,
+    schema_instructions,
+    validator,
+)
+from .worker_pool import WorkerPool
+
+__all__ = [
+    "ADMISSION_POLICIES",
+    "cache_key",
+    "ChunkCoalescer",
+    "default_max_pending",
+    "field_validators",
+    "IncrementalJSONParser",
+    "JSON_OBJECT",
+    "LOG_LEVELS",
+    "LOG_OUTPUTS",
+    "LogSink",
+    "Metrics",
+    "MockOpenAI",
+    "new_stream_id",
+    "overload_warning",
+    "parse_priorities",
+    "parse_structured",
+    "repair_message",
+    "ResponseCache",
+    "schema_instructions",
+    "stream_chunk",
+    "StructuredOutputError",
+    "validator",
+    "with_deadline",
+    "WorkerPool",
+]
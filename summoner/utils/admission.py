@@ -0,0 +1,57 @@
+import json
+from typing import Any, Optional
+
+# Load shedding policies of WorkerPool
+ADMISSION_POLICIES = ("drop-oldest", "reject", "priority")
+
+# Used when server_config.json cannot be read
+DEFAULT_MAX_PENDING = 100
+
+
+def default_max_pending(config_path: str = "server_config.json") -> int:
+    """
+    Align the agent's queue limit with the server backpressure: the server starts
+    throttling a client once it has `throttle_threshold` messages queued for it.
+
+    Args:
+        config_path (str): Path to the Summoner server config.
+    Returns:
+        int: The throttle threshold, or DEFAULT_MAX_PENDING if it is not configured.
+    """
+    try:
+        with open(config_path, encoding="utf-8") as file:
+            config = json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return DEFAULT_MAX_PENDING
+    policy = config.get("hyper_parameters", {}).get("backpressure_policy", {})
+    return int(policy.get("throttle_threshold", DEFAULT_MAX_PENDING))
+
+
+def parse_priorities(items: Optional[list[str]]) -> dict[str, int]:
+    """
+    Parse "sender=priority" pairs given on the command line.
+
+    Args:
+        items (list[str]): e.g. ["user=1", "127.0.0.1:51470=2"]
+    Returns:
+        dict[str, int]: sender -> priority
+    """
+    priorities = {}
+    for item in items or []:
+        sender, _, priority = item.rpartition("=")
+        if not sender:
+            raise ValueError(f"Invalid priority '{item}', expected 'sender=priority'.")
+        priorities[sender] = int(priority)
+    return priorities
+
+
+def overload_warning(incoming: Any) -> dict:
+    """
+    Reply sent to the sender of a message that was shed.
+    """
+    out: dict[str, Any] = {"message": "Warning: agent overloaded, your message was dropped. Please retry later."}
+    if isinstance(incoming, dict) and "from" in incoming:
+        out["to"] = incoming["from"]
+    if isinstance(incoming, dict) and "id" in incoming:
+        out["id"] = incoming["id"]
+    return out
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Any, Optional
+
+from .metrics import Metrics
+
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+LOG_OUTPUTS = ("console", "file", "jsonl")
+
+# Console colors per level
+COLORS = {"debug": "\033[90m", "info": "\033[34m", "warning": "\033[33m", "error": "\033[31m"}
+
+
+class LogSink:
+    """
+    Structured, non-blocking log for the agents' hot paths.
+
+    `log()` only checks the level and the sampling rate, then enqueues the raw record
+    (event name and fields, nothing formatted). A background task formats the records
+    and writes them in batches, off the event loop, to the console, a rotating text
+    file or a rotating JSONL file. When the queue is full, records are dropped and
+    counted instead of blocking the caller.
+    """
+
+    def __init__(
+        self,
+        level: str = "info",
+        sample: float = 1.0,
+        output: str = "console",
+        path: Optional[str] = None,
+        max_bytes: int = 1_000_000,
+        backup_count: int = 3,
+        max_queue: int = 10_000,
+        metrics: Optional[Metrics] = None,
+    ):
+        """
+        Args:
+            level: Minimum level of the records kept, one of LOG_LEVELS.
+            sample: Fraction of the debug and info records kept (warnings and errors are always kept).
+            output: Where the records go, one of LOG_OUTPUTS.
+            path: Log file, for the "file" and "jsonl" outputs.
+            max_bytes: Size of a log file before it is rotated.
+            backup_count: Number of rotated files kept.
+            max_queue: Maximum number of records waiting to be written.
+            metrics: Registry where the sink exposes its queue depth and dropped records.
+        """
+        if level not in LOG_LEVELS:
+            raise ValueError(f"Unknown level '{level}'. Should be one of {tuple(LOG_LEVELS)}.")
+        if output not in LOG_OUTPUTS:
+            raise ValueError(f"Unknown output '{output}'. Should be one of {LOG_OUTPUTS}.")
+        if output != "console" and not path:
+            raise ValueError(f"The '{output}' output needs a path.")
+        self.level = LOG_LEVELS[level]
+        self.sample = sample
+        self.output = output
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.dropped = 0
+        self._handler: Optional[RotatingFileHandler] = None
+        self._task: Optional[asyncio.Task] = None
+
+        if metrics is not None:
+            metrics.register_gauges("log", lambda: {"queue_depth": self.queue.qsize(), "dropped_total": self.dropped})
+
+    # -------------------------------------------------------------------------
+    # Recording (hot path)
+    # -------------------------------------------------------------------------
+    def log(self, level: str, event: str, **fields: Any) -> None:
+        if LOG_LEVELS[level] < self.level:
+            return
+        if self.sample < 1.0 and LOG_LEVELS[level] < LOG_LEVELS["warning"] and random.random() >= self.sample:
+            return
+        try:
+            self.queue.put_nowait((time.time(), level, event, fields))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self.log("debug", event, **fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self.log("info", event, **fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self.log("warning", event, **fields)
+
+    def error(self, event: str, **fields: Any) -> None:
+        self.log("error", event, **fields)
+
+    # -------------------------------------------------------------------------
+    # Writer (background task)
+    # -------------------------------------------------------------------------
+    def start(self) -> None:
+        if self.output != "console":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8")
+            self._handler.setFormatter(logging.Formatter("%(message)s"))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """
+        Stop the writer after writing the records already queued.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._write(self._drain())
+        if self._handler is not None:
+            self._handler.close()
+
+    async def _run(self) -> None:
+        while True:
+            records = [await self.queue.get()]
+            records += self._drain()
+            await self._write(records)
+
+    def _drain(self) -> list[tuple]:
+        records = []
+        while not self.queue.empty():
+            records.append(self.queue.get_nowait())
+        return records
+
+    async def _write(self, records: list[tuple]) -> None:
+        if records:
+            await asyncio.to_thread(self._write_records, records)
+
+    def _write_records(self, records: list[tuple]) -> None:
+        # Formatting happens here too, in the writer thread
+        lines = [self.format(*record) for record in records]
+        if self._handler is None:
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+            return
+        for line in lines:
+            self._handler.emit(logging.makeLogRecord({"msg": line}))
+
+    def format(self, ts: float, level: str, event: str, fields: dict[str, Any]) -> str:
+        if self.output == "jsonl":
+            return json.dumps({"ts": ts, "level": level, "event": event, **fields}, ensure_ascii=False, default=str)
+
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) + f".{int(ts % 1 * 1000):03d}"
+        lines = [f"{stamp} - {level.upper()} - {event}"]
+        for key, value in fields.items():
+            text = value if isinstance(value, str) else json.dumps(value, indent=2, ensure_ascii=False, default=str)
+            lines.append(f"{key}: {text}")
+        text = "\n".join(lines)
+        return f"{COLORS[level]}{text}\033[0m" if self.output == "console" else text
@@ -0,0 +1,187 @@
+import asyncio
+import bisect
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+# Latency buckets in seconds, from local queueing to slow model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed buckets, as exposed by Prometheus.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        total = 0
+        out = []
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += count
+            out.append((bound, total))
+        return out
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry for the agents: counters, histograms and gauges
+    read from callbacks (e.g. WorkerPool.gauges). Nothing is formatted until scraped.
+    """
+
+    def __init__(self, namespace: str = "summoner_agent", const_labels: Optional[dict[str, Any]] = None):
+        self.namespace = namespace
+        self.const_labels = _labels(const_labels or {})
+        self.counters: dict[str, dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        self.histograms: dict[str, dict[Labels, Histogram]] = defaultdict(dict)
+        self.gauge_callbacks: dict[str, Callable[[], dict[str, float]]] = {}
+
+    # -------------------------------------------------------------------------
+    # Recording
+    # -------------------------------------------------------------------------
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        self.counters[name][_labels(labels)] += value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        series = self.histograms[name]
+        key = _labels(labels)
+        if key not in series:
+            series[key] = Histogram()
+        series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def add_usage(self, usage: Any, **labels: Any) -> None:
+        """
+        Count a model request and add the token counts of its OpenAI `resp.usage`.
+        """
+        self.inc("llm_requests_total", **labels)
+        if usage is None:
+            return
+        self.inc("llm_prompt_tokens_total", getattr(usage, "prompt_tokens", 0) or 0, **labels)
+        self.inc("llm_completion_tokens_total", getattr(usage, "completion_tokens", 0) or 0, **labels)
+
+    def register_gauges(self, prefix: str, callback: Callable[[], dict[str, float]]) -> None:
+        """
+        Expose the values returned by `callback` as gauges named `<prefix>_<key>`.
+        """
+        self.gauge_callbacks[prefix] = callback
+
+    # -------------------------------------------------------------------------
+    # Export
+    # -------------------------------------------------------------------------
+    def render(self) -> str:
+        """
+        Prometheus text exposition format.
+        """
+        lines = []
+        labels = self.const_labels
+        for prefix, callback in self.gauge_callbacks.items():
+            for key, value in callback().items():
+                name = f"{self.namespace}_{prefix}_{key}"
+                lines += [f"# TYPE {name} gauge", f"{name}{_format_labels(labels)} {value}"]
+        for name, series in self.counters.items():
+            full_name = f"{self.namespace}_{name}"
+            lines.append(f"# TYPE {full_name} counter")
+            for key, value in series.items():
+                lines.append(f"{full_name}{_format_labels(labels + key)} {value}")
+        for name, series in self.histograms.items():
+            full_name = f"{self.namespace}_{name}"
+            lines.append(f"# TYPE {full_name} histogram")
+            for key, histogram in series.items():
+                for bound, count in histogram.cumulative():
+                    lines.append(f"{full_name}_bucket{_format_labels(labels + key, ('le', bound))} {count}")
+                lines.append(f"{full_name}_sum{_format_labels(labels + key)} {histogram.sum}")
+                lines.append(f"{full_name}_count{_format_labels(labels + key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        JSON-serializable view of all the metrics.
+        """
+        def series_name(name: str, key: Labels) -> str:
+            return name + _format_labels(key)
+
+        return {
+            "ts": time.time(),
+            "labels": dict(self.const_labels),
+            "gauges": {
+                f"{prefix}_{key}": value
+                for prefix, callback in self.gauge_callbacks.items()
+                for key, value in callback().items()
+            },
+            "counters": {
+                series_name(name, key): value for name, series in self.counters.items() for key, value in series.items()
+            },
+            "histograms": {
+                series_name(name, key): {"count": histogram.count, "sum": histogram.sum, "buckets": histogram.cumulative()}
+                for name, series in self.histograms.items()
+                for key, histogram in series.items()
+            },
+        }
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9100) -> asyncio.AbstractServer:
+        """
+        Serve the Prometheus text on http://host:port/metrics (any path answers).
+        """
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            try:
+                # Read and ignore the request head
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                body = self.render().encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: text/plain; version=0.0.4\r\n"
+                    + f"Content-Length: {len(body)}\r\n".encode()
+                    + b"Connection: close\r\n\r\n"
+                    + body
+                )
+                await writer.drain()
+            finally:
+                writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+    async def write_jsonl(self, path: str, interval: float = 10.0) -> None:
+        """
+        Append a snapshot to a JSONL file every `interval` seconds (runs until cancelled).
+        """
+        def append(line: str) -> None:
+            with open(path, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(append, json.dumps(self.snapshot()))
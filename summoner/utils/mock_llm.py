@@ -0,0 +1,62 @@
+import asyncio
+import json
+import random
+import re
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Optional
+
+# Message ids of the micro-batch prompts ("m0", "m1", ...)
+BATCH_KEY = re.compile(r'"(m\d+)":')
+
+
+class MockOpenAI:
+    """
+    Stand-in for `AsyncOpenAI` in load tests: `chat.completions.create` sleeps for a
+    random latency and returns a canned answer with the same shape as the OpenAI
+    response (`choices[0].message.content` and `usage`), so the agents run unchanged.
+    With `stream=True`, it yields the answer word by word as `choices[0].delta.content`
+    chunks, followed by a usage chunk.
+    """
+
+    def __init__(self, latency_ms: float = 500.0, jitter_ms: float = 100.0, token_ms: float = 0.0, seed: Optional[int] = None):
+        """
+        Args:
+            latency_ms: Mean latency of a completion (time to first token when streaming).
+            jitter_ms: Standard deviation of the latency.
+            token_ms: Time to generate each word of the answer.
+            seed: Seed of the latency generator.
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_ms = token_ms
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model: str, messages: list[dict], response_format: Optional[dict] = None, stream: bool = False, **kwargs: Any) -> Any:
+        self.calls += 1
+        latency = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        if response_format and response_format.get("type") == "json_object":
+            # Answer every message id of a batch prompt, or a single JSON answer
+            keys = list(dict.fromkeys(BATCH_KEY.findall(prompt)))
+            content = json.dumps({key: "mock answer" for key in keys} if keys else {"answer": "mock answer"})
+        else:
+            content = "mock answer"
+        # Rough token counts (~4 characters per token)
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4)
+
+        words = re.findall(r"\S+\s*", content)
+        if stream:
+            return self._stream(latency, words, usage)
+        await asyncio.sleep(latency + len(words) * self.token_ms / 1000)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    async def _stream(self, latency: float, words: list[str], usage: Any) -> AsyncIterator[Any]:
+        await asyncio.sleep(latency)
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_ms / 1000)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word))], usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from .metrics import Metrics
+
+# Envelope fields that do not change the answer: sender, recipient and correlation id
+ROUTING_FIELDS = ("from", "to", "id")
+
+
+def cache_key(incoming: Any, ignore: tuple[str, ...] = ROUTING_FIELDS) -> str:
+    """
+    Canonical JSON of a payload (sorted keys, no whitespace) without its routing fields,
+    so that retries and fan-out duplicates of the same request share a key.
+    """
+    if isinstance(incoming, dict):
+        incoming = {key: value for key, value in incoming.items() if key not in ignore}
+    return json.dumps(incoming, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class ResponseCache:
+    """
+    LRU cache of answers with a TTL, keyed on `cache_key(incoming)`.
+
+    Concurrent requests for the same key share one computation (in-flight
+    deduplication): the first caller starts it, the others wait for its result.
+    Failures are not cached, every waiter gets the exception.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0, metrics: Optional[Metrics] = None):
+        """
+        Args:
+            max_entries: Maximum number of cached answers, the least recently used is evicted beyond.
+            ttl: Time to live of an answer, in seconds.
+            metrics: Registry where the cache records its hits, misses and hit rate.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.metrics = metrics
+        # key -> (expiry time, answer), least recently used first
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+        if metrics is not None:
+            metrics.register_gauges("response_cache", self.gauges)
+
+    def gauges(self) -> dict[str, float]:
+        requests = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """
+        Returns:
+            tuple[bool, Any]: (True, answer) if a fresh answer is cached, else (False, None).
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, answer = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, answer
+
+    def put(self, key: str, answer: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, incoming: Any, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached answer for `incoming`, joining the in-flight computation
+        of the same key if any, or compute (and cache) it.
+        """
+        key = cache_key(incoming)
+        found, answer = self.get(key)
+        if found:
+            self._count("hit")
+            return answer
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._count("hit", shared=True)
+        else:
+            self._count("miss")
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        # Shielded: a cancelled caller must not cancel the answer the others wait for
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        self._in_flight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.put(key, task.result())
+
+    def _count(self, result: str, shared: bool = False) -> None:
+        if result == "hit":
+            self.hits += 1
+        else:
+            self.misses += 1
+        if self.metrics is not None:
+            self.metrics.inc("cache_requests_total", result="in_flight" if shared else result)
+
+    def close(self) -> None:
+        """Cancel the in-flight computations."""
+        for task in self._in_flight.values():
+            task.cancel()
@@ -0,0 +1,91 @@
+import time
+import uuid
+import asyncio
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def stream_chunk(reply: dict, stream_id: str, seq: int, final: bool = False) -> dict:
+    """
+    Mark a reply envelope as chunk `seq` of stream `stream_id`. The last chunk has
+    `final` set (its text may be empty) and tells the receiver how many chunks to expect.
+    """
+    return {**reply, "stream": {"id": stream_id, "seq": seq, "final": final}}
+
+
+def new_stream_id(incoming: Any) -> str:
+    """Stream id of the reply: the correlation id of the message if any, else a random one."""
+    if isinstance(incoming, dict) and "id" in incoming:
+        return str(incoming["id"])
+    return uuid.uuid4().hex
+
+
+class ChunkCoalescer:
+    """
+    Group the token deltas of a streamed completion into chunks worth sending:
+    a chunk is released once it holds `max_chars` characters, or `window_ms` after
+    its first delta, whichever comes first. `add` only sees the time when a delta
+    arrives: to release a chunk on time while the model stalls, read the stream with
+    `with_deadline(stream, coalescer.remaining)` and `flush` on the timeouts.
+    """
+
+    def __init__(self, max_chars: int = 200, window_ms: float = 100.0):
+        self.max_chars = max_chars
+        self.window = window_ms / 1000
+        self.parts: list[str] = []
+        self.size = 0
+        self.started_at: Optional[float] = None
+
+    def add(self, delta: str) -> Optional[str]:
+        """
+        Buffer a delta. Returns the coalesced text when a chunk is ready, else None.
+        """
+        if not delta:
+            return None
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+        self.parts.append(delta)
+        self.size += len(delta)
+        if self.size >= self.max_chars or time.perf_counter() - self.started_at >= self.window:
+            return self.flush()
+        return None
+
+    def remaining(self) -> Optional[float]:
+        """
+        Seconds left before the buffered chunk is due (None when nothing is buffered).
+        """
+        if self.started_at is None:
+            return None
+        return max(0.0, self.window - (time.perf_counter() - self.started_at))
+
+    def flush(self) -> str:
+        text = "".join(self.parts)
+        self.parts, self.size, self.started_at = [], 0, None
+        return text
+
+
+async def with_deadline(stream: AsyncIterable[T], remaining: Callable[[], Optional[float]]) -> AsyncIterator[Optional[T]]:
+    """
+    Iterate over `stream`, yielding None whenever `remaining()` seconds (no limit if None)
+    pass without an item. The pending read is not cancelled, it yields on a later round.
+    """
+    items = stream.__aiter__()
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(items.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=remaining())
+            if not done:
+                yield None
+                continue
+            read, pending = pending, None
+            try:
+                item = read.result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        if pending is not None:
+            pending.cancel()
@@ -0,0 +1,141 @@
+import functools
+import json
+from typing import Any, Optional
+
+from pydantic import BaseModel, TypeAdapter
+
+# Any JSON object, the default schema of a route
+JSON_OBJECT = dict[str, Any]
+
+
+class StructuredOutputError(ValueError):
+    """The model output does not match the schema, even after the repair attempt."""
+
+
+@functools.lru_cache(maxsize=None)
+def validator(schema: Any) -> TypeAdapter:
+    """
+    Validator of a schema (a pydantic model or any type), built once and reused.
+    """
+    return TypeAdapter(schema)
+
+
+@functools.lru_cache(maxsize=None)
+def field_validators(schema: Any) -> dict[str, TypeAdapter]:
+    """
+    Validators of the fields of a pydantic model, to check streamed fields one by one.
+    Empty for other schemas.
+    """
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        return {name: validator(field.annotation) for name, field in schema.model_fields.items()}
+    return {}
+
+
+def parse_structured(schema: Any, text: str) -> Any:
+    """
+    Parse and validate a JSON output against a schema.
+
+    Returns:
+        Any: The validated value, as JSON-compatible Python objects.
+    Raises:
+        pydantic.ValidationError: If the text is not valid JSON or does not match the schema.
+    """
+    adapter = validator(schema)
+    return adapter.dump_python(adapter.validate_json(text), mode="json")
+
+
+def schema_instructions(schema: Any) -> str:
+    """
+    Prompt lines describing the expected JSON (empty for the default schema).
+    """
+    if schema is JSON_OBJECT:
+        return ""
+    return "Answer with a JSON object matching this JSON schema:\n" + json.dumps(validator(schema).json_schema())
+
+
+def repair_message(text: str, error: Exception) -> dict:
+    """
+    Follow-up user message asking the model to fix its invalid output.
+    """
+    return {
+        "role": "user",
+        "content": (
+            "Your previous answer is not valid for the required JSON structure.\n\n"
+            f"Errors:\n{error}\n\n"
+            "Reply with the corrected JSON object only, keeping the valid parts of your previous answer unchanged."
+        ),
+    }
+
+
+class IncrementalJSONParser:
+    """
+    Incremental parser of a streamed JSON object: `feed()` takes the text deltas and
+    returns the top-level fields completed so far, as soon as each one closes, so they
+    can be forwarded before the whole object is generated. Text before the opening
+    brace (e.g. a code fence) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.reading_key = False
+        self.key_start = 0
+        self.key: Optional[str] = None
+        self.value_start: Optional[int] = None
+        self.closed = False
+
+    def feed(self, delta: str) -> list[tuple[str, Any]]:
+        self.buffer += delta
+        fields = []
+        for i in range(self.pos, len(self.buffer)):
+            if self.closed:
+                break
+            char = self.buffer[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.reading_key:
+                        self.reading_key = False
+                        self.key = json.loads(self.buffer[self.key_start:i + 1])
+                continue
+
+            if char == '"':
+                self.in_string = True
+                if self.depth == 1 and self.key is None:
+                    self.reading_key, self.key_start = True, i
+            elif char in "{[":
+                self.depth += 1
+            elif char == ":" and self.depth == 1 and self.value_start is None:
+                self.value_start = i + 1
+            elif (char == "," and self.depth == 1) or (char == "}" and self.depth == 1):
+                field = self._complete(i)
+                if field is not None:
+                    fields.append(field)
+                if char == "}":
+                    self.depth = 0
+                    self.closed = True
+            elif char in "}]":
+                self.depth -= 1
+        self.pos = len(self.buffer)
+        return fields
+
+    def _complete(self, end: int) -> Optional[tuple[str, Any]]:
+        key, start = self.key, self.value_start
+        self.key, self.value_start = None, None
+        if key is None or start is None:
+            return None
+        try:
+            return key, json.loads(self.buffer[start:end])
+        except json.JSONDecodeError:
+            return None
+
+    @property
+    def text(self) -> str:
+        return self.buffer
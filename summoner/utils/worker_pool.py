@@ -0,0 +1,290 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional
+
+from .admission import ADMISSION_POLICIES
+from .metrics import Metrics
+
+# Receive time of the message the current worker is answering (unset for a batch)
+_received_at: ContextVar[Optional[float]] = ContextVar("received_at", default=None)
+
+
+class WorkerPool:
+    """
+    Bounded-concurrency pool for the agent's model calls.
+
+    - At most `size` handler calls are in flight at the same time.
+    - Messages from the same sender are handled one at a time, in arrival order
+      (per-sender FIFO), so a sender never gets its replies out of order.
+    - Across senders, the oldest pending message is served first (see priorities below).
+    - Replies are queued with `reply()` and drained by the send handler with `next_replies()`.
+      A handler queuing its own replies (e.g. the chunks of a stream) passes `received_at()`
+      along with them, so they count in the receive-to-send latency.
+
+    Admission control (max_pending set): when `max_pending` messages are already waiting,
+    a new message is admitted or shed according to `policy`:
+    - "drop-oldest": the oldest waiting message is dropped,
+    - "reject": the new message is rejected,
+    - "priority": the newest waiting message with the lowest priority is dropped if the
+      new message has a higher priority, otherwise the new message is rejected.
+    Higher priority senders are also served first.
+
+    Micro-batching (batch_size > 1): a worker collects up to `batch_size` messages,
+    waiting at most `batch_wait_ms` after the first one, and the handler is called once
+    with the list of (sender, message) pairs. It must return one reply (or None) per pair,
+    in the same order.
+
+    Metrics (optional): queue wait and receive-to-send latency histograms, and shed counts.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[Any]],
+        size: int = 4,
+        on_error: Optional[Callable[[str, Any, BaseException], Awaitable[None]]] = None,
+        batch_size: int = 1,
+        batch_wait_ms: float = 50.0,
+        max_pending: Optional[int] = None,
+        policy: str = "drop-oldest",
+        priority_of: Optional[Callable[[str, Any], int]] = None,
+        metrics: Optional[Metrics] = None,
+    ):
+        """
+        Args:
+            handler: Coroutine answering one message (or one batch, see above);
+                returns the reply, or None for no reply.
+            size: Maximum number of concurrent handler calls.
+            on_error: Coroutine called with (sender, message, exception) when the handler fails.
+            batch_size: Maximum number of messages per handler call (1 disables batching).
+            batch_wait_ms: Maximum time to wait for a batch to fill up.
+            max_pending: Maximum number of waiting messages (None for unbounded).
+            policy: Load shedding policy, one of ADMISSION_POLICIES.
+            priority_of: Returns the priority of a (sender, message), higher is served first.
+            metrics: Registry where the pool records its timings and gauges.
+        """
+        if size < 1:
+            raise ValueError("The pool needs at least one worker.")
+        if batch_size < 1:
+            raise ValueError("The batch size must be at least 1.")
+        if policy not in ADMISSION_POLICIES:
+            raise ValueError(f"Unknown policy '{policy}'. Should be one of {ADMISSION_POLICIES}.")
+        self.handler = handler
+        self.size = size
+        self.on_error = on_error
+        self.batch_size = batch_size
+        self.batch_wait_ms = batch_wait_ms
+        self.max_pending = max_pending
+        self.policy = policy
+        self.priority_of = priority_of or (lambda sender, message: 0)
+        self.metrics = metrics
+        # (reply, receive time) pairs, drained by the send handler
+        self.outbox: asyncio.Queue = asyncio.Queue()
+
+        # sender -> pending (sequence number, priority, message, receive time), oldest first
+        self._lanes: dict[str, deque[tuple[int, int, Any, float]]] = {}
+        self._busy: set[str] = set()
+        self._ready = asyncio.Condition()
+        self._seq = itertools.count()
+        self._workers: list[asyncio.Task] = []
+        # Only one worker fills a batch at a time, otherwise idle workers would split it
+        self._collecting = False
+        self.in_flight = 0
+        self.shed = 0
+
+        if metrics is not None:
+            metrics.register_gauges("worker_pool", self.gauges)
+
+    # -------------------------------------------------------------------------
+    # Gauges
+    # -------------------------------------------------------------------------
+    @property
+    def queue_depth(self) -> int:
+        """Number of messages waiting for a worker."""
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def gauges(self) -> dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "workers": self.size,
+            "shed_total": self.shed,
+        }
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.size)]
+
+    async def close(self) -> None:
+        """
+        Cancel the workers, including the in-flight model calls. Pending messages are dropped.
+        """
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._lanes.clear()
+        self._busy.clear()
+
+    # -------------------------------------------------------------------------
+    # Scheduling
+    # -------------------------------------------------------------------------
+    async def submit(self, sender: str, message: Any) -> list[tuple[str, Any]]:
+        """
+        Queue a message for the workers, shedding load if the pool is full.
+
+        Returns:
+            list[tuple[str, Any]]: The (sender, message) pairs shed to make room,
+            or the submitted one if it was rejected. Empty if nothing was shed.
+        """
+        priority = self.priority_of(sender, message)
+        async with self._ready:
+            shed = []
+            if self.max_pending is not None and self.queue_depth >= self.max_pending:
+                victim = self._evict(priority)
+                self.shed += 1
+                if self.metrics is not None:
+                    self.metrics.inc("messages_shed_total", policy=self.policy)
+                if victim is None:
+                    return [(sender, message)]
+                shed.append(victim)
+            entry = (next(self._seq), priority, message, time.perf_counter())
+            self._lanes.setdefault(sender, deque()).append(entry)
+            self._ready.notify_all()
+            return shed
+
+    def _evict(self, priority: int) -> Optional[tuple[str, Any]]:
+        """
+        Remove a waiting message to admit a new one with the given priority, following the policy.
+        Returns the removed (sender, message), or None if the new message must be rejected.
+        """
+        lanes = [(sender, lane) for sender, lane in self._lanes.items() if lane]
+        if self.policy == "reject" or not lanes:
+            return None
+        if self.policy == "drop-oldest":
+            # Lanes are FIFO, so the oldest message is at the head of a lane
+            sender, lane = min(lanes, key=lambda item: item[1][0][0])
+            _, _, message, _ = lane.popleft()
+        else:
+            # Lowest priority first, newest first among equals, taken from the lane tails
+            sender, lane = min(lanes, key=lambda item: (item[1][-1][1], -item[1][-1][0]))
+            if lane[-1][1] >= priority:
+                return None
+            _, _, message, _ = lane.pop()
+        if not lane and sender not in self._busy:
+            del self._lanes[sender]
+        return sender, message
+
+    def _next_sender(self, own: frozenset[str] = frozenset()) -> Optional[str]:
+        """
+        Sender of the highest priority, then oldest, pending message among the senders that
+        are not being served (or that are served by the calling worker, listed in `own`).
+        """
+        candidates = [
+            (-lane[0][1], lane[0][0], sender)
+            for sender, lane in self._lanes.items()
+            if lane and (sender not in self._busy or sender in own)
+        ]
+        return min(candidates)[2] if candidates else None
+
+    def _take(self, sender: str) -> tuple[str, Any, float]:
+        _, _, message, received_at = self._lanes[sender].popleft()
+        self._busy.add(sender)
+        if self.metrics is not None:
+            self.metrics.observe("queue_wait_seconds", time.perf_counter() - received_at)
+        return sender, message, received_at
+
+    async def _collect(self) -> list[tuple[str, Any, float]]:
+        """
+        Take the next message, then fill the batch until it is full or the wait is over.
+        Must be called with the condition lock held.
+        """
+        await self._ready.wait_for(lambda: not self._collecting and self._next_sender() is not None)
+        batch = [self._take(self._next_sender())]
+        if self.batch_size == 1:
+            return batch
+
+        self._collecting = True
+        try:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.batch_wait_ms / 1000
+            while len(batch) < self.batch_size:
+                sender = self._next_sender(own=frozenset(sender for sender, _, _ in batch))
+                if sender is not None:
+                    batch.append(self._take(sender))
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+        finally:
+            self._collecting = False
+            self._ready.notify_all()
+        return batch
+
+    async def _worker(self) -> None:
+        while True:
+            async with self._ready:
+                batch = await self._collect()
+
+            self.in_flight += len(batch)
+            replies: list[Any] = []
+            try:
+                if self.batch_size == 1:
+                    _received_at.set(batch[0][2])
+                    replies = [await self.handler(batch[0][1])]
+                else:
+                    replies = list(await self.handler([(sender, message) for sender, message, _ in batch]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.on_error is not None:
+                    for sender, message, _ in batch:
+                        await self.on_error(sender, message, e)
+            finally:
+                self.in_flight -= len(batch)
+                # Queue the replies before releasing the senders to keep their replies in order
+                for reply, (_, _, received_at) in zip(replies, batch):
+                    self.reply(reply, received_at)
+                async with self._ready:
+                    for sender, _, _ in batch:
+                        self._busy.discard(sender)
+                        if sender in self._lanes and not self._lanes[sender]:
+                            del self._lanes[sender]
+                    self._ready.notify_all()
+
+    def received_at(self) -> Optional[float]:
+        """
+        Receive time of the message the calling handler answers (None with batching).
+        """
+        return _received_at.get()
+
+    def reply(self, reply: Any, received_at: Optional[float] = None) -> None:
+        """
+        Queue a reply for the send handler (None is ignored).
+        """
+        if reply is not None:
+            self.outbox.put_nowait((reply, received_at))
+
+    async def next_replies(self) -> list[Any]:
+        """
+        Wait for at least one reply, then take every reply that is ready.
+        """
+        items = [await self.outbox.get()]
+        while not self.outbox.empty():
+            items.append(self.outbox.get_nowait())
+
+        if self.metrics is not None:
+            now = time.perf_counter()
+            for _, received_at in items:
+                if received_at is not None:
+                    self.metrics.observe("receive_to_send_seconds", now - received_at)
+        return [reply for reply, _ in items]